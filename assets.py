@@ -0,0 +1,419 @@
+import os
+
+from OpenGL.GL import *
+
+from lod import LodSet
+from objLoader import OBJ
+
+
+class AssetManager:
+    """
+    A class to load each OBJ mesh, MTL file and texture once and share them between objects.
+
+    ...
+
+    Attributes
+    ----------
+    meshes : dict
+        a dictionary mapping (filename, swapyz) keys to the loaded OBJ meshes
+    materials : dict
+        a dictionary mapping MTL file paths to the loaded materials
+    textures : dict
+        a dictionary mapping image file paths to the IDs of the loaded OpenGL textures
+    references : dict
+        a dictionary mapping every loaded asset's key to the number of users holding it
+    mesh_keys : dict
+        a dictionary mapping the loaded OBJ meshes back to their keys
+    lods : dict
+        a dictionary mapping mesh keys to the levels of detail built for the mesh
+    headless : bool
+        whether the assets are loaded without an OpenGL context, keeping only their CPU side data
+
+    Methods
+    -------
+    acquire(key):
+        Adds a reference to an asset.
+    drop(key):
+        Removes a reference to an asset.
+    load_texture(imagefile):
+        Loads a texture, or shares the already loaded one.
+    load_material(filename):
+        Loads materials from a MTL file, or shares the already loaded ones.
+    load(filename, swapyz=False):
+        Loads a mesh, or shares the already loaded one, and returns a new instance of it.
+    load_lods(mesh):
+        Loads the levels of detail of a loaded mesh, or shares the already loaded ones.
+    release(mesh):
+        Releases a reference to a mesh, deleting its resources once it is no longer used.
+    release_material(filename):
+        Releases a reference to the materials of a MTL file.
+    release_texture(imagefile):
+        Releases a reference to a texture.
+    free():
+        Deletes every asset that is still loaded.
+    """
+
+    def __init__(self, headless=False):
+        """
+        Constructs all the necessary attributes for the asset manager object.
+
+        Parameters:
+        headless (bool): Whether to load the assets without an OpenGL context. Headless meshes are parsed but not
+        uploaded, and headless textures are not loaded at all. Defaults to False.
+        """
+
+        self.headless = headless
+        self.meshes = {}
+        self.materials = {}
+        self.textures = {}
+        self.references = {}
+        self.mesh_keys = {}
+        self.lods = {}
+
+    def acquire(self, key):
+        """
+        Adds a reference to an asset.
+
+        Parameters:
+        key (tuple): The key of the asset.
+        """
+
+        self.references[key] = self.references.get(key, 0) + 1
+
+    def drop(self, key):
+        """
+        Removes a reference to an asset.
+
+        Parameters:
+        key (tuple): The key of the asset.
+
+        Returns:
+        bool: True if this was the last reference to the asset, False otherwise.
+        """
+
+        self.references[key] -= 1
+        if self.references[key] > 0:
+            return False
+        del self.references[key]
+        return True
+
+    def load_texture(self, imagefile):
+        """
+        Loads a texture, or shares the already loaded one.
+
+        Parameters:
+        imagefile (str): The path to the image file.
+
+        Returns:
+        int: The ID of the OpenGL texture, or 0 when the asset manager is headless.
+        """
+
+        imagefile = os.path.normpath(imagefile)
+        if imagefile not in self.textures:
+            self.textures[imagefile] = 0 if self.headless else OBJ.loadTexture(imagefile)
+        self.acquire(('texture', imagefile))
+        return self.textures[imagefile]
+
+    def load_material(self, filename):
+        """
+        Loads materials from a MTL file, or shares the already loaded ones.
+
+        Parameters:
+        filename (str): The path to the MTL file.
+
+        Returns:
+        dict: A dictionary containing the loaded materials.
+        """
+
+        filename = os.path.normpath(filename)
+        if filename not in self.materials:
+            self.materials[filename] = OBJ.loadMaterial(filename, texture_loader=self.load_texture)
+        self.acquire(('material', filename))
+        return self.materials[filename]
+
+    def load(self, filename, swapyz=False):
+        """
+        Loads a mesh, or shares the already loaded one, and returns a new instance of it.
+
+        Parameters:
+        filename (str): The path to the OBJ file.
+        swapyz (bool): Whether to swap the y and z coordinates. Defaults to False.
+
+        Returns:
+        MeshInstance: A new instance of the mesh with its own position, rotation and scale.
+        """
+
+        key = ('mesh', os.path.normpath(filename), swapyz)
+        if key not in self.meshes:
+            mesh = OBJ(filename, swapyz=swapyz, assets=self, generate=False if self.headless else None)
+            self.meshes[key] = mesh
+            self.mesh_keys[mesh] = key
+        self.acquire(key)
+        return MeshInstance(self.meshes[key], self)
+
+    def load_lods(self, mesh):
+        """
+        Loads the levels of detail of a loaded mesh, or shares the already loaded ones.
+
+        The levels live as long as the mesh itself, and are deleted with its last reference.
+
+        Parameters:
+        mesh (OBJ): A mesh loaded through this asset manager.
+
+        Returns:
+        LodSet: The levels of detail of the mesh.
+        """
+
+        key = self.mesh_keys[mesh]
+        if key not in self.lods:
+            self.lods[key] = LodSet.load(mesh, key[1], key[2])
+        return self.lods[key]
+
+    def release(self, mesh):
+        """
+        Releases a reference to a mesh, deleting its resources once it is no longer used.
+
+        The mesh's vertex buffers are deleted with the last reference to the mesh, and its materials and textures are
+        released in turn, so they are deleted once no loaded mesh uses them anymore.
+
+        Parameters:
+        mesh (OBJ): The mesh to release.
+        """
+
+        key = self.mesh_keys[mesh]
+        if not self.drop(key):
+            return
+        mesh.free()
+        if key in self.lods:
+            self.lods.pop(key).free()
+        del self.meshes[key]
+        del self.mesh_keys[mesh]
+        for mtllib in mesh.mtllibs:
+            self.release_material(mtllib)
+
+    def release_material(self, filename):
+        """
+        Releases a reference to the materials of a MTL file.
+
+        Parameters:
+        filename (str): The path to the MTL file.
+        """
+
+        filename = os.path.normpath(filename)
+        if not self.drop(('material', filename)):
+            return
+        dirname = os.path.dirname(filename)
+        for mtl in self.materials.pop(filename).values():
+            if 'map_Kd' in mtl:
+                self.release_texture(os.path.join(dirname, mtl['map_Kd']))
+
+    def release_texture(self, imagefile):
+        """
+        Releases a reference to a texture.
+
+        Parameters:
+        imagefile (str): The path to the image file.
+        """
+
+        imagefile = os.path.normpath(imagefile)
+        if not self.drop(('texture', imagefile)):
+            return
+        texture = self.textures.pop(imagefile)
+        if texture:
+            glDeleteTextures([texture])
+
+    def free(self):
+        """
+        Deletes every asset that is still loaded.
+        """
+
+        for mesh in list(self.mesh_keys):
+            while mesh in self.mesh_keys:
+                self.release(mesh)
+
+
+class MeshInstance:
+    """
+    A class to represent a placement of a shared mesh in the 3D space.
+
+    The instance only carries its own position, rotation and scale; the vertices, materials and vertex buffers are
+    owned by the shared OBJ mesh.
+
+    ...
+
+    Attributes
+    ----------
+    mesh : OBJ
+        the shared mesh of the instance
+    assets : AssetManager
+        the asset manager the mesh was loaded through
+    position : list
+        the instance's position in the 3D space
+    rotation : list
+        the instance's rotation angles
+    scaling : float
+        the instance's uniform scale factor
+
+    Methods
+    -------
+    render(position=None, rotation=None, mesh=None):
+        Renders the instance in the 3D space.
+    move(x, y, z):
+        Moves the instance by a certain amount.
+    rotate(yaw, pitch, roll):
+        Rotates the instance by certain angles.
+    scale(scale):
+        Scales the instance by a certain factor.
+    calculate_center():
+        Gets the instance's center point.
+    get_bounding_box():
+        Gets the instance's bounding box in world space.
+    get_bounding_sphere():
+        Gets the instance's bounding sphere in world space.
+    get_position():
+        Gets the instance's position.
+    set_position(x, y, z):
+        Sets the instance's position.
+    free():
+        Releases the instance's reference to the shared mesh.
+    """
+
+    def __init__(self, mesh, assets=None):
+        """
+        Constructs all the necessary attributes for the mesh instance object.
+
+        Parameters:
+        mesh (OBJ): The shared mesh of the instance.
+        assets (AssetManager): The asset manager the mesh was loaded through. Defaults to None.
+        """
+
+        self.mesh = mesh
+        self.assets = assets
+        self.position = [0, 0, 0]
+        self.rotation = [0, 0, 0]
+        self.scaling = 1
+
+    def render(self, position=None, rotation=None, mesh=None):
+        """
+        Renders the instance in the 3D space.
+
+        Parameters:
+        position (list): The position to render the instance at. Defaults to None, in which case the instance's own
+        position is used.
+        rotation (list): The rotation to render the instance with. Defaults to None, in which case the instance's own
+        rotation is used.
+        mesh (object): The mesh to draw in place of the shared mesh, such as one of its levels of detail. Defaults to
+        None, in which case the shared mesh is drawn.
+        """
+
+        position = self.position if position is None else position
+        rotation = self.rotation if rotation is None else rotation
+        glPushMatrix()
+        glTranslatef(*position)
+        glRotatef(rotation[0], 1, 0, 0)
+        glRotatef(rotation[1], 0, 1, 0)
+        glRotatef(rotation[2], 0, 0, 1)
+        glScalef(self.scaling, self.scaling, self.scaling)
+        (self.mesh if mesh is None else mesh).draw()
+        glPopMatrix()
+
+    def move(self, x, y, z):
+        """
+        Moves the instance by a certain amount.
+
+        Parameters:
+        x (float): The amount to move along the x-axis.
+        y (float): The amount to move along the y-axis.
+        z (float): The amount to move along the z-axis.
+        """
+
+        self.position[0] += x
+        self.position[1] += y
+        self.position[2] += z
+
+    def rotate(self, yaw, pitch, roll):
+        """
+        Rotates the instance by certain angles.
+
+        Parameters:
+        yaw (float): The angle to rotate around the y-axis.
+        pitch (float): The angle to rotate around the x-axis.
+        roll (float): The angle to rotate around the z-axis.
+        """
+
+        self.rotation[0] += pitch
+        self.rotation[1] += yaw
+        self.rotation[2] += roll
+
+    def scale(self, scale):
+        """
+        Scales the instance by a certain factor.
+
+        Unlike OBJ.scale(), this leaves the shared mesh untouched and is applied when the instance is rendered.
+
+        Parameters:
+        scale (float): The scale factor.
+        """
+
+        self.scaling *= scale
+
+    def calculate_center(self):
+        """
+        Gets the instance's center point.
+
+        Returns:
+        tuple: A tuple containing the x, y, and z coordinates of the center point.
+        """
+
+        return tuple(c * self.scaling for c in self.mesh.calculate_center())
+
+    def get_bounding_box(self):
+        """
+        Gets the instance's bounding box in world space.
+
+        Returns:
+        tuple: The (min, max) corners of the axis-aligned box enclosing the instance.
+        """
+
+        return self.mesh.transform_bounds(self.position, self.rotation, self.scaling)[0]
+
+    def get_bounding_sphere(self):
+        """
+        Gets the instance's bounding sphere in world space.
+
+        Returns:
+        tuple: The (center, radius) of the sphere enclosing the instance.
+        """
+
+        return self.mesh.transform_bounds(self.position, self.rotation, self.scaling)[1]
+
+    def get_position(self):
+        """
+        Gets the instance's position.
+
+        Returns:
+        list: A list containing the x, y, and z coordinates of the instance's position.
+        """
+
+        return self.position
+
+    def set_position(self, x, y, z):
+        """
+        Sets the instance's position.
+
+        Parameters:
+        x (float): The new x-coordinate of the instance's position.
+        y (float): The new y-coordinate of the instance's position.
+        z (float): The new z-coordinate of the instance's position.
+        """
+
+        self.position = [x, y, z]
+
+    def free(self):
+        """
+        Releases the instance's reference to the shared mesh.
+        """
+
+        if self.assets is not None and self.mesh is not None:
+            self.assets.release(self.mesh)
+        self.mesh = None
@@ -0,0 +1,306 @@
+from math import ceil
+
+import numpy as np
+
+from controls import ACTIONS
+from player import REFERENCE_RATE, TICK_RATE
+from spatial import CONTACT_SKIN
+
+
+class VehicleBatch:
+    """
+    A class to simulate many cars at once, with the state of every car stored in NumPy arrays.
+
+    Each step reproduces Player.movement() for every car: acceleration, steering, the speed caps and the swept collision
+    against the obstacle grid with sliding. Laps are counted like Player.update_lap_count() without a racetrack, in the
+    box of the start line, not through the track's checkpoint gates.
+
+    ...
+
+    Attributes
+    ----------
+    count : int
+        the number of cars
+    speed : ndarray
+        the speed of each car, in units per frame at REFERENCE_RATE
+    angle : ndarray
+        the heading of each car, in degrees
+    position : ndarray
+        an (N, 3) array of the position of each car
+    collision : ndarray
+        an (N, 2) boolean array telling if each car hit an obstacle while moving forward or backward in the last step
+    lap_count : ndarray
+        the number of laps completed by each car
+    has_lap_counted : ndarray
+        whether each car's current lap has been counted
+    lap_timer : ndarray
+        the race time at which each car completed its last lap
+    acceleration, deceleration, max_speed, max_reverse_speed, collision_radius : float
+        the movement constants shared by every car, with the same defaults as Player
+    obstacles : SpatialGrid
+        the grid indexing the obstacles
+    boxes : ndarray
+        an (M, 4) array of the obstacles' (min_x, min_z, max_x, max_z) boxes
+    cell_table : ndarray
+        a dense (columns, rows, K) array of the indices of the obstacles in each grid cell, padded with -1
+    cell_origin : tuple
+        the (column, row) of the first cell of the table
+
+    Methods
+    -------
+    build_cell_table():
+        Packs the obstacle grid into a dense array that can be indexed by many cars at once.
+    unpack_inputs(inputs):
+        Converts the inputs of every car into an (N, 4) boolean array.
+    candidates(x, z, move_x, move_z):
+        Gets the indices of the obstacles near each car's movement.
+    sweep(x, z, move_x, move_z):
+        Finds the first obstacle hit by each car along its movement.
+    slide(x, z, move_x, move_z, iterations=3):
+        Moves every car along its movement, sliding along the obstacles that are hit.
+    step(inputs, dt=1 / TICK_RATE):
+        Advances every car by one time step.
+    update_lap_count(timer):
+        Updates the lap count of every car based on its position on the track.
+    """
+
+    def __init__(self, count, obstacles, positions=None, angles=None):
+        """
+        Constructs all the necessary attributes for the vehicle batch object.
+
+        Parameters:
+        count (int): The number of cars.
+        obstacles (SpatialGrid): The grid indexing the obstacles.
+        positions (ndarray): An (N, 3) array of the starting position of each car. Defaults to None, in which case
+        every car starts at the origin.
+        angles (ndarray): The starting heading of each car, in degrees. Defaults to None, in which case every car
+        starts with a heading of 0.
+        """
+
+        self.count = count
+        self.speed = np.zeros(count)
+        self.angle = np.zeros(count) if angles is None else np.array(angles, dtype=np.float64)
+        self.position = np.zeros((count, 3)) if positions is None else np.array(positions, dtype=np.float64)
+        self.collision = np.zeros((count, 2), dtype=bool)
+        self.lap_count = np.zeros(count, dtype=np.int64)
+        self.has_lap_counted = np.ones(count, dtype=bool)
+        self.lap_timer = np.zeros(count, dtype=np.int64)
+        self.acceleration = 0.02
+        self.deceleration = 0.008
+        self.max_speed = 0.5
+        self.max_reverse_speed = 0.3
+        self.collision_radius = 0
+        self.obstacles = obstacles
+        self.boxes = np.array(obstacles.boxes, dtype=np.float64).reshape(-1, 4)
+        self.build_cell_table()
+
+    def build_cell_table(self):
+        """
+        Packs the obstacle grid into a dense array that can be indexed by many cars at once.
+        """
+
+        if not self.obstacles.cells:
+            self.cell_origin = (0, 0)
+            self.cell_table = np.full((1, 1, 1), -1, dtype=np.int64)
+            return
+        columns = [cell[0] for cell in self.obstacles.cells]
+        rows = [cell[1] for cell in self.obstacles.cells]
+        depth = max(len(indices) for indices in self.obstacles.cells.values())
+        self.cell_origin = (min(columns), min(rows))
+        self.cell_table = np.full((max(columns) - min(columns) + 1, max(rows) - min(rows) + 1, depth), -1,
+                                  dtype=np.int64)
+        for (column, row), indices in self.obstacles.cells.items():
+            self.cell_table[column - self.cell_origin[0], row - self.cell_origin[1], :len(indices)] = indices
+
+    def unpack_inputs(self, inputs):
+        """
+        Converts the inputs of every car into an (N, 4) boolean array.
+
+        Parameters:
+        inputs (ndarray): Either an (N, 4) boolean array of the forward, backward, left and right actions of each car,
+        or an (N,) integer array of input bitmasks, with the actions in the bit order of ACTIONS.
+
+        Returns:
+        ndarray: An (N, 4) boolean array of the pressed actions.
+        """
+
+        inputs = np.asarray(inputs)
+        if inputs.ndim == 1:
+            return (inputs[:, None] >> np.arange(len(ACTIONS))) & 1 == 1
+        return inputs.astype(bool)
+
+    def candidates(self, x, z, move_x, move_z):
+        """
+        Gets the indices of the obstacles near each car's movement.
+
+        Parameters:
+        x (ndarray): The x-coordinate of the start of each car's movement.
+        z (ndarray): The z-coordinate of the start of each car's movement.
+        move_x (ndarray): The x-coordinate of each car's movement vector.
+        move_z (ndarray): The z-coordinate of each car's movement vector.
+
+        Returns:
+        ndarray: An (N, C) array of obstacle indices for each car, padded with -1.
+        """
+
+        cell_size = self.obstacles.cell_size
+        radius = self.collision_radius
+        min_column = np.floor((np.minimum(x, x + move_x) - radius) / cell_size).astype(np.int64)
+        min_row = np.floor((np.minimum(z, z + move_z) - radius) / cell_size).astype(np.int64)
+        extent = max(np.abs(move_x).max(initial=0), np.abs(move_z).max(initial=0)) + 2 * radius
+        span = int(ceil(extent / cell_size)) + 1
+
+        offsets = np.arange(span)
+        columns = (min_column[:, None, None] + offsets[None, :, None]).repeat(span, axis=2) - self.cell_origin[0]
+        rows = (min_row[:, None, None] + offsets[None, None, :]).repeat(span, axis=1) - self.cell_origin[1]
+        inside = ((columns >= 0) & (columns < self.cell_table.shape[0]) &
+                  (rows >= 0) & (rows < self.cell_table.shape[1]))
+        found = self.cell_table[np.where(inside, columns, 0), np.where(inside, rows, 0)]
+        found[~inside] = -1
+        return found.reshape(len(x), -1)
+
+    def sweep(self, x, z, move_x, move_z):
+        """
+        Finds the first obstacle hit by each car along its movement.
+
+        This is the vectorized form of spatial.sweep_box() applied to the obstacles near each car.
+
+        Parameters:
+        x (ndarray): The x-coordinate of the start of each car's movement.
+        z (ndarray): The z-coordinate of the start of each car's movement.
+        move_x (ndarray): The x-coordinate of each car's movement vector.
+        move_z (ndarray): The z-coordinate of each car's movement vector.
+
+        Returns:
+        tuple: A (hit, t, normal_x, normal_z) tuple of arrays telling, for each car, if an obstacle was hit, the
+        fraction of the movement done before the contact, and the contact normal.
+        """
+
+        count = len(x)
+        if not len(self.boxes):
+            return np.zeros(count, dtype=bool), np.ones(count), np.zeros(count), np.zeros(count)
+
+        candidates = self.candidates(x, z, move_x, move_z)
+        valid = candidates >= 0
+        boxes = self.boxes[np.where(valid, candidates, 0)]
+        radius = self.collision_radius
+        low_x, low_z = boxes[..., 0] - radius, boxes[..., 1] - radius
+        high_x, high_z = boxes[..., 2] + radius, boxes[..., 3] + radius
+        x, z, move_x, move_z = x[:, None], z[:, None], move_x[:, None], move_z[:, None]
+
+        inside = (low_x < x) & (x < high_x) & (low_z < z) & (z < high_z)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            near_x = np.where(move_x > 0, (low_x - x) / move_x, (high_x - x) / move_x)
+            far_x = np.where(move_x > 0, (high_x - x) / move_x, (low_x - x) / move_x)
+            near_z = np.where(move_z > 0, (low_z - z) / move_z, (high_z - z) / move_z)
+            far_z = np.where(move_z > 0, (high_z - z) / move_z, (low_z - z) / move_z)
+        # An axis without movement never limits the sweep, but rules it out when the start is outside its slab
+        still_x = move_x == 0
+        still_z = move_z == 0
+        blocked = (still_x & ((x <= low_x) | (x >= high_x))) | (still_z & ((z <= low_z) | (z >= high_z)))
+        near_x = np.where(still_x, -np.inf, near_x)
+        far_x = np.where(still_x, np.inf, far_x)
+        near_z = np.where(still_z, -np.inf, near_z)
+        far_z = np.where(still_z, np.inf, far_z)
+
+        enter = np.maximum(np.maximum(near_x, near_z), 0)
+        leave = np.minimum(np.minimum(far_x, far_z), 1)
+        hits = valid & ~inside & ~blocked & (np.maximum(near_x, near_z) >= 0) & (enter < leave)
+
+        enter = np.where(hits, enter, np.inf)
+        first = np.argmin(enter, axis=1)
+        rows = np.arange(count)
+        hit = hits[rows, first]
+        t = np.where(hit, enter[rows, first], 1)
+        along_z = near_z[rows, first] > near_x[rows, first]
+        normal_x = np.where(hit & ~along_z, -np.sign(move_x[:, 0]), 0)
+        normal_z = np.where(hit & along_z, -np.sign(move_z[:, 0]), 0)
+        return hit, t, normal_x, normal_z
+
+    def slide(self, x, z, move_x, move_z, iterations=3):
+        """
+        Moves every car along its movement, sliding along the obstacles that are hit.
+
+        This is the vectorized form of SpatialGrid.slide().
+
+        Parameters:
+        x (ndarray): The x-coordinate of the start of each car's movement.
+        z (ndarray): The z-coordinate of the start of each car's movement.
+        move_x (ndarray): The x-coordinate of each car's movement vector.
+        move_z (ndarray): The z-coordinate of each car's movement vector.
+        iterations (int): The maximum number of contacts resolved. Defaults to 3.
+
+        Returns:
+        tuple: An (x, z, collided) tuple of arrays with the coordinates reached by each car and whether it hit an
+        obstacle.
+        """
+
+        x, z, move_x, move_z = x.copy(), z.copy(), move_x.copy(), move_z.copy()
+        collided = np.zeros(len(x), dtype=bool)
+        active = np.ones(len(x), dtype=bool)
+        for _ in range(iterations):
+            hit, t, normal_x, normal_z = self.sweep(x, z, move_x, move_z)
+            hit &= active
+            done = active & ~hit
+            x[done] += move_x[done]
+            z[done] += move_z[done]
+            active &= hit
+            if not active.any():
+                return x, z, collided
+            collided |= hit
+            x[hit] += move_x[hit] * t[hit] + normal_x[hit] * CONTACT_SKIN
+            z[hit] += move_z[hit] * t[hit] + normal_z[hit] * CONTACT_SKIN
+            move_x[hit] *= 1 - t[hit]
+            move_z[hit] *= 1 - t[hit]
+            along_normal = move_x * normal_x + move_z * normal_z
+            move_x[hit] -= along_normal[hit] * normal_x[hit]
+            move_z[hit] -= along_normal[hit] * normal_z[hit]
+        return x, z, collided
+
+    def step(self, inputs, dt=1 / TICK_RATE):
+        """
+        Advances every car by one time step.
+
+        Parameters:
+        inputs (ndarray): The inputs of every car, in a form accepted by unpack_inputs().
+        dt (float): The length of the time step, in seconds. Defaults to one step at TICK_RATE.
+        """
+
+        frames = dt * REFERENCE_RATE
+        forward, backward, left, right = self.unpack_inputs(inputs).T
+
+        coasting = ~forward & ~backward
+        self.speed = np.where(forward, self.speed + self.acceleration * frames, self.speed)
+        self.speed = np.where(backward & ~forward, self.speed - self.acceleration * frames, self.speed)
+        self.speed = np.where(coasting & (self.speed > 0), self.speed - self.deceleration * frames,
+                              np.where(coasting & (self.speed < 0), self.speed + self.deceleration * frames,
+                                       self.speed))
+
+        moving = np.abs(self.speed) > 0.005
+        rotate_angle = np.where(moving & left, 2 * frames, np.where(moving & right & ~left, -2 * frames, 0))
+        self.speed = np.minimum(np.maximum(self.speed, -self.max_reverse_speed), self.max_speed)
+        self.angle = np.where(rotate_angle != 0, (self.angle + rotate_angle) % 360, self.angle)
+
+        move_x = self.speed * frames * np.sin(np.radians(self.angle))
+        move_z = self.speed * frames * np.cos(np.radians(self.angle))
+        x, z, collided = self.slide(self.position[:, 0], self.position[:, 2], -move_x, -move_z)
+        self.collision[:, 0] = collided & (self.speed > 0)
+        self.collision[:, 1] = collided & (self.speed < 0)
+        self.position[:, 0] += x - self.position[:, 0]
+        self.position[:, 2] += z - self.position[:, 2]
+
+    def update_lap_count(self, timer):
+        """
+        Updates the lap count of every car when it is in the box of the start line.
+
+        Parameters:
+        timer (int): The current race time, in milliseconds.
+        """
+
+        self.has_lap_counted &= ~(timer - self.lap_timer > 30000)
+        self.lap_timer = np.where(timer - self.lap_timer > 30000, 0, self.lap_timer)
+        crossing = ((-5 < self.position[:, 0]) & (self.position[:, 0] < 5) &
+                    (-6.5 < self.position[:, 2]) & (self.position[:, 2] < -6) & ~self.has_lap_counted)
+        self.lap_count += crossing
+        self.has_lap_counted |= crossing
+        self.lap_timer = np.where(crossing, timer, self.lap_timer)
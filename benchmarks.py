@@ -0,0 +1,379 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import hud
+import instancing
+import mesh
+import objLoader
+from assets import AssetManager, MeshInstance
+from batchsim import VehicleBatch
+from controls import ACTIONS
+from environment import Environment
+from glstub import RecordingGL
+from objLoader import OBJ
+from player import Player
+from racetrack import Racetrack
+from spatial import SpatialGrid
+
+# The number of vertices the baked racetrack is allowed to emit per frame. Raise it deliberately when the track grows,
+# never to make an accidental overdraw pass.
+TRACK_VERTEX_BUDGET = 2400
+
+# The file the benchmark results are compared against, rewritten with --update-baseline
+BASELINE_FILE = 'benchmarks_baseline.json'
+
+# How much slower than the baseline a timing may be before it counts as a regression, as a fraction of the baseline.
+# Timings are noisy, so only a large slowdown fails; call and vertex counts are deterministic and must not grow at all,
+# and counts that are an output rather than a cost must not change at all.
+TIME_TOLERANCE = 0.5
+
+# The OBJ file the mesh benchmarks load
+BENCH_MODEL = 'objects/tree.obj'
+
+# The modules whose OpenGL calls the recording stub replaces
+GL_MODULES = (objLoader, mesh, instancing, hud)
+
+
+def time_call(function, repeat=5, number=None):
+    """
+    Measures the time a function takes, as the best of several runs.
+
+    Parameters:
+    function (function): The function to time, called without arguments.
+    repeat (int): The number of runs, of which the fastest is kept. Defaults to 5.
+    number (int): The number of calls in each run. Defaults to None, in which case it is picked so that a run lasts
+    about 20 milliseconds.
+
+    Returns:
+    float: The time of one call, in microseconds.
+    """
+
+    if number is None:
+        start = time.perf_counter()
+        function()
+        number = max(1, int(0.02 / max(time.perf_counter() - start, 1e-7)))
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1e6
+
+
+def bench_track_vertices():
+    """
+    Counts the vertices emitted per frame when drawing the racetrack.
+
+    The track is tessellated without uploading it, so no OpenGL context is needed.
+
+    Parameters:
+    None
+
+    Returns:
+    int: The number of vertices in the baked racetrack mesh.
+    """
+
+    return Racetrack().build().vertex_count()
+
+
+def bench_batch_simulation(count=5000, ticks=120, seed=0):
+    """
+    Measures how fast the batch simulator advances many cars driving through a field of obstacles.
+
+    Parameters:
+    count (int): The number of cars. Defaults to 5000.
+    ticks (int): The number of steps to run. Defaults to 120, one second of race time.
+    seed (int): The seed of the obstacles, starting positions and inputs. Defaults to 0.
+
+    Returns:
+    float: The number of car steps simulated per second.
+    """
+
+    rng = np.random.default_rng(seed)
+    obstacles = SpatialGrid()
+    for x, z in rng.uniform(-100, 100, (200, 2)):
+        obstacles.insert((x - 2, z - 2, x + 2, z + 2))
+    batch = VehicleBatch(count, obstacles, positions=np.column_stack(
+        [rng.uniform(-100, 100, count), np.zeros(count), rng.uniform(-100, 100, count)]))
+    inputs = rng.integers(0, 1 << len(ACTIONS), count)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        batch.step(inputs)
+    return count * ticks / (time.perf_counter() - start)
+
+
+def bench_obj_parse():
+    """
+    Measures parsing the benchmark model's OBJ file, without its cache.
+
+    Returns:
+    float: The time of one parse, in microseconds.
+    """
+
+    return time_call(lambda: OBJ.parse(BENCH_MODEL))
+
+
+def bench_obj_load_cached():
+    """
+    Measures loading the benchmark model from its parsed arrays cache, without uploading it.
+
+    Returns:
+    float: The time of one load, in microseconds.
+    """
+
+    OBJ(BENCH_MODEL, generate=False)
+    return time_call(lambda: OBJ(BENCH_MODEL, generate=False))
+
+
+def bench_obj_generate():
+    """
+    Measures building and uploading the benchmark model's vertex buffers, and counts the OpenGL calls made.
+
+    Returns:
+    tuple: The time of one upload, in microseconds, and the number of OpenGL calls it makes.
+    """
+
+    model = OBJ(BENCH_MODEL, generate=False)
+    with RecordingGL().install(*GL_MODULES) as gl:
+        model.generate()
+        calls = gl.total()
+    with RecordingGL(recording=False).install(*GL_MODULES):
+        return time_call(model.generate), calls
+
+
+def bench_track_draw():
+    """
+    Measures drawing the baked racetrack, and counts the OpenGL calls made and vertices drawn per frame.
+
+    Returns:
+    tuple: The time of one draw, in microseconds, the number of OpenGL calls it makes and the number of vertices it
+    draws.
+    """
+
+    with RecordingGL().install(*GL_MODULES) as gl:
+        racetrack = Racetrack()
+        racetrack.draw()
+        gl.reset()
+        racetrack.draw()
+        calls, vertices = gl.total(), gl.total('vertices')
+    with RecordingGL(recording=False).install(*GL_MODULES):
+        return time_call(racetrack.draw), calls, vertices
+
+
+def bench_check_collision(tree_count, queries=1000, seed=0):
+    """
+    Measures a player's swept collision check against a field of trees.
+
+    Parameters:
+    tree_count (int): The number of trees in the field.
+    queries (int): The number of different movements checked. Defaults to 1000.
+    seed (int): The seed of the trees and the movements. Defaults to 0.
+
+    Returns:
+    float: The time of one check, in microseconds.
+    """
+
+    rng = np.random.default_rng(seed)
+    obstacles = SpatialGrid()
+    for x, z in rng.uniform(-100, 100, (tree_count, 2)):
+        obstacles.insert((x - 0.5, z - 0.5, x + 0.5, z + 0.5))
+    player = Player({}, MeshInstance(None), headless=True)
+    player.state["collision_radius"] = 1
+    positions = np.column_stack([rng.uniform(-100, 100, queries), np.zeros(queries), rng.uniform(-100, 100, queries)])
+    moves = rng.uniform(-0.5, 0.5, (queries, 2))
+
+    def check_all():
+        for position, (move_x, move_z) in zip(positions, moves):
+            player.check_collision(position, obstacles, move_x, move_z)
+
+    return time_call(check_all, number=1) / queries
+
+
+def bench_calculate_center():
+    """
+    Measures getting the center of a placed instance of the benchmark model.
+
+    Returns:
+    float: The time of one call, in microseconds.
+    """
+
+    assets = AssetManager(headless=True)
+    tree = assets.load(BENCH_MODEL)
+    tree.move(3, 0, 4)
+    tree.scale(0.5)
+    return time_call(tree.calculate_center)
+
+
+def bench_random_coordinates():
+    """
+    Measures picking the random tree positions outside the racetrack.
+
+    Returns:
+    float: The time of one call, in microseconds.
+    """
+
+    environment = Environment(AssetManager(headless=True), seed=0)
+    return time_call(environment.get_random_coordinates_outside_track, repeat=3)
+
+
+def bench_tree_fill():
+    """
+    Measures filling the whole area around the racetrack with trees, as far apart as the tree spacing allows.
+
+    Returns:
+    tuple: The time of one fill, in microseconds, and the number of trees placed.
+    """
+
+    environment = Environment(AssetManager(headless=True), seed=0)
+    count = len(environment.get_random_coordinates_outside_track(None))
+    return time_call(lambda: environment.get_random_coordinates_outside_track(None), repeat=3, number=1), count
+
+
+def bench_draw_text():
+    """
+    Measures drawing a frame of HUD text, and counts the OpenGL calls and state changes made.
+
+    Three strings are drawn like the game's lap counters and timer, the timer changing every frame.
+
+    Returns:
+    tuple: The time of one frame of HUD text, in microseconds, the number of OpenGL calls it makes and the number of
+    state changes among them.
+    """
+
+    frame = [0]
+
+    def draw():
+        frame[0] += 1
+        renderer.draw_text(10, 10, "Player 1 Lap: 2 1st")
+        renderer.draw_text(410, 10, "Player 2 Lap: 2 2nd")
+        renderer.draw_text(330, 550, f"Timer: 0:{frame[0] // 1000 % 60}:{frame[0] % 1000}")
+        renderer.flush()
+
+    with RecordingGL().install(*GL_MODULES) as gl:
+        renderer = hud.HudRenderer(800, 600)
+        draw()
+        gl.reset()
+        draw()
+        calls, state_changes = gl.total(), gl.total('state_changes')
+    with RecordingGL(recording=False).install(*GL_MODULES):
+        return time_call(draw), calls, state_changes
+
+
+def run_benchmarks():
+    """
+    Runs every benchmark, the rendering ones against the no-op OpenGL backend of the recording stub.
+
+    Returns:
+    dict: A dictionary mapping each result's name to its value, unit and kind. The kind tells how the result is
+    compared against the baseline: 'time' for lower is better within TIME_TOLERANCE, 'rate' for higher is better
+    within TIME_TOLERANCE, 'count' for an exact count that must not grow, and 'exact' for an exact count that must not
+    change at all.
+    """
+
+    results = {}
+
+    def add(name, value, unit, kind):
+        results[name] = {'value': value, 'unit': unit, 'kind': kind}
+
+    add('obj_parse', bench_obj_parse(), 'us', 'time')
+    add('obj_load_cached', bench_obj_load_cached(), 'us', 'time')
+    generate_time, generate_calls = bench_obj_generate()
+    add('obj_generate', generate_time, 'us', 'time')
+    add('obj_generate_gl_calls', generate_calls, 'calls', 'count')
+    track_time, track_calls, track_vertices = bench_track_draw()
+    add('track_draw', track_time, 'us', 'time')
+    add('track_draw_gl_calls', track_calls, 'calls', 'count')
+    add('track_draw_gl_vertices', track_vertices, 'vertices', 'count')
+    add('track_vertices', bench_track_vertices(), 'vertices', 'count')
+    for tree_count in (20, 200, 2000):
+        add(f'check_collision_{tree_count}', bench_check_collision(tree_count), 'us', 'time')
+    add('calculate_center', bench_calculate_center(), 'us', 'time')
+    add('random_coordinates', bench_random_coordinates(), 'us', 'time')
+    fill_time, fill_count = bench_tree_fill()
+    add('tree_fill', fill_time, 'us', 'time')
+    add('tree_fill_count', fill_count, 'trees', 'exact')
+    text_time, text_calls, text_state_changes = bench_draw_text()
+    add('draw_text', text_time, 'us', 'time')
+    add('draw_text_gl_calls', text_calls, 'calls', 'count')
+    add('draw_text_gl_state_changes', text_state_changes, 'state changes', 'count')
+    add('batch_simulation', bench_batch_simulation(), 'car steps/s', 'rate')
+    return results
+
+
+def compare(results, baseline):
+    """
+    Compares benchmark results against a baseline.
+
+    Parameters:
+    results (dict): The results, as returned by run_benchmarks().
+    baseline (dict): The baseline results, in the same layout.
+
+    Returns:
+    list: A message for every result that regressed, empty if there are none.
+    """
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        value, expected = result['value'], baseline[name]['value']
+        if result['kind'] == 'count':
+            regressed = value > expected
+        elif result['kind'] == 'exact':
+            regressed = value != expected
+        elif result['kind'] == 'rate':
+            regressed = value < expected / (1 + TIME_TOLERANCE)
+        else:
+            regressed = value > expected * (1 + TIME_TOLERANCE)
+        if regressed:
+            regressions.append(f"{name}: {value:.6g} {result['unit']}, baseline {expected:.6g} {result['unit']}")
+    return regressions
+
+
+def main():
+    """
+    Runs the benchmarks and checks their results against the budgets and the baseline.
+
+    With --json FILE the results are also written to FILE as JSON, and with --update-baseline they replace the
+    baseline in BASELINE_FILE instead of being compared against it.
+
+    Parameters:
+    None
+
+    Returns:
+    int: 0 if every benchmark is within its budget and the baseline, 1 otherwise.
+    """
+
+    arguments = sys.argv[1:]
+    results = run_benchmarks()
+    for name, result in results.items():
+        print(f"{name}: {result['value']:.6g} {result['unit']}")
+    if '--json' in arguments:
+        with open(arguments[arguments.index('--json') + 1], 'w') as file:
+            json.dump(results, file, indent=2)
+
+    status = 0
+    if results['track_vertices']['value'] > TRACK_VERTEX_BUDGET:
+        print(f"track vertex budget exceeded (budget {TRACK_VERTEX_BUDGET})")
+        status = 1
+    if '--update-baseline' in arguments:
+        with open(BASELINE_FILE, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"baseline written to {BASELINE_FILE}")
+    elif os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as file:
+            regressions = compare(results, json.load(file))
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,6 @@
+from math import cos, radians, sin, tan
+
+import numpy as np
 from OpenGL.GL import *
 from OpenGL.GLU import *
 
@@ -22,11 +25,27 @@ class Camera:
         the pitch angle of the camera (rotation around the x-axis)
     roll : float
         the roll angle of the camera (rotation around the z-axis)
+    fov : float
+        the vertical field of view of the camera, in degrees
+    aspect_ratio : float
+        the aspect ratio of the camera's viewport
+    near : float
+        the distance of the near clipping plane
+    far : float
+        the distance of the far clipping plane
 
     Methods
     -------
     init(aspect_ratio):
         Initializes the camera's projection and modelview matrices.
+    apply_projection():
+        Loads the camera's projection into the OpenGL projection matrix.
+    projection_matrix():
+        Computes the camera's projection matrix.
+    view_matrix():
+        Computes the camera's view matrix, as applied by apply().
+    eye_position():
+        Gets the camera's position in world space.
     set_yaw(yaw):
         Sets the camera's yaw angle.
     look_at(target_x, target_y, target_z):
@@ -48,6 +67,10 @@ class Camera:
         self.yaw = 0
         self.pitch = 20
         self.roll = 0
+        self.fov = 70
+        self.aspect_ratio = 1
+        self.near = 0.1
+        self.far = 100
 
     def init(self, aspect_ratio):
         """
@@ -57,11 +80,68 @@ class Camera:
         aspect_ratio (float): The aspect ratio of the viewport.
         """
 
+        self.aspect_ratio = aspect_ratio
+        self.apply_projection()
+        glLoadIdentity()
+
+    def apply_projection(self):
+        """
+        Loads the camera's projection into the OpenGL projection matrix.
+
+        The projection is shared by every viewport, so each one has to load its camera's projection before drawing.
+        """
+
         glMatrixMode(GL_PROJECTION)
         glLoadIdentity()
-        gluPerspective(70, aspect_ratio, 0.1, 100)
+        gluPerspective(self.fov, self.aspect_ratio, self.near, self.far)
         glMatrixMode(GL_MODELVIEW)
-        glLoadIdentity()
+
+    def projection_matrix(self):
+        """
+        Computes the camera's projection matrix.
+
+        Returns:
+        ndarray: The 4x4 matrix built by gluPerspective() for the camera, in row-major order.
+        """
+
+        f = 1 / tan(radians(self.fov) / 2)
+        return np.array([
+            [f / self.aspect_ratio, 0, 0, 0],
+            [0, f, 0, 0],
+            [0, 0, (self.far + self.near) / (self.near - self.far), 2 * self.far * self.near / (self.near - self.far)],
+            [0, 0, -1, 0]
+        ])
+
+    def view_matrix(self):
+        """
+        Computes the camera's view matrix, as applied by apply().
+
+        Returns:
+        ndarray: The 4x4 view matrix, in row-major order.
+        """
+
+        ax, ay, az = radians(self.pitch), radians(self.yaw), radians(self.roll)
+        rotate_x = np.array([[1, 0, 0], [0, cos(ax), -sin(ax)], [0, sin(ax), cos(ax)]])
+        rotate_y = np.array([[cos(ay), 0, sin(ay)], [0, 1, 0], [-sin(ay), 0, cos(ay)]])
+        rotate_z = np.array([[cos(az), -sin(az), 0], [sin(az), cos(az), 0], [0, 0, 1]])
+        rotation = rotate_x @ rotate_y @ rotate_z
+
+        matrix = np.identity(4)
+        matrix[:3, :3] = rotation
+        matrix[:3, 3] = rotation @ np.array([self.x, self.y, self.z])
+        return matrix
+
+    def eye_position(self):
+        """
+        Gets the camera's position in world space.
+
+        The camera's x, y and z are the translation applied to the world, so the camera itself sits at their opposite.
+
+        Returns:
+        tuple: The x, y and z coordinates of the camera.
+        """
+
+        return -self.x, -self.y, -self.z
 
     def set_yaw(self, yaw):
         """
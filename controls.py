@@ -0,0 +1,254 @@
+import pygame as pg
+
+# The actions a player can take, in the order of their bits in an input bitmask
+ACTIONS = ('forward', 'backward', 'left', 'right')
+
+# The key bindings of each player, in player order
+PLAYER_BINDINGS = [
+    {'forward': pg.K_w, 'backward': pg.K_s, 'left': pg.K_a, 'right': pg.K_d},
+    {'forward': pg.K_UP, 'backward': pg.K_DOWN, 'left': pg.K_LEFT, 'right': pg.K_RIGHT},
+    {'forward': pg.K_i, 'backward': pg.K_k, 'left': pg.K_j, 'right': pg.K_l},
+    {'forward': pg.K_KP8, 'backward': pg.K_KP5, 'left': pg.K_KP4, 'right': pg.K_KP6}
+]
+
+
+class KeyboardControls:
+    """
+    A class to read a player's controls from the keyboard.
+
+    ...
+
+    Attributes
+    ----------
+    bindings : dict
+        a dictionary mapping each action to the key bound to it
+
+    Methods
+    -------
+    read():
+        Reads the controls for the next simulation step.
+    """
+
+    def __init__(self, bindings):
+        """
+        Constructs all the necessary attributes for the keyboard controls object.
+
+        Parameters:
+        bindings (dict): A dictionary mapping each action to the key bound to it.
+        """
+
+        self.bindings = bindings
+
+    def read(self):
+        """
+        Reads the controls for the next simulation step.
+
+        Returns:
+        dict: A dictionary mapping each action to whether it is pressed.
+        """
+
+        keys = pg.key.get_pressed()
+        return {action: bool(keys[self.bindings[action]]) for action in ACTIONS}
+
+
+class ScriptedControls:
+    """
+    A class to play back a script of controls, one simulation step at a time.
+
+    The script is a list of (ticks, actions) runs, where actions is a collection of the pressed action names held for
+    the given number of simulation steps. Once the script is over, nothing is pressed.
+
+    ...
+
+    Attributes
+    ----------
+    script : list
+        the list of (ticks, actions) runs
+    run : int
+        the index of the current run in the script
+    tick : int
+        the number of steps already played from the current run
+    played : int
+        the number of steps already played from the whole script
+    length : int
+        the number of steps in the whole script
+
+    Methods
+    -------
+    read():
+        Reads the controls for the next simulation step.
+    finished():
+        Checks if the whole script has been played.
+    """
+
+    def __init__(self, script):
+        """
+        Constructs all the necessary attributes for the scripted controls object.
+
+        Parameters:
+        script (list): A list of (ticks, actions) runs.
+        """
+
+        self.script = list(script)
+        self.run = 0
+        self.tick = 0
+        self.played = 0
+        self.length = sum(ticks for ticks, _ in self.script)
+
+    def read(self):
+        """
+        Reads the controls for the next simulation step.
+
+        Returns:
+        dict: A dictionary mapping each action to whether it is pressed.
+        """
+
+        while self.run < len(self.script) and self.tick >= self.script[self.run][0]:
+            self.run += 1
+            self.tick = 0
+        if self.run >= len(self.script):
+            return {action: False for action in ACTIONS}
+        self.tick += 1
+        self.played += 1
+        pressed = self.script[self.run][1]
+        return {action: action in pressed for action in ACTIONS}
+
+    def finished(self):
+        """
+        Checks if the whole script has been played.
+
+        Returns:
+        bool: True if every run of the script has been played, False otherwise.
+        """
+
+        return self.played >= self.length
+
+
+def pack_actions(keys):
+    """
+    Packs the pressed actions into an input bitmask.
+
+    Parameters:
+    keys (dict): A dictionary mapping each action to whether it is pressed.
+
+    Returns:
+    int: The bitmask of the pressed actions, with the bits in the order of ACTIONS.
+    """
+
+    return sum(1 << bit for bit, action in enumerate(ACTIONS) if keys[action])
+
+
+def unpack_actions(mask):
+    """
+    Unpacks an input bitmask into the pressed actions.
+
+    Parameters:
+    mask (int): The bitmask of the pressed actions, with the bits in the order of ACTIONS.
+
+    Returns:
+    dict: A dictionary mapping each action to whether it is pressed.
+    """
+
+    return {action: bool(mask >> bit & 1) for bit, action in enumerate(ACTIONS)}
+
+
+class RecordingControls:
+    """
+    A class to record the controls read from another source, one input bitmask per simulation step.
+
+    ...
+
+    Attributes
+    ----------
+    controls : object
+        the source of the controls, with a read() method
+    inputs : bytearray
+        the recorded input bitmasks, one byte per simulation step
+
+    Methods
+    -------
+    read():
+        Reads the controls for the next simulation step and records them.
+    """
+
+    def __init__(self, controls, inputs):
+        """
+        Constructs all the necessary attributes for the recording controls object.
+
+        Parameters:
+        controls (object): The source of the controls, such as a KeyboardControls object.
+        inputs (bytearray): The array the input bitmasks are appended to.
+        """
+
+        self.controls = controls
+        self.inputs = inputs
+
+    def read(self):
+        """
+        Reads the controls for the next simulation step and records them.
+
+        Returns:
+        dict: A dictionary mapping each action to whether it is pressed.
+        """
+
+        keys = self.controls.read()
+        self.inputs.append(pack_actions(keys))
+        return keys
+
+
+class ReplayControls:
+    """
+    A class to play back recorded input bitmasks, one simulation step at a time.
+
+    Once the recording is over, nothing is pressed.
+
+    ...
+
+    Attributes
+    ----------
+    inputs : bytes
+        the recorded input bitmasks, one byte per simulation step
+    played : int
+        the number of steps already played
+
+    Methods
+    -------
+    read():
+        Reads the controls for the next simulation step.
+    finished():
+        Checks if the whole recording has been played.
+    """
+
+    def __init__(self, inputs):
+        """
+        Constructs all the necessary attributes for the replay controls object.
+
+        Parameters:
+        inputs (bytes): The recorded input bitmasks, one byte per simulation step.
+        """
+
+        self.inputs = bytes(inputs)
+        self.played = 0
+
+    def read(self):
+        """
+        Reads the controls for the next simulation step.
+
+        Returns:
+        dict: A dictionary mapping each action to whether it is pressed.
+        """
+
+        if self.played >= len(self.inputs):
+            return unpack_actions(0)
+        self.played += 1
+        return unpack_actions(self.inputs[self.played - 1])
+
+    def finished(self):
+        """
+        Checks if the whole recording has been played.
+
+        Returns:
+        bool: True if every recorded step has been played, False otherwise.
+        """
+
+        return self.played >= len(self.inputs)
@@ -1,9 +1,19 @@
-from random import uniform
+from random import Random
+
+import numpy as np
 
 from OpenGL.GL import *
 
-from objLoader import OBJ
+from assets import AssetManager
+from instancing import pack_transforms
+from lod import LodRenderer, LodSet
+from placement import PLACEMENT_BOUNDS, TREE_SPACING, ExclusionGrid, poisson_disk
 from racetrack import Racetrack
+from spatial import SpatialGrid
+from world import World
+
+# The number of trees placed around the track
+TREE_COUNT = 20
 
 
 class Environment:
@@ -12,65 +22,85 @@ class Environment:
 
     ...
 
+    Attributes
+    ----------
+    assets : AssetManager
+        the asset manager the environment's objects are loaded through
+    racetrack : Racetrack
+        the racetrack of the game environment, which keeps its baked mesh between frames
+    tree_batch : LodRenderer
+        the renderer drawing every tree created by draw_trees() in one batch per level of detail
+    obstacles : SpatialGrid
+        the grid indexing the trees created by draw_trees() for collision queries
+    random : Random
+        the random number generator placing and scaling the trees
+    tree_centers : ndarray
+        an (N, 3) array of the center of each tree's bounding sphere
+    tree_radii : ndarray
+        the radius of each tree's bounding sphere
+    exclusion : ExclusionGrid
+        the track and its clearance rasterized into a grid, built on the first tree placement
+    world : World
+        the world streamed in chunks around the cars, holding the floor, the track and the trees, or None if the
+        environment is not streamed
+
     Methods
     -------
-    get_random_coordinates_outside_track():
+    get_random_coordinates_outside_track(count=TREE_COUNT):
         Generates random coordinates outside the track.
     draw_floor():
         Draws the floor of the game environment.
-    draw_trees():
+    draw_trees(count=TREE_COUNT):
         Draws trees at random locations in the game environment.
-    init_env(trees):
+    stream(positions):
+        Loads the chunks of a streamed world around the cars.
+    init_env(trees, frustum=None, counter=None):
         Initializes the game environment.
+    free():
+        Deletes the OpenGL resources of the game environment.
     """
 
-    def get_random_coordinates_outside_track(self):
+    def __init__(self, assets=None, seed=None, streamed=False):
         """
-        Generates random coordinates outside the track.
+        Constructs all the necessary attributes for the environment object.
 
-        This method first defines a bounding area for the entire track, then generates random points within this area.
-        It checks if each point is inside the track, and if it is, it generates a new point. This process is repeated
-        until it has generated 100 points that are outside the track.
-
-        Returns:
-        list: A list of tuples, where each tuple contains the x and z coordinates of a point.
+        Parameters:
+        assets (AssetManager): The asset manager to load the environment's objects through. Defaults to None, in which
+        case the environment creates its own.
+        seed (int): The seed of the tree placement, so that the same seed always gives the same trees. Defaults to
+        None, in which case the trees are placed differently every time.
+        streamed (bool): Whether the floor, the track and the trees are streamed in chunks around the cars, for maps
+        too large to keep loaded. Defaults to False.
         """
 
-        # Define the bounding area for the entire track (assuming a large enough area)
-        track_bounds = (-100, -100, 200, 200)  # (xmin, ymin, xmax, ymax)
-
-        track_coordinates = Racetrack().get_track_coordinates()
-
-        random_coords = []
-
-        for x, z, w, h in track_coordinates:
-            # Define a bounding box around the track segment
-            min_x = x - w / 2 - 5  # Extra padding outside the track
-            max_x = x + w / 2 + 5
-            min_z = z - h / 2 - 5
-            max_z = z + h / 2 + 5
+        self.assets = assets if assets is not None else AssetManager()
+        self.racetrack = Racetrack()
+        self.tree_batch = None
+        self.obstacles = SpatialGrid()
+        self.random = Random(seed)
+        self.tree_centers = np.zeros((0, 3))
+        self.tree_radii = np.zeros(0)
+        self.exclusion = None
+        self.world = World(self.assets, self.racetrack, seed) if streamed else None
+
+    def get_random_coordinates_outside_track(self, count=TREE_COUNT):
+        """
+        Generates random coordinates outside the track.
 
-            # Add bounding box to the list
-            random_coords.append((min_x, min_z, max_x, max_z))
+        The track segments and a clearance around them are rasterized into an exclusion grid once, then the points are
+        placed by Poisson-disk sampling, so they are at least TREE_SPACING apart and the time taken is bounded
+        however crowded the area is. Fewer points are returned if they do not all fit.
 
-        # Function to check if a point is inside any bounding box
-        def is_inside_track(x, z, boxes):
-            for (min_x, min_z, max_x, max_z) in boxes:
-                if min_x <= x <= max_x and min_z <= z <= max_z:
-                    return True
-            return False
+        Parameters:
+        count (int): The number of points to place. Defaults to TREE_COUNT. None fills the whole area.
 
-        # Generate random coordinates outside the track
-        outside_coords = []
-        for _ in range(100):  # Generate 100 random points
-            while True:
-                x = uniform(track_bounds[0], track_bounds[2])
-                z = uniform(track_bounds[1], track_bounds[3])
-                if not is_inside_track(x, z, random_coords):
-                    outside_coords.append((x, z))
-                    break
+        Returns:
+        list: A list of tuples, where each tuple contains the x and z coordinates of a point.
+        """
 
-        return outside_coords
+        if self.exclusion is None:
+            self.exclusion = ExclusionGrid.from_track(self.racetrack.get_track_coordinates())
+        return poisson_disk(self.random, PLACEMENT_BOUNDS, TREE_SPACING, self.exclusion, count)
 
     def draw_floor(self):
         """
@@ -87,40 +117,97 @@ class Environment:
         glVertex3f(-200, -0.009, 200)
         glEnd()
 
-    def draw_trees(self):
+    def draw_trees(self, count=TREE_COUNT):
         """
         Draws trees at random locations in the game environment.
 
         This method first generates random coordinates outside the track using the get_random_coordinates_outside_track
-        method. It then creates a tree object at each of these locations, scales it by a random factor, and adds it to
-        a list. It stops after it has created 20 trees.
+        method. It then creates a tree instance at each of these locations, scales it by a random factor, and adds it to
+        a list. All the trees share a single tree mesh, and are drawn together by an instanced renderer for each level
+        of detail, and are indexed in a spatial grid for collision queries. Their bounding spheres are kept for culling
+        and for picking their level of detail. Headless environments only keep the full detail mesh, as they never draw.
+        A streamed environment places no trees here, as they belong to the chunks of its world.
+
+        Parameters:
+        count (int): The number of trees. Defaults to TREE_COUNT. None fills the whole area.
 
         Returns:
-        list: A list of tree objects.
+        list: A list of tree instances.
         """
 
         trees = []
-        random_cords = self.get_random_coordinates_outside_track()
+        if self.world is not None:
+            return trees
+        random_cords = self.get_random_coordinates_outside_track(count)
         for x, z in random_cords:
-            tree = OBJ('objects/tree.obj', swapyz=False)
+            tree = self.assets.load('objects/tree.obj', swapyz=False)
             tree.move(x, 0, z)
-            tree.scale(uniform(0.1, 1))
+            tree.scale(self.random.uniform(0.1, 1))
             trees.append(tree)
-            if len(trees) == 20:
-                break
+        self.obstacles = SpatialGrid.from_objects(trees)
+        spheres = [tree.get_bounding_sphere() for tree in trees]
+        self.tree_centers = np.array([center for center, _ in spheres], dtype=np.float64).reshape(-1, 3)
+        self.tree_radii = np.array([radius for _, radius in spheres], dtype=np.float64)
+        if trees:
+            mesh = trees[0].mesh
+            lods = LodSet(mesh, []) if self.assets.headless else self.assets.load_lods(mesh)
+            self.tree_batch = LodRenderer(lods, pack_transforms(trees), self.tree_centers, self.tree_radii)
         return trees
 
-    def init_env(self, trees):
+    def stream(self, positions):
+        """
+        Loads the chunks of a streamed world around the cars.
+
+        The obstacle grid is replaced by the one indexing the trees of the loaded chunks. Environments that are not
+        streamed are left unchanged.
+
+        Parameters:
+        positions (list): The x, y and z coordinates of each car.
+        """
+
+        if self.world is None:
+            return
+        self.world.update(positions)
+        self.obstacles = self.world.obstacles
+
+    def init_env(self, trees, frustum=None, counter=None):
         """
         Initializes the game environment.
 
-        This method first renders all the trees in the environment, then draws the racetrack and the floor.
+        This method first renders all the trees in the environment, then draws the racetrack and the floor. Trees
+        created by draw_trees() are drawn in one instanced batch per level of detail. When a view frustum is given, the
+        trees and the chunks of the racetrack outside it are skipped, and the other trees are drawn at the level of
+        detail matching their size on screen. A streamed environment draws the loaded chunks of its world instead.
 
         Parameters:
         trees (list): A list of tree objects.
+        frustum (Frustum): The view frustum of the current viewport. Defaults to None, in which case everything is
+        drawn.
+        counter (CullCounter): The counter the drawn and culled trees and track chunks are added to. Defaults to None.
         """
 
-        for tree in trees:
-            tree.render()
-        Racetrack().draw()
+        if self.world is not None:
+            self.world.draw(frustum, counter)
+            return
+        if self.tree_batch is not None:
+            self.tree_batch.draw(frustum, counter)
+        else:
+            for tree in trees:
+                visible = frustum is None or frustum.sphere_visible(*tree.get_bounding_sphere())
+                if counter is not None and frustum is not None:
+                    counter.count('trees', visible)
+                if visible:
+                    tree.render()
+        self.racetrack.draw(frustum, counter)
         self.draw_floor()
+
+    def free(self):
+        """
+        Deletes the OpenGL resources of the game environment.
+        """
+
+        self.racetrack.free()
+        if self.world is not None:
+            self.world.free()
+        if self.tree_batch is not None:
+            self.tree_batch.free()
@@ -0,0 +1,190 @@
+import numpy as np
+
+
+class Frustum:
+    """
+    A class to represent the view frustum of a camera, used to skip objects that cannot be seen.
+
+    The six clipping planes are extracted from the camera's combined projection and view matrix, and every plane is
+    normalized so that its signed distance to a point is in world units. A bounding sphere is visible unless it lies
+    entirely behind one of the planes.
+
+    ...
+
+    Attributes
+    ----------
+    planes : ndarray
+        a (6, 4) array of the left, right, bottom, top, near and far planes, as a, b, c, d rows with the normals
+        pointing into the frustum
+    eye : ndarray
+        the x, y and z coordinates of the camera, or None when unknown
+    pixel_scale : float
+        the number of pixels an object one unit wide covers at a distance of one unit, or None when unknown
+
+    Methods
+    -------
+    from_camera(camera, viewport_height=None):
+        Builds the frustum of a camera.
+    sphere_visible(center, radius):
+        Checks if a bounding sphere is at least partly inside the frustum.
+    spheres_visible(centers, radii):
+        Checks which of many bounding spheres are at least partly inside the frustum.
+    pixel_sizes(centers, radii):
+        Estimates the on-screen diameter of many bounding spheres.
+    """
+
+    def __init__(self, matrix, eye=None, pixel_scale=None):
+        """
+        Constructs all the necessary attributes for the frustum object.
+
+        Parameters:
+        matrix (ndarray): The 4x4 combined projection and view matrix, in row-major order.
+        eye (tuple): The x, y and z coordinates of the camera. Defaults to None.
+        pixel_scale (float): The number of pixels an object one unit wide covers at a distance of one unit. Defaults
+        to None.
+        """
+
+        matrix = np.asarray(matrix, dtype=np.float64)
+        planes = np.array([
+            matrix[3] + matrix[0],
+            matrix[3] - matrix[0],
+            matrix[3] + matrix[1],
+            matrix[3] - matrix[1],
+            matrix[3] + matrix[2],
+            matrix[3] - matrix[2],
+        ])
+        self.planes = planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+        self.eye = None if eye is None else np.asarray(eye, dtype=np.float64)
+        self.pixel_scale = pixel_scale
+
+    @classmethod
+    def from_camera(cls, camera, viewport_height=None):
+        """
+        Builds the frustum of a camera.
+
+        Parameters:
+        camera (Camera): The camera, with its current position, angles and projection.
+        viewport_height (int): The height of the viewport, in pixels, used to estimate the size of objects on screen.
+        Defaults to None, in which case the pixel scale is unknown.
+
+        Returns:
+        Frustum: The camera's view frustum.
+        """
+
+        pixel_scale = None
+        if viewport_height is not None:
+            pixel_scale = viewport_height / 2 / np.tan(np.radians(camera.fov) / 2)
+        return cls(camera.projection_matrix() @ camera.view_matrix(), camera.eye_position(), pixel_scale)
+
+    def sphere_visible(self, center, radius):
+        """
+        Checks if a bounding sphere is at least partly inside the frustum.
+
+        Parameters:
+        center (tuple): The x, y and z coordinates of the sphere's center.
+        radius (float): The radius of the sphere.
+
+        Returns:
+        bool: True if the sphere may be visible, False if it is entirely outside the frustum.
+        """
+
+        return bool(np.all(self.planes[:, :3] @ np.asarray(center, dtype=np.float64) + self.planes[:, 3] >= -radius))
+
+    def spheres_visible(self, centers, radii):
+        """
+        Checks which of many bounding spheres are at least partly inside the frustum.
+
+        Parameters:
+        centers (ndarray): An (N, 3) array of the spheres' centers.
+        radii (ndarray): The N radii of the spheres.
+
+        Returns:
+        ndarray: An N boolean array telling which spheres may be visible.
+        """
+
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        distances = centers @ self.planes[:, :3].T + self.planes[:, 3]
+        return np.all(distances >= -np.asarray(radii, dtype=np.float64).reshape(-1, 1), axis=1)
+
+    def pixel_sizes(self, centers, radii):
+        """
+        Estimates the on-screen diameter of many bounding spheres.
+
+        Parameters:
+        centers (ndarray): An (N, 3) array of the spheres' centers.
+        radii (ndarray): The N radii of the spheres.
+
+        Returns:
+        ndarray: The N approximate diameters of the spheres, in pixels. Every sphere is infinitely large when the
+        frustum has no eye position or pixel scale.
+        """
+
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        if self.eye is None or self.pixel_scale is None:
+            return np.full(len(centers), np.inf)
+        distances = np.maximum(np.linalg.norm(centers - self.eye, axis=1), 1e-6)
+        return 2 * np.asarray(radii, dtype=np.float64).reshape(-1) * self.pixel_scale / distances
+
+
+class CullCounter:
+    """
+    A class to count the objects drawn and culled in a viewport, by kind of object.
+
+    ...
+
+    Attributes
+    ----------
+    drawn : dict
+        a dictionary mapping each kind of object to the number drawn since the last reset
+    culled : dict
+        a dictionary mapping each kind of object to the number culled since the last reset
+
+    Methods
+    -------
+    reset():
+        Clears the counts, usually at the start of a frame.
+    count(kind, visible):
+        Adds the result of a visibility test to the counts.
+    summary():
+        Formats the counts for display.
+    """
+
+    def __init__(self):
+        """
+        Constructs all the necessary attributes for the cull counter object.
+        """
+
+        self.drawn = {}
+        self.culled = {}
+
+    def reset(self):
+        """
+        Clears the counts, usually at the start of a frame.
+        """
+
+        self.drawn = {}
+        self.culled = {}
+
+    def count(self, kind, visible):
+        """
+        Adds the result of a visibility test to the counts.
+
+        Parameters:
+        kind (str): The kind of object tested, such as 'trees'.
+        visible (bool or ndarray): The visibility of one object, or a boolean array of the visibility of many.
+        """
+
+        visible = np.asarray(visible, dtype=bool).reshape(-1)
+        drawn = int(visible.sum())
+        self.drawn[kind] = self.drawn.get(kind, 0) + drawn
+        self.culled[kind] = self.culled.get(kind, 0) + len(visible) - drawn
+
+    def summary(self):
+        """
+        Formats the counts for display.
+
+        Returns:
+        str: The drawn and total count of each kind of object, such as 'trees 5/20'.
+        """
+
+        return '  '.join(f"{kind} {self.drawn[kind]}/{self.drawn[kind] + self.culled[kind]}" for kind in self.drawn)
@@ -0,0 +1,512 @@
+import os
+import struct
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+from OpenGL.GL import *
+
+from instancing import InstancedRenderer, transform_matrix
+
+# The directory holding the best lap of each player, replayed as ghost cars in later sessions
+GHOST_DIR = 'ghosts'
+
+# The header of a ghost file: magic, format version, byte size of a delta, tick rate, frame count, lap time in
+# milliseconds, and the quantized x, y, z and yaw of the frame before the first one
+GHOST_HEADER = struct.Struct('<8sHBxIII4i')
+GHOST_MAGIC = b'RACEGHST'
+GHOST_VERSION = 1
+
+# The number of quantization steps per unit of distance and per degree of yaw
+POSITION_SCALE = 1000
+ANGLE_SCALE = 100
+
+# The number of frames read from a ghost file at a time during playback
+STREAM_FRAMES = 256
+
+# The opacity of the ghost cars
+GHOST_ALPHA = 0.35
+
+
+def quantize(frames):
+    """
+    Quantizes ghost frames to integers.
+
+    Parameters:
+    frames (ndarray): An (N, 4) array of x, y, z and yaw rows.
+
+    Returns:
+    ndarray: An (N, 4) int64 array of the quantized rows.
+    """
+
+    scales = np.array([POSITION_SCALE, POSITION_SCALE, POSITION_SCALE, ANGLE_SCALE])
+    return np.round(np.asarray(frames, dtype=np.float64).reshape(-1, 4) * scales).astype(np.int64)
+
+
+def dequantize(frames):
+    """
+    Converts quantized ghost frames back to coordinates and angles.
+
+    Parameters:
+    frames (ndarray): An (N, 4) integer array of quantized x, y, z and yaw rows.
+
+    Returns:
+    ndarray: An (N, 4) float64 array of x, y, z and yaw rows.
+    """
+
+    return frames / np.array([POSITION_SCALE, POSITION_SCALE, POSITION_SCALE, ANGLE_SCALE], dtype=np.float64)
+
+
+def write_ghost(filename, frames, lap_time, tick_rate):
+    """
+    Writes a lap to a ghost file.
+
+    The frames are quantized, and each one is stored as its difference from the previous one. The differences of a
+    car moving at race speed fit in 16 bits, and 32 bits are only used for laps that do not fit. The file is written
+    next to its destination and then moved in place, so a stream still playing the old lap keeps reading it whole.
+
+    Parameters:
+    filename (str): The path of the file to write.
+    frames (ndarray): An (N, 4) array of the car's x, y, z and yaw at each simulation step of the lap.
+    lap_time (int): The duration of the lap, in milliseconds.
+    tick_rate (int): The number of simulation steps per second of race time.
+    """
+
+    quantized = quantize(frames)
+    origin = quantized[0] if len(quantized) else np.zeros(4, dtype=np.int64)
+    deltas = np.diff(quantized, axis=0, prepend=origin[None, :])
+    dtype = np.int16 if not len(deltas) or np.abs(deltas).max() <= np.iinfo(np.int16).max else np.int32
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filename + '.tmp', 'wb') as file:
+        file.write(GHOST_HEADER.pack(GHOST_MAGIC, GHOST_VERSION, np.dtype(dtype).itemsize, tick_rate, len(deltas),
+                                     lap_time, *origin.tolist()))
+        file.write(deltas.astype(f'<i{np.dtype(dtype).itemsize}').tobytes())
+    os.replace(filename + '.tmp', filename)
+
+
+def read_ghost_header(filename):
+    """
+    Reads the header of a ghost file.
+
+    Parameters:
+    filename (str): The path of the ghost file.
+
+    Returns:
+    dict: The 'delta_size', 'tick_rate', 'frame_count', 'lap_time' and quantized 'origin' of the ghost.
+
+    Raises:
+    ValueError: If the file is not a ghost file, or was written by another version of the format.
+    """
+
+    with open(filename, 'rb') as file:
+        data = file.read(GHOST_HEADER.size)
+    if len(data) < GHOST_HEADER.size:
+        raise ValueError(f"{filename} is not a ghost file")
+    magic, version, delta_size, tick_rate, frame_count, lap_time, *origin = GHOST_HEADER.unpack(data)
+    if magic != GHOST_MAGIC:
+        raise ValueError(f"{filename} is not a ghost file")
+    if version != GHOST_VERSION:
+        raise ValueError(f"{filename} has ghost version {version}, expected {GHOST_VERSION}")
+    return {
+        'delta_size': delta_size,
+        'tick_rate': tick_rate,
+        'frame_count': frame_count,
+        'lap_time': lap_time,
+        'origin': np.array(origin, dtype=np.int64),
+    }
+
+
+class GhostRecorder:
+    """
+    A class to record a player's laps and keep the fastest one as a ghost file.
+
+    The car's transform is recorded at every simulation step. When update_lap_count() counts a new lap, the recorded
+    lap is written to the ghost file if it beats the lap already stored there, and a new lap is started. A ghost file
+    being played is closed while it is rewritten, since an open file cannot be replaced on every platform, and a lap
+    that cannot be written is simply not kept.
+
+    ...
+
+    Attributes
+    ----------
+    player : Player
+        the player whose laps are recorded
+    filename : str
+        the path of the player's ghost file
+    tick_rate : int
+        the number of simulation steps per second of race time
+    ghosts : GhostRenderer
+        the renderer that may be playing the ghost file, or None
+    frames : list
+        the x, y, z and yaw of the car at each step of the current lap
+    lap_count : int
+        the player's lap count when the current lap started
+    lap_start : int
+        the race time at which the current lap started, in milliseconds
+    best_time : int
+        the duration of the lap stored in the ghost file, in milliseconds, or None if there is none
+
+    Methods
+    -------
+    record(timer):
+        Records the car's transform for the current step, and closes the lap when a new one has been counted.
+    """
+
+    def __init__(self, player, filename, tick_rate, ghosts=None):
+        """
+        Constructs all the necessary attributes for the ghost recorder object.
+
+        Parameters:
+        player (Player): The player whose laps are recorded.
+        filename (str): The path of the player's ghost file.
+        tick_rate (int): The number of simulation steps per second of race time.
+        ghosts (GhostRenderer): The renderer that may be playing the ghost file. Defaults to None.
+        """
+
+        self.player = player
+        self.filename = filename
+        self.tick_rate = tick_rate
+        self.ghosts = ghosts
+        self.frames = []
+        self.lap_count = player.lap_count
+        self.lap_start = 0
+        try:
+            self.best_time = read_ghost_header(filename)['lap_time']
+        except (OSError, ValueError):
+            self.best_time = None
+
+    def record(self, timer):
+        """
+        Records the car's transform for the current step, and closes the lap when a new one has been counted.
+
+        This is called after the player's movement() and update_lap_count() for the step.
+
+        Parameters:
+        timer (int): The current race time, in milliseconds.
+
+        Returns:
+        bool: True if the lap that just ended was written as the new best lap, False otherwise.
+        """
+
+        position = self.player.car.get_position()
+        self.frames.append((position[0], position[1], position[2], self.player.car.rotation[1]))
+        if self.player.lap_count == self.lap_count:
+            return False
+
+        lap_time = timer - self.lap_start
+        best = self.best_time is None or lap_time < self.best_time
+        if best:
+            released = self.ghosts.released(self.filename) if self.ghosts is not None else nullcontext()
+            try:
+                with released:
+                    write_ghost(self.filename, self.frames, lap_time, self.tick_rate)
+            except OSError:
+                best = False
+            else:
+                self.best_time = lap_time
+        self.frames = [self.frames[-1]]
+        self.lap_count = self.player.lap_count
+        self.lap_start = timer
+        return best
+
+
+class GhostStream:
+    """
+    A class to play back a ghost file, reading it from disk a few frames at a time.
+
+    Only STREAM_FRAMES frames are held in memory at once, and the deltas are accumulated as they are read. Once the
+    lap is over, the ghost stays on its last frame until restart() is called.
+
+    ...
+
+    Attributes
+    ----------
+    filename : str
+        the path of the ghost file
+    header : dict
+        the header of the ghost file, as returned by read_ghost_header()
+    file : file
+        the open ghost file
+    buffer : ndarray
+        the quantized frames read from the file and not played yet
+    played : int
+        the number of frames played since the start of the lap
+    state : ndarray
+        the quantized x, y, z and yaw of the last frame read
+    previous : ndarray
+        the x, y, z and yaw of the ghost at the previous step
+    current : ndarray
+        the x, y, z and yaw of the ghost at the current step
+
+    Methods
+    -------
+    restart():
+        Starts the lap over from its first frame.
+    read_block():
+        Reads the next block of frames from the file.
+    advance():
+        Moves the ghost to its next frame.
+    finished():
+        Checks if every frame of the lap has been played.
+    transform(alpha):
+        Gets the model matrix of the ghost between the last two steps.
+    close():
+        Closes the ghost file.
+    reopen():
+        Opens the ghost file again after it has been rewritten, keeping the ghost at the same point of its lap.
+    """
+
+    def __init__(self, filename):
+        """
+        Constructs all the necessary attributes for the ghost stream object.
+
+        Parameters:
+        filename (str): The path of the ghost file.
+        """
+
+        self.filename = filename
+        self.header = read_ghost_header(filename)
+        self.file = open(filename, 'rb')
+        self.restart()
+
+    def restart(self):
+        """
+        Starts the lap over from its first frame.
+        """
+
+        self.file.seek(GHOST_HEADER.size)
+        self.buffer = np.empty((0, 4), dtype=np.int64)
+        self.played = 0
+        self.state = self.header['origin'].copy()
+        self.current = dequantize(self.state)
+        self.advance()
+        self.previous = self.current
+
+    def read_block(self):
+        """
+        Reads the next block of frames from the file.
+        """
+
+        delta_size = self.header['delta_size']
+        data = self.file.read(STREAM_FRAMES * 4 * delta_size)
+        deltas = np.frombuffer(data[:len(data) // (4 * delta_size) * 4 * delta_size], dtype=f'<i{delta_size}')
+        frames = self.state + np.cumsum(deltas.reshape(-1, 4).astype(np.int64), axis=0)
+        if len(frames):
+            self.state = frames[-1]
+        self.buffer = frames
+
+    def advance(self):
+        """
+        Moves the ghost to its next frame.
+        """
+
+        if self.finished():
+            self.previous = self.current
+            return
+        if not len(self.buffer):
+            self.read_block()
+            if not len(self.buffer):
+                self.played = self.header['frame_count']
+                self.previous = self.current
+                return
+        self.previous = self.current
+        self.current = dequantize(self.buffer[0])
+        self.buffer = self.buffer[1:]
+        self.played += 1
+
+    def finished(self):
+        """
+        Checks if every frame of the lap has been played.
+
+        Returns:
+        bool: True if the ghost is on its last frame, False otherwise.
+        """
+
+        return self.played >= self.header['frame_count']
+
+    def transform(self, alpha):
+        """
+        Gets the model matrix of the ghost between the last two steps.
+
+        Parameters:
+        alpha (float): How far between the previous and the current step to place the ghost, from 0 to 1.
+
+        Returns:
+        ndarray: A 4x4 float32 matrix in OpenGL's column-major order.
+        """
+
+        frame = self.previous + (self.current - self.previous) * alpha
+        return transform_matrix(frame[:3], (0, frame[3], 0))
+
+    def close(self):
+        """
+        Closes the ghost file.
+        """
+
+        self.file.close()
+
+    def reopen(self):
+        """
+        Opens the ghost file again after it has been rewritten, keeping the ghost at the same point of its lap.
+        """
+
+        played = self.played
+        self.header = read_ghost_header(self.filename)
+        self.file = open(self.filename, 'rb')
+        self.restart()
+        while self.played < played and not self.finished():
+            self.advance()
+
+
+class GhostRenderer:
+    """
+    A class to draw every ghost car as a translucent copy of the shared car mesh, in a single instanced draw.
+
+    ...
+
+    Attributes
+    ----------
+    streams : list
+        the list of the ghost streams being played
+    batch : InstancedRenderer
+        the renderer drawing every ghost from the car mesh
+
+    Methods
+    -------
+    load(directory=GHOST_DIR):
+        Opens every ghost file in a directory.
+    restart():
+        Starts every ghost's lap over.
+    advance():
+        Moves every ghost to its next frame.
+    released(filename):
+        Closes the streams playing a ghost file while it is rewritten, and reopens them afterwards.
+    draw(alpha, frustum=None, counter=None):
+        Draws every ghost between the last two steps, skipping the ones outside a view frustum.
+    free():
+        Closes the ghost files and deletes the renderer's OpenGL resources.
+    """
+
+    def __init__(self, mesh, filenames=()):
+        """
+        Constructs all the necessary attributes for the ghost renderer object.
+
+        Parameters:
+        mesh (OBJ): The shared car mesh.
+        filenames (list): The paths of the ghost files to play. Defaults to an empty list.
+        """
+
+        self.streams = [GhostStream(filename) for filename in filenames]
+        self.batch = InstancedRenderer(mesh, np.empty((0, 4, 4), dtype=np.float32))
+
+    @classmethod
+    def load(cls, mesh, directory=GHOST_DIR):
+        """
+        Opens every ghost file in a directory.
+
+        Files that cannot be read as ghosts are skipped.
+
+        Parameters:
+        mesh (OBJ): The shared car mesh.
+        directory (str): The directory holding the ghost files. Defaults to GHOST_DIR.
+
+        Returns:
+        GhostRenderer: The renderer playing every ghost found.
+        """
+
+        renderer = cls(mesh)
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if name.endswith('.ghost'):
+                    try:
+                        renderer.streams.append(GhostStream(os.path.join(directory, name)))
+                    except (OSError, ValueError):
+                        continue
+        return renderer
+
+    def restart(self):
+        """
+        Starts every ghost's lap over.
+        """
+
+        for stream in self.streams:
+            stream.restart()
+
+    def advance(self):
+        """
+        Moves every ghost to its next frame.
+        """
+
+        for stream in self.streams:
+            stream.advance()
+
+    @contextmanager
+    def released(self, filename):
+        """
+        Closes the streams playing a ghost file while it is rewritten, and reopens them afterwards.
+
+        A stream whose file cannot be read anymore is dropped.
+
+        Parameters:
+        filename (str): The path of the ghost file.
+        """
+
+        streams = [stream for stream in self.streams if os.path.abspath(stream.filename) == os.path.abspath(filename)]
+        for stream in streams:
+            stream.close()
+        try:
+            yield
+        finally:
+            for stream in streams:
+                try:
+                    stream.reopen()
+                except (OSError, ValueError):
+                    self.streams.remove(stream)
+
+    def draw(self, alpha, frustum=None, counter=None):
+        """
+        Draws every ghost between the last two steps, skipping the ones outside a view frustum.
+
+        The ghosts are blended with a constant opacity, whatever the alpha of the car's materials, and do not write to
+        the depth buffer, so they never hide the cars behind them.
+
+        Parameters:
+        alpha (float): How far between the previous and the current step to place the ghosts, from 0 to 1.
+        frustum (Frustum): The view frustum of the current viewport. Defaults to None, in which case every ghost is
+        drawn.
+        counter (CullCounter): The counter the drawn and culled ghosts are added to. Defaults to None.
+        """
+
+        if not self.streams:
+            return
+        transforms = np.stack([stream.transform(alpha) for stream in self.streams])
+        if frustum is not None:
+            # The matrices are column-major, so the translation is in the last row
+            middle = (np.array(self.batch.mesh.bounding_box[0]) + np.array(self.batch.mesh.bounding_box[1])) / 2
+            centers = np.einsum('nji,j->ni', transforms[:, :3, :3], middle) + transforms[:, 3, :3]
+            visible = frustum.spheres_visible(centers, np.full(len(transforms), self.batch.mesh.bounding_radius))
+            if counter is not None:
+                counter.count('ghosts', visible)
+            transforms = transforms[visible]
+            if not len(transforms):
+                return
+        self.batch.stream(transforms)
+
+        glEnable(GL_BLEND)
+        glBlendColor(0, 0, 0, GHOST_ALPHA)
+        glBlendFunc(GL_CONSTANT_ALPHA, GL_ONE_MINUS_CONSTANT_ALPHA)
+        glDepthMask(GL_FALSE)
+        self.batch.draw()
+        glDepthMask(GL_TRUE)
+        glBlendFunc(GL_ONE, GL_ZERO)
+        glDisable(GL_BLEND)
+
+    def free(self):
+        """
+        Closes the ghost files and deletes the renderer's OpenGL resources.
+        """
+
+        for stream in self.streams:
+            stream.close()
+        self.batch.free()
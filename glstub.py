@@ -0,0 +1,308 @@
+from collections import Counter
+
+# The values returned by the stand-ins of the OpenGL functions whose results the game uses. Functions creating
+# objects return fresh IDs instead, and every other function returns None.
+STUB_RESULTS = {
+    'glGetProgramiv': 1,
+    'glGetProgramInfoLog': b'',
+    'glGetUniformLocation': 0,
+}
+
+# The OpenGL functions creating objects, which return a new ID on every call
+STUB_GENERATORS = ('glGenBuffers', 'glGenTextures', 'glGenLists', 'glCreateProgram', 'glCreateShader',
+                   'compileShader')
+
+# The OpenGL functions counted as draw calls
+DRAW_FUNCTIONS = ('glBegin', 'glDrawArrays', 'glDrawElements', 'glDrawElementsInstanced', 'glMultiDrawArrays')
+
+# The OpenGL functions counted as state changes, besides texture binds
+STATE_FUNCTIONS = ('glEnable', 'glDisable', 'glBindBuffer', 'glUseProgram', 'glBlendFunc', 'glBlendColor',
+                   'glDepthMask', 'glAlphaFunc', 'glFrontFace', 'glShadeModel', 'glTexEnvi', 'glTexParameteri',
+                   'glColor', 'glColor3f', 'glMatrixMode', 'glViewport', 'glPushAttrib', 'glPopAttrib',
+                   'glInterleavedArrays', 'glEnableClientState', 'glDisableClientState', 'glVertexAttribPointer',
+                   'glEnableVertexAttribArray', 'glDisableVertexAttribArray', 'glVertexAttribDivisor',
+                   'glUniform1i', 'glLightfv')
+
+# The kinds of counts kept for every subsystem
+COUNT_KINDS = ('calls', 'draws', 'vertices', 'state_changes', 'texture_binds')
+
+
+def vertex_count(name, args):
+    """
+    Gets the number of vertices an OpenGL call submits.
+
+    Parameters:
+    name (str): The name of the OpenGL function.
+    args (tuple): The arguments of the call.
+
+    Returns:
+    int: The number of vertices drawn by the call, 0 for calls that do not draw.
+    """
+
+    if name == 'glDrawArrays':
+        return int(args[2])
+    if name == 'glDrawElements':
+        return int(args[1])
+    if name == 'glDrawElementsInstanced':
+        return int(args[1]) * int(args[4])
+    if name == 'glMultiDrawArrays':
+        return int(sum(args[2][:args[3]]))
+    if name.startswith('glVertex') and name[8:9].isdigit():
+        return 1
+    return 0
+
+
+def subsystem_name(module):
+    """
+    Gets the name the OpenGL calls of a module are counted under.
+
+    Parameters:
+    module (module): The module making the calls.
+
+    Returns:
+    str: The module's name, with the script run as the program counted as 'main'.
+    """
+
+    return 'main' if module.__name__ == '__main__' else module.__name__.split('.')[-1]
+
+
+def is_gl_function(name, value):
+    """
+    Checks if a module global is an OpenGL or GLU function.
+
+    Parameters:
+    name (str): The name of the global.
+    value (object): The value of the global.
+
+    Returns:
+    bool: True if the global is an OpenGL or GLU function, or a shader helper from OpenGL.GL.shaders.
+    """
+
+    if not callable(value) or isinstance(value, type):
+        return False
+    if name.startswith('glu'):
+        return name[3:4].isupper()
+    return name.startswith('gl') and name[2:3].isupper() or name in STUB_GENERATORS
+
+
+class RecordingGL:
+    """
+    A class to intercept the OpenGL calls of modules that imported its functions, counting them by subsystem.
+
+    The game's modules import the OpenGL functions into their own globals with 'from OpenGL.GL import *', so the
+    interceptors replace those globals directly, and every module counts as its own subsystem. By default the calls are
+    only recorded, against a no-op backend that needs no OpenGL context or GPU, which lets the rendering code run
+    headless in benchmarks. With passthrough, the real functions are called as well, to count the game's calls while
+    it runs. Without recording, the stand-ins only make up the results of the no-op backend and count nothing, so that
+    timing the rendering code does not time the bookkeeping as well.
+
+    Besides the calls to each function, every subsystem counts its draw calls, the vertices they submit, its state
+    changes and its texture binds. end_frame() keeps the counts of the frame that just ended and starts a new one.
+
+    ...
+
+    Attributes
+    ----------
+    passthrough : bool
+        whether the real OpenGL functions are called after being counted
+    recording : bool
+        whether the calls are counted
+    calls : Counter
+        the number of calls made to each OpenGL function since the last reset
+    counts : dict
+        a dictionary mapping each subsystem to a Counter of its calls, draws, vertices, state changes and texture binds
+        since the last reset
+    last_frame : dict
+        the counts of the last frame ended by end_frame(), in the layout of counts
+    next_id : int
+        the next ID returned by a function creating an OpenGL object on the no-op backend
+    saved : list
+        the (module, name, function) of every global replaced, so they can be put back
+
+    Methods
+    -------
+    function(name, subsystem, original):
+        Creates the interceptor of an OpenGL function.
+    install(*modules):
+        Replaces the OpenGL functions imported by modules with interceptors.
+    uninstall():
+        Puts back every OpenGL function replaced by install().
+    reset():
+        Clears the recorded calls and counts.
+    total(kind='calls', subsystem=None):
+        Gets a count recorded since the last reset.
+    end_frame():
+        Keeps the counts of the frame that just ended and clears them for the next one.
+    frame_totals():
+        Gets the counts of the last frame summed over every subsystem.
+    """
+
+    def __init__(self, passthrough=False, recording=True):
+        """
+        Constructs all the necessary attributes for the recording OpenGL object.
+
+        Parameters:
+        passthrough (bool): Whether to call the real OpenGL functions after counting them. Defaults to False, in which
+        case the calls only go to the no-op backend.
+        recording (bool): Whether to count the calls. Defaults to True.
+        """
+
+        self.passthrough = passthrough
+        self.recording = recording
+        self.calls = Counter()
+        self.counts = {}
+        self.last_frame = {}
+        self.next_id = 1
+        self.saved = []
+
+    def function(self, name, subsystem, original):
+        """
+        Creates the interceptor of an OpenGL function.
+
+        Parameters:
+        name (str): The name of the OpenGL function.
+        subsystem (str): The subsystem the calls are counted under.
+        original (function): The real OpenGL function, called when passing through.
+
+        Returns:
+        function: A function counting its calls when recording, then calling the real function or returning a plausible
+        result.
+        """
+
+        result = STUB_RESULTS.get(name)
+        generator = name in STUB_GENERATORS
+        if not self.recording:
+            if self.passthrough:
+                return original
+
+            def stand_in(*args, **kwargs):
+                if generator:
+                    self.next_id += 1
+                    return self.next_id - 1
+                return result
+
+            stand_in.__name__ = name
+            return stand_in
+
+        draw = name in DRAW_FUNCTIONS
+        state = name in STATE_FUNCTIONS
+        texture_bind = name == 'glBindTexture'
+        vertices = draw or name.startswith('glVertex')
+
+        def interceptor(*args, **kwargs):
+            self.calls[name] += 1
+            counts = self.counts.get(subsystem)
+            if counts is None:
+                counts = self.counts[subsystem] = Counter()
+            counts['calls'] += 1
+            if draw:
+                counts['draws'] += 1
+            if vertices:
+                counts['vertices'] += vertex_count(name, args)
+            if state:
+                counts['state_changes'] += 1
+            if texture_bind:
+                counts['texture_binds'] += 1
+            if self.passthrough:
+                return original(*args, **kwargs)
+            if generator:
+                self.next_id += 1
+                return self.next_id - 1
+            return result
+
+        interceptor.__name__ = name
+        return interceptor
+
+    def install(self, *modules):
+        """
+        Replaces the OpenGL functions imported by modules with interceptors.
+
+        Parameters:
+        modules (module): The modules whose OpenGL functions to replace.
+
+        Returns:
+        RecordingGL: The recording OpenGL object itself, so it can be used in a with statement.
+        """
+
+        for module in modules:
+            subsystem = subsystem_name(module)
+            for name, value in list(vars(module).items()):
+                if is_gl_function(name, value):
+                    self.saved.append((module, name, value))
+                    setattr(module, name, self.function(name, subsystem, value))
+        return self
+
+    def uninstall(self):
+        """
+        Puts back every OpenGL function replaced by install().
+        """
+
+        for module, name, value in reversed(self.saved):
+            setattr(module, name, value)
+        self.saved = []
+
+    def reset(self):
+        """
+        Clears the recorded calls and counts.
+        """
+
+        self.calls = Counter()
+        self.counts = {}
+
+    def total(self, kind='calls', subsystem=None):
+        """
+        Gets a count recorded since the last reset.
+
+        Parameters:
+        kind (str): The kind of count, one of COUNT_KINDS. Defaults to 'calls'.
+        subsystem (str): The subsystem to count. Defaults to None, in which case every subsystem is counted.
+
+        Returns:
+        int: The count since the last reset.
+        """
+
+        if subsystem is not None:
+            return self.counts.get(subsystem, Counter())[kind]
+        return sum(counts[kind] for counts in self.counts.values())
+
+    def end_frame(self):
+        """
+        Keeps the counts of the frame that just ended and clears them for the next one.
+
+        Returns:
+        dict: The counts of the frame, mapping each subsystem to a Counter of COUNT_KINDS.
+        """
+
+        self.last_frame = self.counts
+        self.reset()
+        return self.last_frame
+
+    def frame_totals(self):
+        """
+        Gets the counts of the last frame summed over every subsystem.
+
+        Returns:
+        dict: A dictionary mapping each of COUNT_KINDS to its count in the last frame ended by end_frame().
+        """
+
+        return {kind: sum(counts[kind] for counts in self.last_frame.values()) for kind in COUNT_KINDS}
+
+    def __enter__(self):
+        """
+        Enters a with statement, keeping the stand-ins installed until it exits.
+
+        Returns:
+        RecordingGL: The recording OpenGL object itself.
+        """
+
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        Exits a with statement, putting back every OpenGL function replaced.
+
+        Parameters:
+        exc_info (tuple): The exception raised in the with statement, if any.
+        """
+
+        self.uninstall()
@@ -0,0 +1,166 @@
+from assets import AssetManager, MeshInstance
+from environment import Environment
+from player import Player, START_POSITIONS, TICK_RATE, rank_players
+
+
+class HeadlessRace:
+    """
+    A class to run a race without a window, OpenGL context or audio.
+
+    The players are driven by scripted or recorded controls, and the race is stepped as fast as the CPU allows with the
+    same fixed time step as the game. Lap counting, collisions and ranking run exactly as in the game.
+
+    ...
+
+    Attributes
+    ----------
+    assets : AssetManager
+        the headless asset manager the race's objects are loaded through
+    environment : Environment
+        the race's environment, holding the racetrack and the obstacle grid
+    trees : list
+        the list of tree instances placed around the track
+    players : list
+        the list of players taking part in the race
+    tick_rate : int
+        the number of simulation steps per second of race time
+    ticks : int
+        the number of simulation steps run so far
+    timer : int
+        the race time in milliseconds
+    collisions : list
+        the number of collisions of each player, counting each contact once however long it lasts
+    lap_times : list
+        the list of the durations of the laps completed by each player, in milliseconds
+    lap_starts : list
+        the race time at which each player's current lap started, in milliseconds
+
+    Methods
+    -------
+    step():
+        Advances the race by one simulation step.
+    finished():
+        Checks if every player's controls have run out.
+    run(ticks=None):
+        Runs the race for a number of steps, or until every player's controls have run out.
+    results():
+        Gets the current standings of the race.
+    free():
+        Releases the race's assets.
+    """
+
+    def __init__(self, controls, car_model=None, tick_rate=TICK_RATE, seed=None, streamed=False):
+        """
+        Constructs all the necessary attributes for the headless race object.
+
+        Parameters:
+        controls (list): The controls of each player, such as ScriptedControls objects.
+        car_model (str): The path to the OBJ file of the cars. Defaults to None, in which case the cars have no mesh,
+        which is enough for the simulation.
+        tick_rate (int): The number of simulation steps per second of race time. Defaults to TICK_RATE.
+        seed (int): The seed of the tree placement. Defaults to None, in which case the trees are placed differently
+        every time.
+        streamed (bool): Whether the trees are streamed in chunks around the cars, as in the game. Defaults to False.
+        """
+
+        self.assets = AssetManager(headless=True)
+        self.environment = Environment(self.assets, seed, streamed)
+        self.trees = self.environment.draw_trees()
+        self.players = []
+        start_positions = START_POSITIONS.get(len(controls), [[0, 0, 0]] * len(controls))
+        for player_controls, position in zip(controls, start_positions):
+            car = self.assets.load(car_model) if car_model is not None else MeshInstance(None)
+            car.rotation = [0, 180, 0]
+            car.position = list(position)
+            self.players.append(Player(None, car, controls=player_controls, headless=True))
+        self.tick_rate = tick_rate
+        self.ticks = 0
+        self.timer = 0
+        self.collisions = [0] * len(self.players)
+        self.lap_times = [[] for _ in self.players]
+        self.lap_starts = [0] * len(self.players)
+
+    def step(self):
+        """
+        Advances the race by one simulation step.
+        """
+
+        self.ticks += 1
+        self.timer = self.ticks * 1000 // self.tick_rate
+        self.environment.stream([player.car.get_position() for player in self.players])
+        for i, player in enumerate(self.players):
+            was_colliding = any(player.state["collision"])
+            lap_count = player.lap_count
+            player.movement(self.environment.obstacles, 1 / self.tick_rate)
+            player.update_lap_count(self.timer, self.environment.racetrack)
+            if any(player.state["collision"]) and not was_colliding:
+                self.collisions[i] += 1
+            # The player's own timer is reset once a lap takes over 30 seconds, so lap starts are kept here
+            if player.lap_count > lap_count:
+                self.lap_times[i].append(self.timer - self.lap_starts[i])
+                self.lap_starts[i] = self.timer
+        if len(self.players) > 1:
+            rank_players(self.players)
+
+    def finished(self):
+        """
+        Checks if every player's controls have run out.
+
+        Returns:
+        bool: True if every player's controls have a finished() method returning True, False otherwise.
+        """
+
+        return all(hasattr(player.controls, 'finished') and player.controls.finished() for player in self.players)
+
+    def run(self, ticks=None):
+        """
+        Runs the race for a number of steps, or until every player's controls have run out.
+
+        Parameters:
+        ticks (int): The number of steps to run. Defaults to None, in which case the race runs until finished()
+        returns True.
+
+        Returns:
+        dict: The standings of the race, as returned by results().
+        """
+
+        if ticks is None:
+            while not self.finished():
+                self.step()
+        else:
+            for _ in range(ticks):
+                self.step()
+        return self.results()
+
+    def results(self):
+        """
+        Gets the current standings of the race.
+
+        Returns:
+        dict: A dictionary holding the race's ticks and timer, and a list with the lap count, rank, time of the last
+        lap, lap durations, collision count and position of each player.
+        """
+
+        return {
+            'ticks': self.ticks,
+            'timer': self.timer,
+            'players': [{
+                'lap_count': player.lap_count,
+                'rank': player.rank,
+                'lap_timer': player.timer,
+                'lap_times': list(lap_times),
+                'collisions': collisions,
+                'position': list(player.car.get_position()),
+            } for player, collisions, lap_times in zip(self.players, self.collisions, self.lap_times)]
+        }
+
+    def free(self):
+        """
+        Releases the race's assets.
+        """
+
+        for player in self.players:
+            player.car.free()
+        for tree in self.trees:
+            tree.free()
+        self.assets.free()
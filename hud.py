@@ -0,0 +1,265 @@
+import numpy as np
+import pygame as pg
+from OpenGL.GL import *
+
+# The size of the HUD font, in pixels
+HUD_FONT_SIZE = 35
+
+# The characters drawn by the HUD, every printable ASCII character
+HUD_CHARACTERS = ''.join(chr(code) for code in range(32, 127))
+
+# The number of glyphs in each row of the atlas texture
+ATLAS_COLUMNS = 16
+
+# The most strings whose quads are kept between frames
+TEXT_CACHE_SIZE = 64
+
+
+def begin_overlay(width, height):
+    """
+    Sets up OpenGL to draw over the whole window in pixel coordinates, without lighting, texturing or depth testing.
+
+    The previous state is saved, and restored by end_overlay().
+
+    Parameters:
+    width (int): The width of the window, in pixels.
+    height (int): The height of the window, in pixels.
+    """
+
+    glPushAttrib(GL_ENABLE_BIT | GL_VIEWPORT_BIT | GL_CURRENT_BIT | GL_TEXTURE_BIT)
+    glViewport(0, 0, width, height)
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    glOrtho(0, width, 0, height, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    glDisable(GL_DEPTH_TEST)
+    glDisable(GL_LIGHTING)
+    glDisable(GL_TEXTURE_2D)
+
+
+def end_overlay():
+    """
+    Restores the OpenGL state saved by begin_overlay().
+    """
+
+    glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+    glPopAttrib()
+
+
+class GlyphAtlas:
+    """
+    A class to represent a texture holding every character of the HUD font, rendered once.
+
+    Each glyph is rendered black on white, as the HUD text always has been, so a string is drawn by placing the
+    glyphs' quads side by side without any blending.
+
+    ...
+
+    Attributes
+    ----------
+    image : ndarray
+        the RGBA pixels of the atlas, with its first row at the bottom as OpenGL expects
+    glyphs : dict
+        a dictionary mapping each character to its (s0, t0, s1, t1) texture coordinates and its width in pixels
+    line_height : int
+        the height of a line of text, in pixels
+    texture : int
+        the ID of the OpenGL texture holding the atlas, or 0 before it is uploaded
+
+    Methods
+    -------
+    upload():
+        Uploads the atlas to an OpenGL texture.
+    free():
+        Deletes the atlas's OpenGL texture.
+    """
+
+    def __init__(self, font_size=HUD_FONT_SIZE, characters=HUD_CHARACTERS):
+        """
+        Constructs all the necessary attributes for the glyph atlas object.
+
+        Parameters:
+        font_size (int): The size of the font, in pixels. Defaults to HUD_FONT_SIZE.
+        characters (str): The characters to render into the atlas. Defaults to HUD_CHARACTERS.
+        """
+
+        if not pg.font.get_init():
+            pg.font.init()
+        font = pg.font.Font(None, font_size)
+        surfaces = [font.render(character, True, (0, 0, 0), (255, 255, 255)) for character in characters]
+        self.line_height = max(surface.get_height() for surface in surfaces)
+        cell_width = max(surface.get_width() for surface in surfaces)
+        rows = -(-len(characters) // ATLAS_COLUMNS)
+        atlas = pg.Surface((cell_width * ATLAS_COLUMNS, self.line_height * rows))
+        atlas.fill((255, 255, 255))
+        width, height = atlas.get_size()
+
+        self.glyphs = {}
+        for i, (character, surface) in enumerate(zip(characters, surfaces)):
+            x = i % ATLAS_COLUMNS * cell_width
+            y = i // ATLAS_COLUMNS * self.line_height
+            atlas.blit(surface, (x, y))
+            glyph_width = surface.get_width()
+            self.glyphs[character] = ((x + 0.5) / width, (height - y - self.line_height) / height,
+                                      (x + glyph_width - 0.5) / width, (height - y) / height, glyph_width)
+
+        self.image = np.frombuffer(pg.image.tostring(atlas, 'RGBA', True), dtype=np.uint8).reshape(height, width, 4)
+        self.texture = 0
+
+    def upload(self):
+        """
+        Uploads the atlas to an OpenGL texture.
+        """
+
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.image.shape[1], self.image.shape[0], 0, GL_RGBA,
+                     GL_UNSIGNED_BYTE, self.image)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def free(self):
+        """
+        Deletes the atlas's OpenGL texture.
+        """
+
+        if self.texture:
+            glDeleteTextures([self.texture])
+            self.texture = 0
+
+
+class HudRenderer:
+    """
+    A class to draw the HUD text of a frame as textured quads from a glyph atlas, in a single draw call.
+
+    The quads of each string are laid out once and cached, so unchanged strings such as the lap counters cost a lookup.
+    Strings are queued by draw_text() and drawn together by flush().
+
+    ...
+
+    Attributes
+    ----------
+    atlas : GlyphAtlas
+        the atlas the glyphs are drawn from
+    width : int
+        the width of the window, in pixels
+    height : int
+        the height of the window, in pixels
+    cache : dict
+        a dictionary mapping strings to the vertices of their quads, placed at the origin
+    pending : list
+        the vertices of the strings queued since the last flush, placed at their window positions
+
+    Methods
+    -------
+    layout(text):
+        Gets the vertices of the quads of a string, placed at the origin.
+    draw_text(x, y, text):
+        Queues a string to be drawn at a window position.
+    flush():
+        Draws every queued string and clears the queue.
+    free():
+        Deletes the OpenGL resources of the HUD.
+    """
+
+    def __init__(self, width, height, atlas=None):
+        """
+        Constructs all the necessary attributes for the HUD renderer object.
+
+        Parameters:
+        width (int): The width of the window, in pixels.
+        height (int): The height of the window, in pixels.
+        atlas (GlyphAtlas): The atlas to draw the glyphs from. Defaults to None, in which case one is built with the
+        default font at HUD_FONT_SIZE.
+        """
+
+        self.atlas = atlas if atlas is not None else GlyphAtlas()
+        self.width = width
+        self.height = height
+        self.cache = {}
+        self.pending = []
+
+    def layout(self, text):
+        """
+        Gets the vertices of the quads of a string, placed at the origin.
+
+        Characters missing from the atlas are drawn as '?'.
+
+        Parameters:
+        text (str): The string to lay out.
+
+        Returns:
+        ndarray: A (4 * len(text), 5) float32 array of s, t, x, y, z vertices, four for each character's quad.
+        """
+
+        vertices = self.cache.get(text)
+        if vertices is not None:
+            return vertices
+        vertices = np.zeros((4 * len(text), 5), dtype=np.float32)
+        x = 0
+        height = self.atlas.line_height
+        for i, character in enumerate(text):
+            s0, t0, s1, t1, width = self.atlas.glyphs.get(character, self.atlas.glyphs['?'])
+            vertices[4 * i:4 * i + 4] = ((s0, t0, x, 0, 0), (s1, t0, x + width, 0, 0),
+                                         (s1, t1, x + width, height, 0), (s0, t1, x, height, 0))
+            x += width
+        if len(self.cache) >= TEXT_CACHE_SIZE:
+            del self.cache[next(iter(self.cache))]
+        self.cache[text] = vertices
+        return vertices
+
+    def draw_text(self, x, y, text):
+        """
+        Queues a string to be drawn at a window position.
+
+        Parameters:
+        x (int): The x-coordinate of the string's lower left corner, in pixels from the left of the window.
+        y (int): The y-coordinate of the string's lower left corner, in pixels from the bottom of the window.
+        text (str): The string to draw.
+        """
+
+        vertices = self.layout(text).copy()
+        vertices[:, 2] += x
+        vertices[:, 3] += y
+        self.pending.append(vertices)
+
+    def flush(self):
+        """
+        Draws every queued string and clears the queue.
+
+        The strings are drawn over the whole window with an orthographic projection, without lighting or depth
+        testing, and the OpenGL state is restored afterwards.
+        """
+
+        if not self.pending:
+            return
+        vertices = np.ascontiguousarray(np.concatenate(self.pending))
+        self.pending = []
+        if not self.atlas.texture:
+            self.atlas.upload()
+
+        begin_overlay(self.width, self.height)
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, self.atlas.texture)
+        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_REPLACE)
+        glInterleavedArrays(GL_T2F_V3F, 0, vertices)
+        glDrawArrays(GL_QUADS, 0, len(vertices))
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        end_overlay()
+
+    def free(self):
+        """
+        Deletes the OpenGL resources of the HUD.
+        """
+
+        self.atlas.free()
+        self.cache = {}
+        self.pending = []
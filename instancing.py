@@ -0,0 +1,431 @@
+import ctypes
+from math import sin, cos, radians
+
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.GL.shaders import compileShader
+
+# The first generic attribute location of the per-instance model matrix. A mat4 attribute takes four consecutive
+# locations, and 4-7 do not alias any of the conventional vertex arrays used by the fixed function pipeline.
+INSTANCE_MATRIX_LOCATION = 4
+
+VERTEX_SHADER = """
+#version 120
+
+attribute mat4 instance_matrix;
+
+varying vec4 color;
+varying vec2 texcoord;
+
+void main()
+{
+    vec4 eye = gl_ModelViewMatrix * instance_matrix * gl_Vertex;
+    vec3 normal = normalize(gl_NormalMatrix * mat3(instance_matrix) * gl_Normal);
+
+    vec4 lit = gl_LightModel.ambient * gl_Color;
+    for (int i = 0; i < 2; i++) {
+        vec3 to_light = normalize(gl_LightSource[i].position.xyz - eye.xyz);
+        lit += gl_LightSource[i].ambient * gl_Color;
+        lit += gl_LightSource[i].diffuse * gl_Color * max(dot(normal, to_light), 0.0);
+    }
+
+    color = vec4(lit.rgb, gl_Color.a);
+    texcoord = gl_MultiTexCoord0.xy;
+    gl_Position = gl_ProjectionMatrix * eye;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 120
+
+uniform sampler2D diffuse_map;
+uniform bool textured;
+
+varying vec4 color;
+varying vec2 texcoord;
+
+void main()
+{
+    gl_FragColor = textured ? color * texture2D(diffuse_map, texcoord) : color;
+}
+"""
+
+
+def transform_matrix(position, rotation, scaling=1):
+    """
+    Builds the model matrix of an object placed in the 3D space.
+
+    The matrix is the same one OBJ.render() and MeshInstance.render() build with glTranslatef, three glRotatef calls
+    and glScalef.
+
+    Parameters:
+    position (list): The x, y, and z coordinates of the object's position.
+    rotation (list): The object's rotation angles around the x, y and z axes, in degrees.
+    scaling (float): The object's uniform scale factor. Defaults to 1.
+
+    Returns:
+    ndarray: A 4x4 float32 matrix in OpenGL's column-major order, ready for glMultMatrixf.
+    """
+
+    ax, ay, az = (radians(angle) for angle in rotation)
+    rotate_x = np.array([[1, 0, 0], [0, cos(ax), -sin(ax)], [0, sin(ax), cos(ax)]])
+    rotate_y = np.array([[cos(ay), 0, sin(ay)], [0, 1, 0], [-sin(ay), 0, cos(ay)]])
+    rotate_z = np.array([[cos(az), -sin(az), 0], [sin(az), cos(az), 0], [0, 0, 1]])
+
+    matrix = np.identity(4)
+    matrix[:3, :3] = rotate_x @ rotate_y @ rotate_z * scaling
+    matrix[:3, 3] = position
+    return matrix.T.astype(np.float32)
+
+
+def pack_transforms(instances):
+    """
+    Packs the transforms of a list of mesh instances into a single array.
+
+    Parameters:
+    instances (list): A list of MeshInstance objects.
+
+    Returns:
+    ndarray: An (N, 4, 4) float32 array holding each instance's model matrix in OpenGL's column-major order.
+    """
+
+    transforms = np.empty((len(instances), 4, 4), dtype=np.float32)
+    for i, instance in enumerate(instances):
+        transforms[i] = transform_matrix(instance.position, instance.rotation, instance.scaling)
+    return transforms
+
+
+def instancing_supported():
+    """
+    Checks if the current OpenGL context can draw instanced arrays.
+
+    Returns:
+    bool: True if shaders, instanced draws and per-instance vertex attributes are all available, False otherwise.
+    """
+
+    return bool(glCreateProgram) and bool(glDrawElementsInstanced) and bool(glVertexAttribDivisor)
+
+
+class InstancedRenderer:
+    """
+    A class to draw many copies of a shared mesh in a single batch.
+
+    When the OpenGL context supports instanced arrays, every copy is drawn from the mesh's own vertex and index buffers
+    by one glDrawElementsInstanced call per material, with the model matrices streamed as a per-instance vertex
+    attribute. Otherwise every copy is transformed once on the CPU and merged into one static vertex buffer, drawn with
+    one glDrawElements call per material.
+
+    ...
+
+    Attributes
+    ----------
+    mesh : OBJ
+        the shared mesh drawn by the renderer
+    transforms : ndarray
+        an (N, 4, 4) float32 array holding the model matrix of each copy in OpenGL's column-major order
+    instanced : bool
+        whether the renderer draws with instanced arrays, or None until the first draw
+    batches : list
+        a list of (material, first, count) tuples giving the range of indices drawn with each material
+    vbo : int
+        the ID of the vertex buffer holding the merged copies, when instanced arrays are not available
+    ibo : int
+        the ID of the index buffer holding the merged copies, when instanced arrays are not available
+    instance_vbo : int
+        the ID of the vertex buffer holding the per-instance model matrices
+    program : int
+        the ID of the shader program used by the instanced path
+    selection : ndarray
+        the indices of the copies whose matrices are in the per-instance buffer, or None if it holds every copy
+
+    Methods
+    -------
+    update(transforms):
+        Replaces the transforms of the copies.
+    stream(transforms):
+        Replaces the transforms of copies that move every frame.
+    compile_program():
+        Compiles and links the shader program used by the instanced path.
+    merge(data, indices, batches):
+        Transforms the mesh's vertices by every copy's model matrix and merges the results.
+    upload():
+        Uploads the mesh and the transforms to OpenGL buffers.
+    select(visible):
+        Fills the per-instance buffer with the matrices of some of the copies.
+    copy_runs(visible):
+        Groups the indices of the copies to draw into runs of consecutive copies.
+    bind_instance_matrices():
+        Points the per-instance model matrix attribute at the transforms buffer.
+    unbind_instance_matrices():
+        Disables the per-instance model matrix attribute.
+    draw(visible=None):
+        Draws every copy of the mesh, or some of them.
+    free():
+        Deletes the renderer's OpenGL resources.
+    """
+
+    def __init__(self, mesh, transforms):
+        """
+        Constructs all the necessary attributes for the instanced renderer object.
+
+        Parameters:
+        mesh (OBJ): The shared mesh to draw.
+        transforms (ndarray): An (N, 4, 4) array holding the model matrix of each copy in OpenGL's column-major order.
+        """
+
+        self.mesh = mesh
+        self.transforms = np.ascontiguousarray(transforms, dtype=np.float32).reshape(-1, 4, 4)
+        self.instanced = None
+        self.batches = []
+        self.vbo = 0
+        self.ibo = 0
+        self.instance_vbo = 0
+        self.program = 0
+        self.selection = None
+
+    def update(self, transforms):
+        """
+        Replaces the transforms of the copies.
+
+        The buffers are rebuilt on the next draw.
+
+        Parameters:
+        transforms (ndarray): An (N, 4, 4) array holding the model matrix of each copy in OpenGL's column-major order.
+        """
+
+        self.free()
+        self.transforms = np.ascontiguousarray(transforms, dtype=np.float32).reshape(-1, 4, 4)
+
+    def stream(self, transforms):
+        """
+        Replaces the transforms of copies that move every frame.
+
+        On the instanced path only the per-instance buffer is refilled, keeping the mesh's buffers and the shader
+        program. The merged fallback has no per-instance data, so its buffers are rebuilt on the next draw.
+
+        Parameters:
+        transforms (ndarray): An (N, 4, 4) array holding the model matrix of each copy in OpenGL's column-major order.
+        """
+
+        if not self.instanced:
+            self.update(transforms)
+            return
+        self.transforms = np.ascontiguousarray(transforms, dtype=np.float32).reshape(-1, 4, 4)
+        self.selection = None
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.transforms.nbytes, self.transforms, GL_STREAM_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def compile_program(self):
+        """
+        Compiles and links the shader program used by the instanced path.
+
+        Returns:
+        int: The ID of the linked shader program.
+        """
+
+        program = glCreateProgram()
+        glAttachShader(program, compileShader(VERTEX_SHADER, GL_VERTEX_SHADER))
+        glAttachShader(program, compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER))
+        glBindAttribLocation(program, INSTANCE_MATRIX_LOCATION, 'instance_matrix')
+        glLinkProgram(program)
+        if not glGetProgramiv(program, GL_LINK_STATUS):
+            raise RuntimeError(glGetProgramInfoLog(program))
+        return program
+
+    def merge(self, data, indices, batches):
+        """
+        Transforms the mesh's vertices by every copy's model matrix and merges the results.
+
+        The indices of every copy are kept together by material, so each material is still drawn with a single call.
+
+        Parameters:
+        data (ndarray): The mesh's vertices as s, t, nx, ny, nz, x, y, z float32 rows.
+        indices (ndarray): The mesh's uint32 triangle indices.
+        batches (list): A list of (material, first, count) tuples giving the range of indices of each material.
+
+        Returns:
+        tuple: The (data, indices, batches) of every copy, in the same layout.
+        """
+
+        matrices = self.transforms.transpose(0, 2, 1)
+        linear = matrices[:, :3, :3]
+        positions = np.einsum('nij,vj->nvi', linear, data[:, 5:8]) + matrices[:, None, :3, 3]
+        normals = np.einsum('nij,vj->nvi', linear, data[:, 2:5])
+        normals /= np.maximum(np.linalg.norm(normals, axis=2, keepdims=True), 1e-12)
+        texcoords = np.broadcast_to(data[:, 0:2], (len(matrices),) + data[:, 0:2].shape)
+        merged_data = np.concatenate((texcoords, normals, positions), axis=2).reshape(-1, 8).astype(np.float32)
+
+        offsets = (np.arange(len(matrices), dtype=np.uint32) * len(data))[:, None]
+        merged_indices = []
+        merged_batches = []
+        first_index = 0
+        for material, first, count in batches:
+            merged_indices.append((indices[first:first + count][None, :] + offsets).reshape(-1))
+            merged_batches.append((material, first_index, count * len(matrices)))
+            first_index += count * len(matrices)
+        return merged_data, np.concatenate(merged_indices).astype(np.uint32), merged_batches
+
+    def upload(self):
+        """
+        Uploads the mesh and the transforms to OpenGL buffers.
+
+        The instanced path is picked when the context supports it, falling back to merged static buffers otherwise.
+        """
+
+        self.instanced = instancing_supported()
+        if self.instanced:
+            if not self.mesh.vbo:
+                self.mesh.generate()
+            self.batches = self.mesh.batches
+            self.program = self.compile_program()
+            self.instance_vbo = glGenBuffers(1)
+            glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+            glBufferData(GL_ARRAY_BUFFER, self.transforms.nbytes, self.transforms, GL_STATIC_DRAW)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+            return
+
+        data, indices, self.batches = self.merge(*self.mesh.indexed_arrays())
+        self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.ibo = glGenBuffers(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def select(self, visible):
+        """
+        Fills the per-instance buffer with the matrices of some of the copies.
+
+        The buffer is only refilled when the selection changes.
+
+        Parameters:
+        visible (ndarray): The indices of the copies to draw, or None for every copy.
+        """
+
+        if visible is None and self.selection is None:
+            return
+        if visible is not None and self.selection is not None and np.array_equal(visible, self.selection):
+            return
+        transforms = self.transforms if visible is None else np.ascontiguousarray(self.transforms[visible])
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        glBufferData(GL_ARRAY_BUFFER, transforms.nbytes, transforms, GL_STREAM_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.selection = None if visible is None else np.array(visible)
+
+    def copy_runs(self, visible):
+        """
+        Groups the indices of the copies to draw into runs of consecutive copies.
+
+        In the merged fallback every material holds the copies one after the other, so a run of copies is a single
+        range of indices.
+
+        Parameters:
+        visible (ndarray): The sorted indices of the copies to draw, or None for every copy.
+
+        Returns:
+        list: A list of (first copy, copy count) tuples.
+        """
+
+        if visible is None:
+            return [(0, len(self.transforms))]
+        visible = np.asarray(visible)
+        breaks = np.flatnonzero(np.diff(visible) != 1) + 1
+        starts = np.concatenate(([0], breaks))
+        ends = np.concatenate((breaks, [len(visible)]))
+        return [(int(visible[start]), int(end - start)) for start, end in zip(starts, ends)]
+
+    def bind_instance_matrices(self):
+        """
+        Points the per-instance model matrix attribute at the transforms buffer.
+        """
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        for column in range(4):
+            location = INSTANCE_MATRIX_LOCATION + column
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(location, 4, GL_FLOAT, GL_FALSE, 64, ctypes.c_void_p(16 * column))
+            glVertexAttribDivisor(location, 1)
+
+    def unbind_instance_matrices(self):
+        """
+        Disables the per-instance model matrix attribute.
+        """
+
+        for column in range(4):
+            location = INSTANCE_MATRIX_LOCATION + column
+            glVertexAttribDivisor(location, 0)
+            glDisableVertexAttribArray(location)
+
+    def draw(self, visible=None):
+        """
+        Draws every copy of the mesh, or some of them.
+
+        The buffers are uploaded on the first call, so the renderer can be created before an OpenGL context exists.
+
+        Parameters:
+        visible (ndarray): The sorted indices of the copies to draw, such as the ones inside a view frustum. Defaults
+        to None, in which case every copy is drawn.
+        """
+
+        if not len(self.transforms) or (visible is not None and not len(visible)):
+            return
+        if self.instanced is None:
+            self.upload()
+
+        if self.instanced:
+            self.select(visible)
+            instance_count = len(self.transforms) if visible is None else len(visible)
+            glUseProgram(self.program)
+            self.bind_instance_matrices()
+            glUniform1i(glGetUniformLocation(self.program, 'diffuse_map'), 0)
+            textured_location = glGetUniformLocation(self.program, 'textured')
+
+        glEnable(GL_TEXTURE_2D)
+        glBindBuffer(GL_ARRAY_BUFFER, self.mesh.vbo if self.instanced else self.vbo)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.mesh.ibo if self.instanced else self.ibo)
+        glInterleavedArrays(GL_T2F_N3F_V3F, 0, None)
+        for material, first, count in self.batches:
+            self.mesh.apply_material(material)
+            offset = ctypes.c_void_p(first * 4)
+            if self.instanced:
+                glUniform1i(textured_location, 'texture_Kd' in self.mesh.mtl[material])
+                glDrawElementsInstanced(GL_TRIANGLES, count, GL_UNSIGNED_INT, offset, instance_count)
+            else:
+                copy_count = count // len(self.transforms)
+                for first_copy, copies in self.copy_runs(visible):
+                    offset = ctypes.c_void_p((first + first_copy * copy_count) * 4)
+                    glDrawElements(GL_TRIANGLES, copies * copy_count, GL_UNSIGNED_INT, offset)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisable(GL_TEXTURE_2D)
+
+        if self.instanced:
+            self.unbind_instance_matrices()
+            glUseProgram(0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def free(self):
+        """
+        Deletes the renderer's OpenGL resources.
+        """
+
+        self.batches = []
+        if self.vbo:
+            glDeleteBuffers(1, [self.vbo])
+            self.vbo = 0
+        if self.ibo:
+            glDeleteBuffers(1, [self.ibo])
+            self.ibo = 0
+        if self.instance_vbo:
+            glDeleteBuffers(1, [self.instance_vbo])
+            self.instance_vbo = 0
+        if self.program:
+            glDeleteProgram(self.program)
+            self.program = 0
+        self.selection = None
+        self.instanced = None
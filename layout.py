@@ -0,0 +1,32 @@
+from math import ceil
+
+
+def viewport_layout(player_count, width, height):
+    """
+    Splits the screen into one viewport per player.
+
+    One or two players share a single row, as in the original single player and split screen modes. Three or four
+    players get two rows, the first player's at the top, and the viewports of an incomplete last row are widened to
+    fill it.
+
+    Parameters:
+    player_count (int): The number of players.
+    width (int): The width of the screen, in pixels.
+    height (int): The height of the screen, in pixels.
+
+    Returns:
+    list: A list of [x, y, width, height] viewports, one for each player, with y measured from the bottom of the
+    screen as OpenGL does.
+    """
+
+    rows = 1 if player_count <= 2 else 2
+    columns = ceil(player_count / rows)
+    row_height = height // rows
+    viewports = []
+    for row in range(rows):
+        count = min(columns, player_count - row * columns)
+        column_width = width // count
+        y = height - (row + 1) * row_height
+        for column in range(count):
+            viewports.append([column * column_width, y, column_width, row_height])
+    return viewports
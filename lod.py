@@ -0,0 +1,702 @@
+import ctypes
+import os
+import sys
+import zipfile
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+from instancing import InstancedRenderer
+from objLoader import CACHE_DIR, OBJ
+
+# The version of the level of detail cache format, bumped whenever the simplification or the stored arrays change
+LOD_VERSION = 1
+
+# The number of clustering cells along the longest side of the mesh for each simplified level
+LOD_DIVISIONS = (12, 5)
+
+# The smallest on-screen diameter, in pixels, each mesh level is drawn at. Anything smaller is drawn as an impostor.
+LOD_PIXEL_SIZES = (120, 40, 12)
+
+# The width and height, in pixels, of each view of an impostor texture
+IMPOSTOR_SIZE = 64
+
+# The direction of the light baked into the impostor textures
+IMPOSTOR_LIGHT = np.array([0.4, 0.8, 0.45]) / np.linalg.norm([0.4, 0.8, 0.45])
+
+
+def cluster_vertices(data, indices, batches, divisions):
+    """
+    Simplifies an indexed mesh by merging the vertices that fall in the same cell of a uniform grid.
+
+    Each cluster is replaced by the average of its vertices, and the triangles that collapse to a line or a point are
+    dropped. Vertices of different materials are never merged, so every material keeps its own batch.
+
+    Parameters:
+    data (ndarray): The mesh's vertices as s, t, nx, ny, nz, x, y, z float32 rows.
+    indices (ndarray): The mesh's uint32 triangle indices.
+    batches (list): A list of (material, first, count) tuples giving the range of indices of each material.
+    divisions (int): The number of grid cells along the longest side of the mesh's bounding box.
+
+    Returns:
+    tuple: The simplified (data, indices, batches), in the same layout.
+    """
+
+    positions = data[:, 5:8].astype(np.float64)
+    minimum = positions.min(axis=0) if len(positions) else np.zeros(3)
+    extent = (positions.max(axis=0) - minimum).max() if len(positions) else 0
+    cell_size = max(extent / divisions, 1e-9)
+    cells = np.floor((positions - minimum) / cell_size).astype(np.int64)
+
+    merged_data = []
+    merged_indices = []
+    merged_batches = []
+    vertex_count = 0
+    first_index = 0
+    for material, first, count in batches:
+        triangles = indices[first:first + count].reshape(-1, 3)
+        used = np.unique(triangles)
+        keys, cluster = np.unique(cells[used], axis=0, return_inverse=True)
+        cluster = cluster.reshape(-1)
+        remap = np.zeros(len(data), dtype=np.int64)
+        remap[used] = cluster
+
+        sums = np.zeros((len(keys), 8))
+        np.add.at(sums, cluster, data[used].astype(np.float64))
+        averages = sums / np.bincount(cluster, minlength=len(keys))[:, None]
+        averages[:, 2:5] /= np.maximum(np.linalg.norm(averages[:, 2:5], axis=1, keepdims=True), 1e-12)
+
+        triangles = remap[triangles]
+        kept = ((triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) &
+                (triangles[:, 0] != triangles[:, 2]))
+        triangles = triangles[kept]
+        if not len(triangles):
+            continue
+        merged_data.append(averages)
+        merged_indices.append((triangles + vertex_count).reshape(-1))
+        merged_batches.append((material, first_index, triangles.size))
+        vertex_count += len(averages)
+        first_index += triangles.size
+
+    if not merged_data:
+        return np.zeros((0, 8), dtype=np.float32), np.zeros(0, dtype=np.uint32), []
+    return (np.concatenate(merged_data).astype(np.float32), np.concatenate(merged_indices).astype(np.uint32),
+            merged_batches)
+
+
+def material_color(mtl, dirname):
+    """
+    Gets the flat colour a material is painted with in an impostor.
+
+    Parameters:
+    mtl (dict): The material, as loaded from its MTL file.
+    dirname (str): The directory of the MTL file, which texture paths are relative to.
+
+    Returns:
+    ndarray: The r, g and b colour of the material, from 0 to 1.
+    """
+
+    if 'map_Kd' in mtl:
+        try:
+            surface = pygame.image.load(os.path.join(dirname, mtl['map_Kd']))
+            pixels = np.frombuffer(pygame.image.tostring(surface, 'RGB'), dtype=np.uint8).reshape(-1, 3)
+            return pixels.mean(axis=0) / 255
+        except (pygame.error, OSError):
+            return np.array([0.5, 0.5, 0.5])
+    return np.array(mtl.get('Kd', [1, 1, 1])[:3], dtype=np.float64)
+
+
+def rasterize(points, colors, size):
+    """
+    Draws flat shaded triangles into an RGBA image, keeping the closest triangle at each pixel.
+
+    Parameters:
+    points (ndarray): A (T, 3, 3) array of the triangles' corners, as u and v pixel coordinates and a depth that grows
+    towards the viewer.
+    colors (ndarray): A (T, 3) array of the triangles' r, g and b colours, from 0 to 1.
+    size (int): The width and height of the image.
+
+    Returns:
+    ndarray: A (size, size, 4) uint8 image, transparent where no triangle was drawn, with its first row at v = 0.
+    """
+
+    image = np.zeros((size, size, 4), dtype=np.uint8)
+    depth = np.full((size, size), -np.inf)
+    for (a, b, c), color in zip(points, colors):
+        low = np.maximum(np.floor(np.minimum(np.minimum(a, b), c)[:2]).astype(int), 0)
+        high = np.minimum(np.ceil(np.maximum(np.maximum(a, b), c)[:2]).astype(int), size)
+        if (high <= low).any():
+            continue
+        u, v = np.meshgrid(np.arange(low[0], high[0]) + 0.5, np.arange(low[1], high[1]) + 0.5)
+        area = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+        if abs(area) < 1e-12:
+            continue
+        w_b = ((u - a[0]) * (c[1] - a[1]) - (v - a[1]) * (c[0] - a[0])) / area
+        w_c = ((b[0] - a[0]) * (v - a[1]) - (b[1] - a[1]) * (u - a[0])) / area
+        w_a = 1 - w_b - w_c
+        z = w_a * a[2] + w_b * b[2] + w_c * c[2]
+        region = depth[low[1]:high[1], low[0]:high[0]]
+        covered = (w_a >= 0) & (w_b >= 0) & (w_c >= 0) & (z > region)
+        region[covered] = z[covered]
+        image[low[1]:high[1], low[0]:high[0]][covered] = np.append(np.round(color * 255), 255).astype(np.uint8)
+    return image
+
+
+def render_impostor(mesh, data, indices, batches, size=IMPOSTOR_SIZE):
+    """
+    Renders a mesh into an impostor: two crossed quads textured with the mesh seen from the front and from the side.
+
+    The mesh is drawn on the CPU with an orthographic projection, one flat shaded colour per material and the light
+    of IMPOSTOR_LIGHT, so no OpenGL context is needed. The crossed quads look the same from every horizontal
+    direction, so they can be drawn like any other mesh, without turning them towards the camera.
+
+    Parameters:
+    mesh (OBJ): The mesh, whose materials and bounding box are used.
+    data (ndarray): The mesh's vertices as s, t, nx, ny, nz, x, y, z float32 rows.
+    indices (ndarray): The mesh's uint32 triangle indices.
+    batches (list): A list of (material, first, count) tuples giving the range of indices of each material.
+    size (int): The width and height, in pixels, of each view. Defaults to IMPOSTOR_SIZE.
+
+    Returns:
+    tuple: An (image, data, indices) tuple, where image is a (size, 2 * size, 4) uint8 texture holding the front view
+    on its left half and the side view on its right half, and data and indices are the crossed quads in the layout
+    of indexed_arrays().
+    """
+
+    minimum = np.array(mesh.bounding_box[0], dtype=np.float64)
+    maximum = np.array(mesh.bounding_box[1], dtype=np.float64)
+    extent = np.maximum(maximum - minimum, 1e-9)
+    middle = (minimum + maximum) / 2
+    dirname = os.path.dirname(mesh.mtllibs[0]) if mesh.mtllibs else ''
+
+    triangles = data[indices.reshape(-1, 3), 5:8].astype(np.float64)
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+    shade = 0.35 + 0.65 * np.abs(normals @ IMPOSTOR_LIGHT)
+    colors = np.zeros((len(triangles), 3))
+    for material, first, count in batches:
+        mtl = mesh.mtl.get(material, {})
+        colors[first // 3:(first + count) // 3] = material_color(mtl, dirname)
+    colors = np.clip(colors * shade[:, None], 0, 1)
+
+    scaled = (triangles - minimum) / extent * size
+    # The front view looks along -z with x to the right, the side view looks along -x with z to the right
+    front = rasterize(np.stack((scaled[..., 0], scaled[..., 1], triangles[..., 2]), axis=2), colors, size)
+    side = rasterize(np.stack((scaled[..., 2], scaled[..., 1], triangles[..., 0]), axis=2), colors, size)
+    image = np.concatenate((front, side), axis=1)
+
+    (x0, y0, z0), (x1, y1, z1) = minimum, maximum
+    quads = np.array([
+        [0, 0, 0, 0, 1, x0, y0, middle[2]], [0.5, 0, 0, 0, 1, x1, y0, middle[2]],
+        [0.5, 1, 0, 0, 1, x1, y1, middle[2]], [0, 1, 0, 0, 1, x0, y1, middle[2]],
+        [0.5, 0, 1, 0, 0, middle[0], y0, z0], [1, 0, 1, 0, 0, middle[0], y0, z1],
+        [1, 1, 1, 0, 0, middle[0], y1, z1], [0.5, 1, 1, 0, 0, middle[0], y1, z0],
+    ], dtype=np.float32)
+    quad_indices = np.array([0, 1, 2, 0, 2, 3, 4, 5, 6, 4, 6, 7], dtype=np.uint32)
+    return image, quads, quad_indices
+
+
+class MeshLevel:
+    """
+    A class to represent a simplified level of detail of an OBJ mesh, or its impostor.
+
+    A level can be drawn on its own or through an InstancedRenderer, in place of the mesh it was built from. It shares
+    that mesh's materials and bounds, except for an impostor, which carries its own texture.
+
+    ...
+
+    Attributes
+    ----------
+    source : OBJ
+        the mesh the level was built from
+    data : ndarray
+        the level's vertices as s, t, nx, ny, nz, x, y, z float32 rows
+    indices : ndarray
+        the level's uint32 triangle indices
+    batches : list
+        a list of (material, first, count) tuples giving the range of indices drawn with each material
+    image : ndarray
+        the RGBA texture of an impostor, or None for a simplified mesh
+    mtl : dict
+        a dictionary containing the level's materials
+    vbo : int
+        the ID of the OpenGL vertex buffer holding the level's vertices
+    ibo : int
+        the ID of the OpenGL index buffer holding the level's triangles
+    texture : int
+        the ID of the OpenGL texture of an impostor
+    bounding_box : tuple
+        the (min, max) corners of the source mesh's bounding box, in local space
+    bounding_radius : float
+        the radius of the source mesh's bounding sphere
+
+    Methods
+    -------
+    indexed_arrays():
+        Gets the level's vertices, indices and batches.
+    triangle_count():
+        Gets the number of triangles in the level.
+    upload_texture():
+        Uploads the impostor's texture to OpenGL.
+    generate():
+        Uploads the level's vertex and index buffers to OpenGL.
+    apply_material(material):
+        Sets up the OpenGL state for drawing with one of the level's materials.
+    draw():
+        Draws the level's mesh, with one draw call for each material.
+    free():
+        Deletes the level's OpenGL resources.
+    """
+
+    def __init__(self, source, data, indices, batches, image=None):
+        """
+        Constructs all the necessary attributes for the mesh level object.
+
+        Parameters:
+        source (OBJ): The mesh the level was built from.
+        data (ndarray): The level's vertices as s, t, nx, ny, nz, x, y, z float32 rows.
+        indices (ndarray): The level's uint32 triangle indices.
+        batches (list): A list of (material, first, count) tuples giving the range of indices of each material.
+        image (ndarray): The RGBA texture of an impostor. Defaults to None, for a simplified mesh.
+        """
+
+        self.source = source
+        self.data = np.ascontiguousarray(data, dtype=np.float32)
+        self.indices = np.ascontiguousarray(indices, dtype=np.uint32)
+        self.batches = list(batches)
+        self.image = image
+        self.mtl = source.mtl if image is None else {'impostor': {'Kd': [1, 1, 1]}}
+        self.vbo = 0
+        self.ibo = 0
+        self.texture = 0
+        self.bounding_box = source.bounding_box
+        self.bounding_radius = source.bounding_radius
+
+    def indexed_arrays(self):
+        """
+        Gets the level's vertices, indices and batches.
+
+        Returns:
+        tuple: A (data, indices, batches) tuple in the layout of OBJ.indexed_arrays().
+        """
+
+        return self.data, self.indices, self.batches
+
+    def triangle_count(self):
+        """
+        Gets the number of triangles in the level.
+
+        Returns:
+        int: The number of triangles drawn for the level.
+        """
+
+        return len(self.indices) // 3
+
+    def upload_texture(self):
+        """
+        Uploads the impostor's texture to OpenGL.
+        """
+
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.image.shape[1], self.image.shape[0], 0, GL_RGBA,
+                     GL_UNSIGNED_BYTE, np.ascontiguousarray(self.image))
+        self.mtl['impostor']['texture_Kd'] = self.texture
+
+    def generate(self):
+        """
+        Uploads the level's vertex and index buffers to OpenGL.
+        """
+
+        self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.data.nbytes, self.data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.ibo = glGenBuffers(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.indices.nbytes, self.indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def apply_material(self, material):
+        """
+        Sets up the OpenGL state for drawing with one of the level's materials.
+
+        The impostor's texture is uploaded on first use, so the level can be built before an OpenGL context exists.
+
+        Parameters:
+        material (str): The name of the material.
+        """
+
+        if self.image is None:
+            self.source.apply_material(material)
+            return
+        if not self.texture:
+            self.upload_texture()
+        glColor(1, 1, 1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+
+    def draw(self):
+        """
+        Draws the level's mesh, with one draw call for each material.
+
+        The buffers are uploaded on the first call. The transparent pixels of an impostor are discarded with the alpha
+        test, and its texture is unbound afterwards so it does not leak onto untextured materials.
+        """
+
+        if not self.vbo:
+            self.generate()
+        if self.image is not None:
+            glEnable(GL_ALPHA_TEST)
+            glAlphaFunc(GL_GREATER, 0.5)
+        glEnable(GL_TEXTURE_2D)
+        glFrontFace(GL_CCW)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glInterleavedArrays(GL_T2F_N3F_V3F, 0, None)
+        for material, first, count in self.batches:
+            self.apply_material(material)
+            glDrawElements(GL_TRIANGLES, count, GL_UNSIGNED_INT, ctypes.c_void_p(first * 4))
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisable(GL_TEXTURE_2D)
+        if self.image is not None:
+            glBindTexture(GL_TEXTURE_2D, 0)
+            glDisable(GL_ALPHA_TEST)
+
+    def free(self):
+        """
+        Deletes the level's OpenGL resources.
+        """
+
+        if self.vbo:
+            glDeleteBuffers(1, [self.vbo])
+            self.vbo = 0
+        if self.ibo:
+            glDeleteBuffers(1, [self.ibo])
+            self.ibo = 0
+        if self.texture:
+            glDeleteTextures([self.texture])
+            self.texture = 0
+            del self.mtl['impostor']['texture_Kd']
+
+
+class LodSet:
+    """
+    A class to represent the levels of detail of a mesh, from the full mesh down to its impostor.
+
+    The simplified levels and the impostor are built from the loaded OBJ data and cached next to the OBJ file, in
+    the same directory as its parsed arrays, so they are only rebuilt when the OBJ file changes.
+
+    ...
+
+    Attributes
+    ----------
+    source : OBJ
+        the full detail mesh
+    levels : list
+        the meshes of each level, from the full mesh at index 0 to the impostor at the end
+    pixel_sizes : tuple
+        the smallest on-screen diameter, in pixels, each mesh level is drawn at
+
+    Methods
+    -------
+    cachePath(filename, swapyz=False):
+        Gets the path of the levels of detail cache of an OBJ file.
+    cacheKey(mesh, filename):
+        Builds the key identifying the current contents of a mesh's OBJ, MTL and texture files.
+    build(mesh):
+        Builds the simplified levels and the impostor of a mesh.
+    load(mesh, filename, swapyz=False):
+        Loads the levels of detail of a mesh, from their cache when it is up to date.
+    select(centers, radii, frustum):
+        Picks the level to draw for objects from their on-screen size.
+    free():
+        Deletes the OpenGL resources of the simplified levels and the impostor.
+    """
+
+    def __init__(self, source, levels, pixel_sizes=LOD_PIXEL_SIZES):
+        """
+        Constructs all the necessary attributes for the level of detail set object.
+
+        Parameters:
+        source (OBJ): The full detail mesh.
+        levels (list): The simplified levels followed by the impostor, as MeshLevel objects.
+        pixel_sizes (tuple): The smallest on-screen diameter, in pixels, each mesh level is drawn at. Defaults to
+        LOD_PIXEL_SIZES.
+        """
+
+        self.source = source
+        self.levels = [source] + list(levels)
+        self.pixel_sizes = pixel_sizes
+
+    @classmethod
+    def cachePath(cls, filename, swapyz=False):
+        """
+        Gets the path of the levels of detail cache of an OBJ file.
+
+        Parameters:
+        filename (str): The path to the OBJ file.
+        swapyz (bool): Whether the y and z coordinates are swapped. Defaults to False.
+
+        Returns:
+        str: The path to the cache file.
+        """
+
+        dirname, basename = os.path.split(filename)
+        suffix = '.swapyz' if swapyz else ''
+        return os.path.join(dirname, CACHE_DIR, basename + suffix + '.lod.npz')
+
+    @classmethod
+    def cacheKey(cls, mesh, filename):
+        """
+        Builds the key identifying the current contents of a mesh's OBJ, MTL and texture files.
+
+        The impostor is painted with the colours of the materials and the average colour of their textures, so editing
+        any of them makes the cache stale. A file that cannot be found is keyed as missing.
+
+        Parameters:
+        mesh (OBJ): The full detail mesh.
+        filename (str): The path to the mesh's OBJ file.
+
+        Returns:
+        ndarray: An int64 array holding the OBJ cache key, the level of detail settings, and the size and modification
+        time of every MTL and texture file.
+        """
+
+        dirname = os.path.dirname(mesh.mtllibs[0]) if mesh.mtllibs else ''
+        textures = sorted({os.path.join(dirname, mtl['map_Kd']) for mtl in mesh.mtl.values() if 'map_Kd' in mtl})
+        key = [OBJ.cacheKey(filename), [LOD_VERSION, IMPOSTOR_SIZE], LOD_DIVISIONS]
+        for path in list(mesh.mtllibs) + textures:
+            try:
+                stat = os.stat(path)
+                key.append([stat.st_size, stat.st_mtime_ns])
+            except OSError:
+                key.append([-1, -1])
+        return np.concatenate(key).astype(np.int64)
+
+    @classmethod
+    def build(cls, mesh):
+        """
+        Builds the simplified levels and the impostor of a mesh.
+
+        Parameters:
+        mesh (OBJ): The full detail mesh.
+
+        Returns:
+        list: The simplified levels followed by the impostor, as MeshLevel objects.
+        """
+
+        data, indices, batches = mesh.indexed_arrays()
+        levels = [MeshLevel(mesh, *cluster_vertices(data, indices, batches, divisions)) for divisions in LOD_DIVISIONS]
+        image, quads, quad_indices = render_impostor(mesh, data, indices, batches)
+        levels.append(MeshLevel(mesh, quads, quad_indices, [('impostor', 0, len(quad_indices))], image))
+        return levels
+
+    @classmethod
+    def load(cls, mesh, filename, swapyz=False):
+        """
+        Loads the levels of detail of a mesh, from their cache when it is up to date.
+
+        When the cache is missing or stale, the levels are built and the cache is rewritten. Failing to write the cache
+        is not an error, the levels are then simply built again on the next load.
+
+        Parameters:
+        mesh (OBJ): The full detail mesh.
+        filename (str): The path to the mesh's OBJ file.
+        swapyz (bool): Whether the mesh was loaded with the y and z coordinates swapped. Defaults to False.
+
+        Returns:
+        LodSet: The levels of detail of the mesh.
+        """
+
+        cache = cls.cachePath(filename, swapyz)
+        key = cls.cacheKey(mesh, filename)
+        try:
+            with np.load(cache) as cached:
+                if np.array_equal(cached['key'], key):
+                    levels = []
+                    for level in range(len(LOD_DIVISIONS) + 1):
+                        materials = [None if name == '' else str(name) for name in cached[f'materials{level}']]
+                        batches = list(zip(materials, cached[f'firsts{level}'].tolist(),
+                                           cached[f'counts{level}'].tolist()))
+                        image = cached['image'] if level == len(LOD_DIVISIONS) else None
+                        levels.append(MeshLevel(mesh, cached[f'data{level}'], cached[f'indices{level}'], batches,
+                                                image))
+                    return cls(mesh, levels)
+        except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile):
+            pass
+
+        levels = cls.build(mesh)
+        arrays = {'key': key, 'image': levels[-1].image}
+        for level, mesh_level in enumerate(levels):
+            arrays[f'data{level}'] = mesh_level.data
+            arrays[f'indices{level}'] = mesh_level.indices
+            arrays[f'materials{level}'] = np.array(['' if material is None else material
+                                                    for material, _, _ in mesh_level.batches], dtype=str)
+            arrays[f'firsts{level}'] = np.array([first for _, first, _ in mesh_level.batches], dtype=np.int64)
+            arrays[f'counts{level}'] = np.array([count for _, _, count in mesh_level.batches], dtype=np.int64)
+        try:
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+            with open(cache + '.tmp', 'wb') as file:
+                np.savez(file, **arrays)
+            os.replace(cache + '.tmp', cache)
+        except OSError:
+            pass
+        return cls(mesh, levels)
+
+    def select(self, centers, radii, frustum):
+        """
+        Picks the level to draw for objects from their on-screen size.
+
+        Parameters:
+        centers (ndarray): An (N, 3) array of the centers of the objects' bounding spheres.
+        radii (ndarray): The N radii of the objects' bounding spheres.
+        frustum (Frustum): The view frustum of the viewport, with its eye position and pixel scale.
+
+        Returns:
+        ndarray: The N indices in levels of the level to draw for each object.
+        """
+
+        sizes = frustum.pixel_sizes(centers, radii)
+        levels = np.searchsorted(-np.asarray(self.pixel_sizes, dtype=np.float64), -sizes, side='left')
+        return np.minimum(levels, len(self.levels) - 1)
+
+    def free(self):
+        """
+        Deletes the OpenGL resources of the simplified levels and the impostor.
+        """
+
+        for level in self.levels[1:]:
+            level.free()
+
+
+class LodRenderer:
+    """
+    A class to draw many copies of a shared mesh, each at the level of detail matching its size on screen.
+
+    Each level has its own InstancedRenderer, so every level costs one instanced draw per material.
+
+    ...
+
+    Attributes
+    ----------
+    lods : LodSet
+        the levels of detail of the shared mesh
+    centers : ndarray
+        an (N, 3) array of the center of each copy's bounding sphere
+    radii : ndarray
+        the radius of each copy's bounding sphere
+    kind : str
+        the kind of object the copies are counted as, such as 'trees'
+    renderers : list
+        the instanced renderer of each level
+
+    Methods
+    -------
+    update(transforms, centers, radii):
+        Replaces the copies.
+    draw(frustum=None, counter=None):
+        Draws the copies inside a view frustum, each at its level of detail.
+    free():
+        Deletes the OpenGL resources of every level's renderer.
+    """
+
+    def __init__(self, lods, transforms, centers, radii, kind='trees'):
+        """
+        Constructs all the necessary attributes for the level of detail renderer object.
+
+        Parameters:
+        lods (LodSet): The levels of detail of the shared mesh.
+        transforms (ndarray): An (N, 4, 4) array holding the model matrix of each copy in OpenGL's column-major order.
+        centers (ndarray): An (N, 3) array of the center of each copy's bounding sphere.
+        radii (ndarray): The radius of each copy's bounding sphere.
+        kind (str): The kind of object the copies are counted as. Defaults to 'trees'.
+        """
+
+        self.lods = lods
+        self.centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        self.radii = np.asarray(radii, dtype=np.float64)
+        self.kind = kind
+        self.renderers = [InstancedRenderer(level, transforms) for level in lods.levels]
+
+    def update(self, transforms, centers, radii):
+        """
+        Replaces the copies.
+
+        Only the per-instance buffers are refilled, so the levels' meshes and shader programs are kept.
+
+        Parameters:
+        transforms (ndarray): An (N, 4, 4) array holding the model matrix of each copy in OpenGL's column-major order.
+        centers (ndarray): An (N, 3) array of the center of each copy's bounding sphere.
+        radii (ndarray): The radius of each copy's bounding sphere.
+        """
+
+        self.centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        self.radii = np.asarray(radii, dtype=np.float64)
+        for renderer in self.renderers:
+            renderer.stream(transforms)
+
+    def draw(self, frustum=None, counter=None):
+        """
+        Draws the copies inside a view frustum, each at its level of detail.
+
+        Parameters:
+        frustum (Frustum): The view frustum of the current viewport. Defaults to None, in which case every copy is
+        drawn at full detail.
+        counter (CullCounter): The counter the drawn and culled copies are added to. Defaults to None.
+        """
+
+        if frustum is None:
+            self.renderers[0].draw()
+            return
+        visible = frustum.spheres_visible(self.centers, self.radii)
+        if counter is not None:
+            counter.count(self.kind, visible)
+        levels = self.lods.select(self.centers, self.radii, frustum)
+        for level, renderer in enumerate(self.renderers):
+            copies = np.flatnonzero(visible & (levels == level))
+            if not len(copies):
+                continue
+            impostor = getattr(renderer.mesh, 'image', None) is not None
+            if impostor:
+                glEnable(GL_ALPHA_TEST)
+                glAlphaFunc(GL_GREATER, 0.5)
+            renderer.draw(copies)
+            if impostor:
+                glBindTexture(GL_TEXTURE_2D, 0)
+                glDisable(GL_ALPHA_TEST)
+
+    def free(self):
+        """
+        Deletes the OpenGL resources of every level's renderer.
+        """
+
+        for renderer in self.renderers:
+            renderer.free()
+
+
+def main():
+    """
+    Builds and caches the levels of detail of the OBJ files given on the command line, and prints their sizes.
+
+    Returns:
+    int: 0 once every file has been processed.
+    """
+
+    for filename in sys.argv[1:]:
+        mesh = OBJ(filename, generate=False)
+        lods = LodSet.load(mesh, filename)
+        counts = [len(mesh.indexed_arrays()[1]) // 3] + [level.triangle_count() for level in lods.levels[1:]]
+        print(f"{filename}: {' / '.join(str(count) for count in counts)} triangles, cached in "
+              f"{LodSet.cachePath(filename)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
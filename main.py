@@ -1,40 +1,32 @@
+import os
+import sys
+from random import randrange
+
 import pygame as pg
 from OpenGL.GL import *
 from OpenGL.GLUT import *
 
+from assets import AssetManager
+from controls import KeyboardControls, PLAYER_BINDINGS
 from environment import Environment
-from objLoader import OBJ
-from player import Player
-
-
-def draw_text(x, y, text):
-    """
-    Function to draw text on an OpenGL display using Pygame and PyOpenGL.
-
-    Parameters:
-    x (int): The x-coordinate on the screen where the text will be drawn.
-    y (int): The y-coordinate on the screen where the text will be drawn.
-    text (str): The text to be rendered.
-
-    Returns:
-    None
-    """
-
-    # Create a Pygame font object with the default font and a size of 35
-    font = pg.font.Font(None, 35)
+from frustum import CullCounter, Frustum
+from ghost import GHOST_DIR, GhostRecorder, GhostRenderer
+from glstub import RecordingGL
+from hud import HudRenderer
+from layout import viewport_layout
+from player import MAX_PLAYERS, Player, START_POSITIONS, TICK_RATE, rank_players
+from profiler import PROFILE_FILE, FrameProfiler
+from replay import InputLog
 
-    # Render the text onto a Pygame surface with anti-aliasing enabled
-    # The text color is black (0, 0, 0) and the background color is white (255, 255, 255)
-    textSurface = font.render(text, True, (0, 0, 0), (255, 255, 255))
+# The longest frame the simulation catches up on, so a stall does not turn into a burst of simulation steps
+MAX_FRAME_TIME = 0.25
 
-    # Convert the Pygame surface to pixel data for OpenGL
-    textData = pg.image.tostring(textSurface, "RGBA", True)
+# The file the inputs of the last race are saved to on exit, to be replayed with replay.py
+REPLAY_FILE = 'last_race.rpl'
 
-    # Set the position for rasterizing 2D shapes in OpenGL
-    glWindowPos2d(x, y)
-
-    # Draw the pixel data onto the screen
-    glDrawPixels(textSurface.get_width(), textSurface.get_height(), GL_RGBA, GL_UNSIGNED_BYTE, textData)
+# The modules whose OpenGL calls are counted when the game is run with --count-gl, each as its own subsystem
+GL_COUNTED_MODULES = ('objLoader', 'mesh', 'instancing', 'lod', 'assets', 'environment', 'world', 'ghost', 'camera',
+                      'hud', 'profiler', __name__)
 
 
 def init():
@@ -69,6 +61,7 @@ def init():
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_LIGHTING)
     glEnable(GL_COLOR_MATERIAL)
+    glEnable(GL_NORMALIZE)
 
     # Setup light 0
     glEnable(GL_LIGHT0)
@@ -88,36 +81,83 @@ def init():
     glShadeModel(GL_SMOOTH)
 
 
-def render_scene(cameras, cars, trees, viewport, player_count):
+def render_scene(cameras, cars, trees, environment, viewport, player_count, ghosts=None, alpha=1, counters=None,
+                 profiler=None):
     """
     Renders the game scene for each player.
 
     This function sets up the view for each player's screen, and renders the cars and the environment onto the screen.
+    The cars, trees, track chunks and ghost cars outside each player's view frustum are skipped, and the cars and trees
+    inside it are drawn at the level of detail matching their size on screen. The translucent ghost cars are drawn
+    last, over the rest of the scene.
 
     Parameters:
     cameras (list): A list of camera objects for each player.
-    cars (list): A list of car objects to be rendered.
+    cars (list): A list of players whose cars are to be rendered.
     trees (list): A list of tree objects to be rendered.
+    environment (Environment): The game environment, holding the baked racetrack.
     viewport (list): A list of viewport dimensions for each player's screen.
     player_count (int): The number of players in the game.
+    ghosts (GhostRenderer): The ghost cars to render. Defaults to None.
+    alpha (float): How far between the last two simulation steps to place the ghost cars. Defaults to 1.
+    counters (list): A list of CullCounter objects for each player's screen, reset and filled with the number of
+    objects drawn and culled. Defaults to None.
+    profiler (FrameProfiler): The profiler timing each viewport as its own stage. Defaults to None.
 
     Returns:
     None
     """
-    # Set up the view for each player's screen
+    # Render each player's screen, timed as its own stage when profiling
     for i in range(player_count):
-        glViewport(*viewport[i])
-        cameras[i].apply()
+        counter = counters[i] if counters is not None else None
+        if profiler is None:
+            render_viewport(cameras[i], cars, trees, environment, viewport[i], ghosts, alpha, counter)
+            continue
+        with profiler.stage(f'render {i + 1}'):
+            render_viewport(cameras[i], cars, trees, environment, viewport[i], ghosts, alpha, counter)
+
+
+def render_viewport(camera, cars, trees, environment, viewport, ghosts=None, alpha=1, counter=None):
+    """
+    Renders the game scene for one player's screen.
+
+    Parameters:
+    camera (Camera): The camera of the player's screen.
+    cars (list): A list of players whose cars are to be rendered.
+    trees (list): A list of tree objects to be rendered.
+    environment (Environment): The game environment, holding the baked racetrack.
+    viewport (tuple): The x, y, width and height of the player's screen.
+    ghosts (GhostRenderer): The ghost cars to render. Defaults to None.
+    alpha (float): How far between the last two simulation steps to place the ghost cars. Defaults to 1.
+    counter (CullCounter): The counter reset and filled with the number of objects drawn and culled. Defaults to None.
 
-        # Set the color for subsequent drawing operations
-        glColor3f(1, 1, 1)
+    Returns:
+    None
+    """
+    glViewport(*viewport)
+    camera.apply_projection()
+    camera.apply()
+    frustum = Frustum.from_camera(camera, viewport[3])
+    if counter is not None:
+        counter.reset()
 
-        # Render each car
-        for car in cars:
-            car.render()
+    # Set the color for subsequent drawing operations
+    glColor3f(1, 1, 1)
 
-        # Render the environment
-        Environment().init_env(trees)
+    # Render each car inside the view
+    for car in cars:
+        visible = frustum.sphere_visible(*car.get_bounding_sphere())
+        if counter is not None:
+            counter.count('cars', visible)
+        if visible:
+            car.render(frustum)
+
+    # Render the environment
+    environment.init_env(trees, frustum, counter)
+
+    # Render the ghost cars
+    if ghosts is not None:
+        ghosts.draw(alpha, frustum, counter)
 
 
 def menu():
@@ -125,14 +165,14 @@ def menu():
     Initializes the Pygame environment and displays the game menu.
 
     This function initializes Pygame, sets up the display with the current screen resolution and necessary flags,
-    sets the window title, and renders the 'Single Player' and 'Multiplayer' options on the screen.
+    sets the window title, and renders an option for each number of players, up to MAX_PLAYERS, on the screen.
     It then enters a loop where it waits for the user to click on one of these options, and returns the selected option.
 
     Parameters:
     None
 
     Returns:
-    str: The selected game mode ('single' or 'multi').
+    int: The selected number of players.
     """
 
     # Initialize Pygame
@@ -145,32 +185,29 @@ def menu():
     # Set the window title
     pg.display.set_caption("Racing Game Menu")
 
-    # Create a Pygame font object and render the 'Single Player' and 'Multiplayer' options
+    # Create a Pygame font object and render an option for each number of players
     font = pg.font.Font(None, 74)
-    single_text = font.render('Single Player', True, (255, 255, 255))
-    multi_text = font.render('Multiplayer', True, (255, 255, 255))
+    options = [font.render('Single Player' if count == 1 else f'{count} Players', True, (255, 255, 255))
+               for count in range(1, MAX_PLAYERS + 1)]
 
-    # Get the rectangles for positioning the options on the screen
-    single_rect = single_text.get_rect(
-        center=(display[0] // 2, single_text.get_rect().height // 2 + display[1] // 2 - 50))
-    multi_rect = multi_text.get_rect(
-        center=(display[0] // 2, single_text.get_rect().height // 2 + display[1] // 2 + 50))
+    # Get the rectangles for positioning the options on the screen, 100 pixels apart around the center
+    rects = [text.get_rect(center=(display[0] // 2, display[1] // 2 + 100 * i - 50 * (len(options) - 1)))
+             for i, text in enumerate(options)]
 
     # Enter a loop where it waits for the user to click on one of the options
     while True:
         screen.fill((0, 0, 0))
-        screen.blit(single_text, single_rect)
-        screen.blit(multi_text, multi_rect)
+        for text, rect in zip(options, rects):
+            screen.blit(text, rect)
 
         for event in pg.event.get():
             if event.type == pg.QUIT or (event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE):
                 pg.quit()
                 sys.exit()
             elif event.type == pg.MOUSEBUTTONDOWN:
-                if single_rect.collidepoint(event.pos):
-                    return 'single'
-                elif multi_rect.collidepoint(event.pos):
-                    return 'multi'
+                for count, rect in enumerate(rects, 1):
+                    if rect.collidepoint(event.pos):
+                        return count
         pg.display.flip()
 
 
@@ -178,9 +215,20 @@ def main():
     """
     The main function of the game.
 
-    This function calls the menu function to get the game mode, initializes the Pygame and PyOpenGL environments,
-    sets up the viewport based on the game mode, creates the player(s) and the car(s), and enters a game loop where it
-    updates the game state and renders the game scene.
+    This function calls the menu function to get the number of players, initializes the Pygame and PyOpenGL
+    environments, splits the screen into a viewport per player, creates the players and their cars from the key
+    bindings table, and enters a game loop where it updates the game state and renders the game scene.
+
+    The game state is advanced in fixed steps of 1 / TICK_RATE seconds, as many as the elapsed time allows, and the
+    cars are rendered interpolated between the last two steps. The game therefore plays the same at any frame rate,
+    and rendering is not capped.
+
+    The players' inputs at every step and the seed of the tree placement are recorded, and saved to REPLAY_FILE on
+    exit, so the race can be replayed exactly. Each player's best lap is kept in GHOST_DIR, and the best laps of
+    earlier sessions are raced against as ghost cars, restarting whenever player 1 starts a new lap. F3 shows how
+    many objects each viewport drew and culled, and F4 graphs the time spent in each stage of the last frames, whose
+    percentiles are saved to PROFILE_FILE on exit. Run with --count-gl, the OpenGL calls, draws, vertices, state
+    changes and texture binds of every frame are counted too, and shown and saved with the timings.
 
     Parameters:
     None
@@ -189,8 +237,8 @@ def main():
     None
     """
 
-    # Call the menu function to get the game mode
-    mode = menu()
+    # Call the menu function to get the number of players
+    player_count = menu()
 
     # Initialize the Pygame and PyOpenGL environments
     init()
@@ -199,100 +247,126 @@ def main():
     width = int(pg.display.Info().current_w)
     height = int(pg.display.Info().current_h)
 
-    # Set up the viewport based on the game mode
-    viewports = {
-        'single': [[0, 0, width, height]],
-        'multi': [[0, 0, width // 2, height], [width // 2, 0, width // 2, height]]
-    }
+    # Split the screen into a viewport for each player
+    viewports = viewport_layout(player_count, width, height)
 
     # Create a Pygame clock object
     clock = pg.time.Clock()
 
-    # Define the key bindings for player 1
-    player1_bindings = {
-        'forward': pg.K_w,
-        'backward': pg.K_s,
-        'left': pg.K_a,
-        'right': pg.K_d
-    }
-
-    # Load the car model and create player 1
-    car = OBJ('objects/Sedan.obj', swapyz=False)
-    car.rotation = [0, 180, 0]
-    player1 = Player(player1_bindings, car, aspect_ratio=viewports[mode][0][2] / viewports[mode][0][3])
-    player1.start_sound.play()
+    # Create the asset manager shared by every object in the game
+    assets = AssetManager()
 
-    # Draw the trees
-    trees = Environment().draw_trees()
+    # Create the log recording the race's inputs
+    log = InputLog(randrange(1 << 32), player_count)
 
-    # Initialize the timer
+    # Load a car for each player and create the players with their key bindings
+    players = []
+    for i in range(player_count):
+        car = assets.load('objects/Sedan.obj', swapyz=False)
+        car.rotation = [0, 180, 0]
+        car.position = list(START_POSITIONS[player_count][i])
+        player = Player(PLAYER_BINDINGS[i], car, aspect_ratio=viewports[i][2] / viewports[i][3],
+                        controls=log.recorder(i, KeyboardControls(PLAYER_BINDINGS[i])))
+        player.start_sound.play()
+        players.append(player)
+
+    # Create the environment streamed in chunks around the cars, and load the chunks around the start
+    environment = Environment(assets, log.seed, streamed=True)
+    trees = environment.draw_trees()
+    environment.stream([player.car.get_position() for player in players])
+
+    # Load the ghost cars of earlier sessions, and record each player's best lap
+    ghosts = GhostRenderer.load(players[0].car.mesh)
+    recorders = [GhostRecorder(player, os.path.join(GHOST_DIR, f'player{i + 1}.ghost'), TICK_RATE, ghosts)
+                 for i, player in enumerate(players)]
+
+    # Create the HUD, rendering the font into its glyph atlas once
+    hud = HudRenderer(width, height)
+
+    # Create the drawn and culled object counters of each viewport, shown with F3
+    counters = [CullCounter() for _ in viewports]
+    show_counters = False
+
+    # Create the profiler timing the stages of every frame, graphed with F4 and saved to PROFILE_FILE on exit
+    profiler = FrameProfiler()
+    show_profiler = False
+    gl = None
+    if '--count-gl' in sys.argv:
+        gl = RecordingGL(passthrough=True).install(*(sys.modules[name] for name in GL_COUNTED_MODULES))
+
+    # Initialize the timer, the simulation step count and the time not yet simulated
     timer = 0
+    ticks = 0
+    dt = 1 / TICK_RATE
+    accumulator = 0
 
     # Enter the game loop
-    if mode == 'single':
-        while True:
-            for event in pg.event.get():
-                if event.type == pg.QUIT or (event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE):
-                    car.free()
-                    for tree in trees:
-                        tree.free()
-                    pg.quit()
-                    sys.exit()
-            timer += clock.get_time()
-
-            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-            player1.movement(trees)
-            player1.update_lap_count(timer)
-
-            render_scene([player1.camera], [car], trees, viewports[mode], 1)
-            draw_text(10, 10, f"Player 1 Lap: {player1.lap_count}")
-            draw_text(width // 2 - 70, height - 50, f"Timer: {timer // 60000}:{timer // 1000 % 60}:{timer % 1000}")
-
-            pg.display.flip()
-            clock.tick(60)
-            pg.time.wait(10)
-    else:
-        # Define the key bindings for player 2 and create player 2
-        player2_bindings = {
-            'forward': pg.K_UP,
-            'backward': pg.K_DOWN,
-            'left': pg.K_LEFT,
-            'right': pg.K_RIGHT
-        }
-        car.position = [-2, 0, 0]
-        car2 = OBJ('objects/Sedan.obj', swapyz=False)
-        car2.rotation = [0, 180, 0]
-        car2.position = [2, 0, 0]
-        player2 = Player(player2_bindings, car2, aspect_ratio=viewports[mode][1][2] / viewports[mode][1][3])
-        player2.start_sound.play()
-
-        # Enter the game loop for multiplayer mode
-        while True:
+    while True:
+        profiler.begin_frame()
+        with profiler.stage('events'):
             for event in pg.event.get():
                 if event.type == pg.QUIT or (event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE):
-                    car.free()
-                    car2.free()
+                    for player in players:
+                        player.car.free()
                     for tree in trees:
                         tree.free()
+                    environment.free()
+                    ghosts.free()
+                    hud.free()
+                    log.save(REPLAY_FILE)
+                    profiler.dump(PROFILE_FILE)
                     pg.quit()
                     sys.exit()
-            timer += clock.get_time()
-
-            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-            player1.movement(trees)
-            player1.update_lap_count(timer)
-            player2.movement(trees)
-            player2.update_lap_count(timer)
-            player2.check_rank(player1)
-
-            render_scene([player1.camera, player2.camera], [car, car2], trees, viewports[mode], 2)
-            draw_text(10, 10, f"Player 1 Lap: {player1.lap_count} {player1.rank}")
-            draw_text(width // 2 + 10, 10, f"Player 2 Lap: {player2.lap_count} {player2.rank}")
-            draw_text(width // 2 - 70, height - 50, f"Timer: {timer // 60000}:{timer // 1000 % 60}:{timer % 1000}")
-
+                elif event.type == pg.KEYDOWN and event.key == pg.K_F3:
+                    show_counters = not show_counters
+                elif event.type == pg.KEYDOWN and event.key == pg.K_F4:
+                    show_profiler = not show_profiler
+        with profiler.stage('world'):
+            environment.stream([player.car.get_position() for player in players])
+        accumulator += min(clock.tick() / 1000, MAX_FRAME_TIME)
+        while accumulator >= dt:
+            ticks += 1
+            timer = ticks * 1000 // TICK_RATE
+            for player in players:
+                with profiler.stage('movement'):
+                    player.movement(environment.obstacles, dt)
+                with profiler.stage('laps'):
+                    player.update_lap_count(timer, environment.racetrack)
+            with profiler.stage('laps'):
+                if player_count > 1:
+                    rank_players(players)
+            with profiler.stage('ghosts'):
+                ghosts.advance()
+                # A new lap of player 1 restarts the ghosts
+                if players[0].lap_count != recorders[0].lap_count:
+                    ghosts.restart()
+                for recorder in recorders:
+                    recorder.record(timer)
+            accumulator -= dt
+        for player in players:
+            player.interpolate(accumulator / dt)
+
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        render_scene([player.camera for player in players], players, trees, environment, viewports, player_count,
+                     ghosts, accumulator / dt, counters, profiler)
+        with profiler.stage('hud'):
+            for i, (player, viewport) in enumerate(zip(players, viewports)):
+                hud.draw_text(viewport[0] + 10, viewport[1] + 10,
+                              f"Player {i + 1} Lap: {player.lap_count} {player.rank}")
+                if show_counters:
+                    hud.draw_text(viewport[0] + 10, viewport[1] + viewport[3] - 40, counters[i].summary())
+            hud.draw_text(width // 2 - 70, height - 50,
+                          f"Timer: {timer // 60000}:{timer // 1000 % 60}:{timer % 1000}")
+            if show_profiler:
+                profiler.draw(hud, 10, height - 300)
+            hud.flush()
+
+        with profiler.stage('flip'):
             pg.display.flip()
-            clock.tick(60)
-            pg.time.wait(10)
+        if gl is not None:
+            gl.end_frame()
+            profiler.record_counts({f'gl {kind}': count for kind, count in gl.frame_totals().items()})
+        profiler.end_frame()
 
 
 if __name__ == "__main__":
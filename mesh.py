@@ -0,0 +1,195 @@
+import numpy as np
+from OpenGL.GL import *
+
+
+class Mesh:
+    """
+    A class to represent a static mesh of coloured triangles baked into a single vertex buffer.
+
+    ...
+
+    Attributes
+    ----------
+    data : list
+        the interleaved vertex data, stored as r, g, b, x, y, z floats per vertex
+    vbo : int
+        the ID of the OpenGL vertex buffer object holding the baked data
+    count : int
+        the number of vertices uploaded to the vertex buffer
+    chunk_ranges : ndarray
+        a (K, 2) array of the first vertex and vertex count of each spatial chunk, once split_chunks() has been called
+    chunk_centers : ndarray
+        a (K, 3) array of the center of each chunk's bounding sphere
+    chunk_radii : ndarray
+        the radius of each chunk's bounding sphere
+
+    Methods
+    -------
+    add_triangle(a, b, c, color):
+        Adds a single coloured triangle to the mesh.
+    add_quad(a, b, c, d, color):
+        Adds a coloured quad to the mesh as two triangles.
+    add_quad_strip(points, color):
+        Adds a coloured quad strip to the mesh as a list of triangles.
+    vertex_count():
+        Returns the number of vertices in the mesh.
+    split_chunks(size):
+        Reorders the triangles into contiguous chunks on a square grid, and computes their bounding spheres.
+    upload():
+        Uploads the mesh data to an OpenGL vertex buffer object.
+    draw(ranges=None):
+        Draws the whole mesh, or some of its vertex ranges, with a single draw call.
+    free():
+        Deletes the mesh's OpenGL vertex buffer object.
+    """
+
+    def __init__(self):
+        """
+        Constructs all the necessary attributes for the mesh object.
+        """
+
+        self.data = []
+        self.vbo = 0
+        self.count = 0
+        self.chunk_ranges = np.zeros((0, 2), dtype=np.int32)
+        self.chunk_centers = np.zeros((0, 3))
+        self.chunk_radii = np.zeros(0)
+
+    def add_triangle(self, a, b, c, color):
+        """
+        Adds a single coloured triangle to the mesh.
+
+        Parameters:
+        a (tuple): The x, y and z coordinates of the first vertex.
+        b (tuple): The x, y and z coordinates of the second vertex.
+        c (tuple): The x, y and z coordinates of the third vertex.
+        color (tuple): The r, g and b colour of the triangle.
+        """
+
+        for vertex in (a, b, c):
+            self.data.extend(color)
+            self.data.extend(vertex)
+
+    def add_quad(self, a, b, c, d, color):
+        """
+        Adds a coloured quad to the mesh as two triangles.
+
+        The corners are given in the same order they would be passed to GL_QUADS.
+
+        Parameters:
+        a (tuple): The x, y and z coordinates of the first corner.
+        b (tuple): The x, y and z coordinates of the second corner.
+        c (tuple): The x, y and z coordinates of the third corner.
+        d (tuple): The x, y and z coordinates of the fourth corner.
+        color (tuple): The r, g and b colour of the quad.
+        """
+
+        self.add_triangle(a, b, c, color)
+        self.add_triangle(a, c, d, color)
+
+    def add_quad_strip(self, points, color):
+        """
+        Adds a coloured quad strip to the mesh as a list of triangles.
+
+        Parameters:
+        points (list): The strip's vertices in the same order they would be passed to GL_QUAD_STRIP.
+        color (tuple): The r, g and b colour of the strip.
+        """
+
+        for i in range(0, len(points) - 3, 2):
+            self.add_quad(points[i], points[i + 1], points[i + 3], points[i + 2], color)
+
+    def vertex_count(self):
+        """
+        Returns the number of vertices in the mesh.
+
+        Returns:
+        int: The number of vertices emitted by a single draw of the mesh.
+        """
+
+        return len(self.data) // 6
+
+    def split_chunks(self, size):
+        """
+        Reorders the triangles into contiguous chunks on a square grid, and computes their bounding spheres.
+
+        Each triangle goes to the grid cell containing its centroid on the x/z plane, so a chunk can be drawn or skipped
+        as a single range of vertices.
+
+        Parameters:
+        size (float): The width and depth of a grid cell.
+        """
+
+        triangles = np.array(self.data, dtype=np.float64).reshape(-1, 3, 6)
+        if not len(triangles):
+            return
+        centroids = triangles[:, :, 3:].mean(axis=1)
+        cells = np.floor(centroids[:, [0, 2]] / size).astype(np.int64)
+        unique, inverse = np.unique(cells, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind='stable')
+        triangles = triangles[order]
+        self.data = triangles.reshape(-1).tolist()
+
+        counts = np.bincount(inverse, minlength=len(unique)) * 3
+        firsts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        self.chunk_ranges = np.column_stack((firsts, counts)).astype(np.int32)
+        centers = []
+        radii = []
+        for first, count in self.chunk_ranges:
+            points = triangles.reshape(-1, 6)[first:first + count, 3:]
+            center = (points.min(axis=0) + points.max(axis=0)) / 2
+            centers.append(center)
+            radii.append(np.linalg.norm(points - center, axis=1).max())
+        self.chunk_centers = np.array(centers)
+        self.chunk_radii = np.array(radii)
+
+    def upload(self):
+        """
+        Uploads the mesh data to an OpenGL vertex buffer object.
+
+        The Python side copy of the data is kept so the mesh can be inspected after it has been uploaded.
+        """
+
+        array = np.array(self.data, dtype=np.float32)
+        self.count = self.vertex_count()
+        self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, array.nbytes, array, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw(self, ranges=None):
+        """
+        Draws the whole mesh, or some of its vertex ranges, with a single draw call.
+
+        The vertex buffer is uploaded on the first call, so the mesh can be built before an OpenGL context exists.
+
+        Parameters:
+        ranges (ndarray): A (K, 2) array of the first vertex and vertex count of each range to draw, such as a subset
+        of chunk_ranges. Defaults to None, in which case the whole mesh is drawn.
+        """
+
+        if ranges is not None and not len(ranges):
+            return
+        if not self.vbo:
+            self.upload()
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glInterleavedArrays(GL_C3F_V3F, 0, None)
+        if ranges is None:
+            glDrawArrays(GL_TRIANGLES, 0, self.count)
+        else:
+            ranges = np.ascontiguousarray(ranges, dtype=np.int32)
+            glMultiDrawArrays(GL_TRIANGLES, ranges[:, 0].copy(), ranges[:, 1].copy(), len(ranges))
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def free(self):
+        """
+        Deletes the mesh's OpenGL vertex buffer object.
+        """
+
+        if self.vbo:
+            glDeleteBuffers(1, [self.vbo])
+            self.vbo = 0
@@ -1,8 +1,22 @@
+import ctypes
 import os
 
+import numpy as np
 import pygame
 from OpenGL.GL import *
 
+from instancing import transform_matrix
+
+# The directory, next to each OBJ file, holding the binary caches of the parsed files
+CACHE_DIR = '__meshcache__'
+
+# The version of the cache format, bumped whenever the arrays stored in the cache change
+CACHE_VERSION = 2
+
+# The arrays returned by OBJ.parse(), each stored in its own .npy file of the cache so it can be memory-mapped
+CACHE_ARRAYS = ('vertices', 'normals', 'texcoords', 'corners', 'face_sizes', 'face_materials', 'material_names',
+                'mtllibs')
+
 
 class OBJ:
     """
@@ -13,46 +27,90 @@ class OBJ:
     Attributes
     ----------
     generate_on_init : bool
-        a class variable that determines whether to generate the OpenGL display list upon initialization
-    vertices : list
-        a list of the object's vertices
-    normals : list
-        a list of the object's normals
-    texcoords : list
-        a list of the object's texture coordinates
-    faces : list
-        a list of the object's faces
-    gl_list : int
-        the ID of the object's OpenGL display list
+        a class variable that determines whether to upload the OpenGL buffers upon initialization
+    vertices : ndarray
+        an (N, 3) float32 array of the object's vertices
+    normals : ndarray
+        an (N, 3) float32 array of the object's normals
+    texcoords : ndarray
+        an (N, 2) float32 array of the object's texture coordinates
+    corners : ndarray
+        an (N, 3) int32 array of the 1-based vertex, texture coordinate and normal indices of every face corner
+    face_sizes : ndarray
+        an int32 array of the number of corners of each face
+    face_materials : ndarray
+        an int32 array of the index in material_names of each face's material, or -1 for no material
+    material_names : list
+        the names of the materials used by the object's faces
+    vbo : int
+        the ID of the OpenGL vertex buffer holding the object's de-duplicated vertices
+    ibo : int
+        the ID of the OpenGL index buffer holding the object's triangles, grouped by material
+    batches : list
+        a list of (material, first, count) tuples giving the range of indices drawn with each material
+    center : tuple
+        the average of the object's vertices, in local space
+    bounding_box : tuple
+        the (min, max) corners of the object's axis-aligned bounding box, in local space
+    bounding_radius : float
+        the radius of the object's bounding sphere, centered on the middle of the bounding box
     position : list
         the object's position in the 3D space
     rotation : list
         the object's rotation angles
     mtl : dict
         a dictionary containing the object's materials
+    mtllibs : list
+        the paths of the MTL files the object's materials were loaded from
 
     Methods
     -------
     loadTexture(imagefile):
         Loads a texture from an image file.
-    loadMaterial(filename):
+    loadMaterial(filename, texture_loader=None):
         Loads materials from a MTL file.
-    __init__(filename, swapyz=False):
+    parseRecords(lines, width):
+        Parses the numeric values of a list of OBJ records in bulk.
+    parseCorners(tokens):
+        Parses the v/vt/vn references of the face corners in bulk.
+    parse(filename, swapyz=False):
+        Parses an OBJ file into flat typed arrays.
+    cachePath(filename, swapyz=False):
+        Gets the path of the binary cache directory of an OBJ file.
+    cacheKey(filename):
+        Builds the key identifying the current contents of an OBJ file.
+    loadCached(filename, swapyz=False):
+        Loads the arrays of an OBJ file, from its binary cache when it is up to date.
+    __init__(filename, swapyz=False, assets=None, generate=None):
         Initializes the object by loading data from an OBJ file.
     generate():
-        Generates the object's OpenGL display list.
-    render():
+        Uploads the object's vertex and index buffers to OpenGL.
+    apply_material(material):
+        Sets up the OpenGL state for drawing with one of the object's materials.
+    draw():
+        Draws the object's mesh, with one draw call for each material.
+    triangulate():
+        Splits the object's faces into triangle fans.
+    indexed_arrays():
+        Triangulates the object's faces into a de-duplicated vertex array and an index array grouped by material.
+    render(position=None, rotation=None):
         Renders the object in the 3D space.
     move(x, y, z):
         Moves the object by a certain amount.
     rotate(yaw, pitch, roll):
         Rotates the object by certain angles.
     free():
-        Deletes the object's OpenGL display list.
+        Deletes the object's OpenGL vertex and index buffers.
+    compute_bounds():
+        Computes and caches the object's local-space center, bounding box and bounding sphere.
+    transform_bounds(position, rotation, scaling=1):
+        Transforms the object's cached bounds into world space.
     calculate_center():
-        Calculates the object's center point.
+        Gets the object's center point.
     get_bounding_box():
-        Gets the object's bounding box.
+        Gets the object's bounding box in world space.
+    get_bounding_sphere():
+        Gets the object's bounding sphere in world space.
     get_position():
         Gets the object's position.
     scale(scale):
@@ -86,17 +144,21 @@ class OBJ:
         return texid
 
     @classmethod
-    def loadMaterial(cls, filename):
+    def loadMaterial(cls, filename, texture_loader=None):
         """
         Loads materials from a MTL file.
 
         Parameters:
         filename (str): The path to the MTL file.
+        texture_loader (callable): The function used to load the textures referred to by the materials. Defaults to
+        None, in which case loadTexture() is used.
 
         Returns:
         dict: A dictionary containing the loaded materials.
         """
 
+        if texture_loader is None:
+            texture_loader = cls.loadTexture
         contents = {}
         mtl = None
         dirname = os.path.dirname(filename)
@@ -113,110 +175,386 @@ class OBJ:
                 # load the texture referred to by this declaration
                 mtl[values[0]] = values[1]
                 imagefile = os.path.join(dirname, mtl['map_Kd'])
-                mtl['texture_Kd'] = cls.loadTexture(imagefile)
+                mtl['texture_Kd'] = texture_loader(imagefile)
             else:
                 mtl[values[0]] = list(map(float, values[1:]))
         return contents
 
-    def __init__(self, filename, swapyz=False):
+    @classmethod
+    def parseRecords(cls, lines, width):
+        """
+        Parses the numeric values of a list of OBJ records in bulk.
+
+        Parameters:
+        lines (list): The records' values, without their keywords.
+        width (int): The number of values to keep from each record.
+
+        Returns:
+        ndarray: An (N, width) float32 array holding the values of each record.
+        """
+
+        if not lines:
+            return np.zeros((0, width), dtype=np.float32)
+        values = np.array(' '.join(lines).split(), dtype=np.float32)
+        if values.size == len(lines) * width:
+            return values.reshape(-1, width)
+        # Some records carry optional extra values, so fall back to trimming each record on its own
+        return np.array([line.split()[:width] for line in lines], dtype=np.float32).reshape(-1, width)
+
+    @classmethod
+    def parseCorners(cls, tokens):
+        """
+        Parses the v/vt/vn references of the face corners in bulk.
+
+        Parameters:
+        tokens (list): The corner tokens of every face, such as '7/1/1', '7//1', '7/1' or '7'.
+
+        Returns:
+        ndarray: An (N, 3) int32 array holding the 1-based vertex, texture coordinate and normal indices of each
+        corner, with 0 where a reference is missing.
+        """
+
+        corners = np.zeros((len(tokens), 3), dtype=np.int32)
+        if not tokens:
+            return corners
+        # The bulk reshapes only hold when every corner has the same number of references
+        slashes = {token.count('/') for token in tokens}
+        slashes = slashes.pop() if len(slashes) == 1 else None
+        joined = ' '.join(tokens).replace('//', '/0/')
+        if slashes == 2:
+            corners[:] = np.array(joined.replace('/', ' ').split(), dtype=np.int32).reshape(-1, 3)
+        elif slashes == 1:
+            corners[:, :2] = np.array(joined.replace('/', ' ').split(), dtype=np.int32).reshape(-1, 2)
+        elif slashes == 0:
+            corners[:, 0] = np.array(joined.split(), dtype=np.int32)
+        else:
+            # The file mixes corner formats, so parse each corner on its own
+            for i, token in enumerate(tokens):
+                for j, value in enumerate(token.split('/')[:3]):
+                    if value:
+                        corners[i, j] = int(value)
+        return corners
+
+    @classmethod
+    def parse(cls, filename, swapyz=False):
+        """
+        Parses an OBJ file into flat typed arrays.
+
+        The records are first sorted by keyword, then the values of each kind of record are converted in bulk with
+        NumPy.
+
+        Parameters:
+        filename (str): The path to the OBJ file.
+        swapyz (bool): Whether to swap the y and z coordinates. Defaults to False.
+
+        Returns:
+        dict: A dictionary holding the vertices, normals, texcoords, corners, face_sizes, face_materials,
+        material_names and mtllibs arrays of the object.
+        """
+
+        vertex_lines = []
+        normal_lines = []
+        texcoord_lines = []
+        corner_tokens = []
+        face_sizes = []
+        face_materials = []
+        material_names = []
+        mtllibs = []
+        material = -1
+        with open(filename, "r") as file:
+            for line in file:
+                values = line.split(None, 1)
+                if not values or values[0].startswith('#'): continue
+                if len(values) < 2: continue
+                if values[0] == 'v':
+                    vertex_lines.append(values[1])
+                elif values[0] == 'vn':
+                    normal_lines.append(values[1])
+                elif values[0] == 'vt':
+                    texcoord_lines.append(values[1])
+                elif values[0] == 'f':
+                    tokens = values[1].split()
+                    corner_tokens.extend(tokens)
+                    face_sizes.append(len(tokens))
+                    face_materials.append(material)
+                elif values[0] in ('usemtl', 'usemat'):
+                    name = values[1].strip()
+                    if name not in material_names:
+                        material_names.append(name)
+                    material = material_names.index(name)
+                elif values[0] == 'mtllib':
+                    mtllibs.append(values[1].strip())
+
+        vertices = cls.parseRecords(vertex_lines, 3)
+        normals = cls.parseRecords(normal_lines, 3)
+        if swapyz:
+            vertices = vertices[:, [0, 2, 1]]
+            normals = normals[:, [0, 2, 1]]
+        return {
+            'vertices': np.ascontiguousarray(vertices),
+            'normals': np.ascontiguousarray(normals),
+            'texcoords': cls.parseRecords(texcoord_lines, 2),
+            'corners': cls.parseCorners(corner_tokens),
+            'face_sizes': np.array(face_sizes, dtype=np.int32),
+            'face_materials': np.array(face_materials, dtype=np.int32),
+            'material_names': np.array(material_names, dtype=str),
+            'mtllibs': np.array(mtllibs, dtype=str),
+        }
+
+    @classmethod
+    def cachePath(cls, filename, swapyz=False):
+        """
+        Gets the path of the binary cache directory of an OBJ file.
+
+        Parameters:
+        filename (str): The path to the OBJ file.
+        swapyz (bool): Whether the y and z coordinates are swapped. Defaults to False.
+
+        Returns:
+        str: The path to the cache directory.
+        """
+
+        dirname, basename = os.path.split(filename)
+        suffix = '.swapyz' if swapyz else ''
+        return os.path.join(dirname, CACHE_DIR, basename + suffix + '.arrays')
+
+    @classmethod
+    def cacheKey(cls, filename):
+        """
+        Builds the key identifying the current contents of an OBJ file.
+
+        Parameters:
+        filename (str): The path to the OBJ file.
+
+        Returns:
+        ndarray: An int64 array holding the cache format version, and the size and modification time of the file.
+        """
+
+        stat = os.stat(filename)
+        return np.array([CACHE_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    @classmethod
+    def loadCached(cls, filename, swapyz=False):
+        """
+        Loads the arrays of an OBJ file, from its binary cache when it is up to date.
+
+        The cache is a directory holding each array as a .npy file, which is memory-mapped rather than read, so loading
+        an unchanged mesh neither parses text nor copies its arrays up front. The key is written last, so a cache left
+        half-written by an interrupted run never matches. When the cache is missing or stale, the file is parsed and the
+        cache is rewritten. Failing to write the cache is not an error, the arrays are then simply parsed again on the
+        next load.
+
+        Parameters:
+        filename (str): The path to the OBJ file.
+        swapyz (bool): Whether to swap the y and z coordinates. Defaults to False.
+
+        Returns:
+        dict: A dictionary holding the arrays returned by parse().
+        """
+
+        cache = cls.cachePath(filename, swapyz)
+        key = cls.cacheKey(filename)
+        key_path = os.path.join(cache, 'key.npy')
+        try:
+            if np.array_equal(np.load(key_path), key):
+                return {name: np.asarray(np.load(os.path.join(cache, name + '.npy'), mmap_mode='r'))
+                        for name in CACHE_ARRAYS}
+        except (OSError, EOFError, ValueError):
+            pass
+
+        data = cls.parse(filename, swapyz)
+        try:
+            os.makedirs(cache, exist_ok=True)
+            if os.path.exists(key_path):
+                os.remove(key_path)
+            for name, array in list(data.items()) + [('key', key)]:
+                path = os.path.join(cache, name + '.npy')
+                with open(path + '.tmp', 'wb') as file:
+                    np.save(file, array)
+                os.replace(path + '.tmp', path)
+        except OSError:
+            pass
+        return data
+
+    def __init__(self, filename, swapyz=False, assets=None, generate=None):
         """
         Initializes the object by loading data from an OBJ file.
 
         Parameters:
         filename (str): The path to the OBJ file.
         swapyz (bool): Whether to swap the y and z coordinates. Defaults to False.
+        assets (AssetManager): The asset manager to share materials and textures through. Defaults to None, in which
+        case the object loads its own copies.
+        generate (bool): Whether to upload the OpenGL buffers right away. Defaults to None, in which case
+        generate_on_init decides.
         """
 
-        self.vertices = []
-        self.normals = []
-        self.texcoords = []
-        self.faces = []
-        self.gl_list = 0
+        data = self.loadCached(filename, swapyz)
+        self.vertices = data['vertices']
+        self.normals = data['normals']
+        self.texcoords = data['texcoords']
+        self.corners = data['corners']
+        self.face_sizes = data['face_sizes']
+        self.face_materials = data['face_materials']
+        self.material_names = [str(name) for name in data['material_names']]
+        self.compute_bounds()
+        self.vbo = 0
+        self.ibo = 0
+        self.batches = []
         self.position = [0, 0, 0]
         self.rotation = [0, 0, 0]
+        self.mtl = {}
+        self.mtllibs = []
         dirname = os.path.dirname(filename)
-        material = None
-        for line in open(filename, "r"):
-            if line.startswith('#'): continue
-            values = line.split()
-            if not values: continue
-            if values[0] == 'v':
-                v = list(map(float, values[1:4]))
-                if swapyz:
-                    v = v[0], v[2], v[1]
-                self.vertices.append(v)
-            elif values[0] == 'vn':
-                v = list(map(float, values[1:4]))
-                if swapyz:
-                    v = v[0], v[2], v[1]
-                self.normals.append(v)
-            elif values[0] == 'vt':
-                self.texcoords.append(list(map(float, values[1:3])))
-            elif values[0] in ('usemtl', 'usemat'):
-                material = values[1]
-            elif values[0] == 'mtllib':
-                self.mtl = self.loadMaterial(os.path.join(dirname, values[1]))
-            elif values[0] == 'f':
-                face = []
-                texcoords = []
-                norms = []
-                for v in values[1:]:
-                    w = v.split('/')
-                    face.append(int(w[0]))
-                    if len(w) >= 2 and len(w[1]) > 0:
-                        texcoords.append(int(w[1]))
-                    else:
-                        texcoords.append(0)
-                    if len(w) >= 3 and len(w[2]) > 0:
-                        norms.append(int(w[2]))
-                    else:
-                        norms.append(0)
-                self.faces.append((face, norms, texcoords, material))
-        if self.generate_on_init:
+        for name in data['mtllibs']:
+            mtllib = os.path.join(dirname, str(name))
+            if assets is not None:
+                self.mtl.update(assets.load_material(mtllib))
+            else:
+                self.mtl.update(self.loadMaterial(mtllib))
+            self.mtllibs.append(mtllib)
+        if generate if generate is not None else self.generate_on_init:
             self.generate()
 
     def generate(self):
         """
-        Generates the object's OpenGL display list.
+        Uploads the object's vertex and index buffers to OpenGL.
+        """
+
+        data, indices, self.batches = self.indexed_arrays()
+        self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.ibo = glGenBuffers(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def apply_material(self, material):
+        """
+        Sets up the OpenGL state for drawing with one of the object's materials.
+
+        Parameters:
+        material (str): The name of the material.
+        """
+
+        mtl = self.mtl[material]
+        if 'texture_Kd' in mtl:
+            # use diffuse texmap
+            glBindTexture(GL_TEXTURE_2D, mtl['texture_Kd'])
+        else:
+            # just use diffuse colour
+            glColor(*mtl['Kd'])
+
+    def draw(self):
+        """
+        Draws the object's mesh, with one draw call for each material.
         """
 
-        self.gl_list = glGenLists(1)
-        glNewList(self.gl_list, GL_COMPILE)
         glEnable(GL_TEXTURE_2D)
         glFrontFace(GL_CCW)
-
-        for face in self.faces:
-            vertices, normals, texture_coords, material = face
-            mtl = self.mtl[material]
-            if 'texture_Kd' in mtl:
-                # use diffuse texmap
-                glBindTexture(GL_TEXTURE_2D, mtl['texture_Kd'])
-            else:
-                # just use diffuse colour
-                glColor(*mtl['Kd'])
-            glBegin(GL_POLYGON)
-
-            for i in range(len(vertices)):
-                if normals[i] > 0:
-                    glNormal3fv(self.normals[normals[i] - 1])
-                if texture_coords[i] > 0:
-                    glTexCoord2fv(self.texcoords[texture_coords[i] - 1])
-                glVertex3fv(self.vertices[vertices[i] - 1])
-            glEnd()
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glInterleavedArrays(GL_T2F_N3F_V3F, 0, None)
+        for material, first, count in self.batches:
+            self.apply_material(material)
+            glDrawElements(GL_TRIANGLES, count, GL_UNSIGNED_INT, ctypes.c_void_p(first * 4))
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
         glDisable(GL_TEXTURE_2D)
-        glEndList()
 
-    def render(self):
+    def triangulate(self):
+        """
+        Splits the object's faces into triangle fans.
+
+        Returns:
+        tuple: A (triangles, faces) tuple, where triangles is a (T, 3) int array of indices into corners, and faces
+        is a (T,) int array holding the face each triangle was split from.
+        """
+
+        triangle_counts = np.maximum(self.face_sizes - 2, 0)
+        starts = np.cumsum(self.face_sizes) - self.face_sizes
+        faces = np.repeat(np.arange(len(self.face_sizes)), triangle_counts)
+        local = np.arange(len(faces)) - np.repeat(np.cumsum(triangle_counts) - triangle_counts, triangle_counts)
+        first = starts[faces]
+        triangles = np.stack((first, first + local + 1, first + local + 2), axis=1)
+        return triangles, faces
+
+    def indexed_arrays(self):
+        """
+        Triangulates the object's faces into a de-duplicated vertex array and an index array grouped by material.
+
+        Each face is split into a triangle fan, and the triangles are sorted by material. Corners sharing the same
+        vertex, texture coordinate and normal references share a single vertex. Corners without normals get their
+        triangle's normal, so they are only shared within their triangle, and corners without texture coordinates
+        get (0, 0).
+
+        Returns:
+        tuple: A (data, indices, batches) tuple, where data is a (V, 8) float32 array of interleaved
+        s, t, nx, ny, nz, x, y, z rows in the layout of GL_T2F_N3F_V3F, indices is a uint32 array of three vertex
+        indices per triangle, and batches is a list of (material, first, count) tuples giving the range of indices
+        drawn with each material.
+        """
+
+        triangles, faces = self.triangulate()
+        order = np.argsort(self.face_materials[faces], kind='stable')
+        triangles = triangles[order]
+        materials = self.face_materials[faces[order]]
+
+        corners = self.corners[triangles].reshape(-1, 3)
+        own_triangle = np.repeat(np.arange(len(triangles)), 3)
+        keys = np.column_stack((corners, np.where(corners[:, 2] == 0, own_triangle, -1)))
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+
+        # Index 0 marks a missing reference, so pad the arrays with a zero row in front of the 1-based indices
+        positions = np.vstack((np.zeros((1, 3), dtype=np.float32), self.vertices))
+        texcoords = np.vstack((np.zeros((1, 2), dtype=np.float32), self.texcoords))[unique[:, 1]]
+        normals = np.vstack((np.zeros((1, 3), dtype=np.float32), self.normals))[unique[:, 2]]
+
+        missing = unique[:, 2] == 0
+        if missing.any():
+            corner_positions = positions[corners[:, 0]].reshape(-1, 3, 3)
+            face_normals = np.cross(corner_positions[:, 1] - corner_positions[:, 0],
+                                    corner_positions[:, 2] - corner_positions[:, 0])
+            face_normals /= np.maximum(np.linalg.norm(face_normals, axis=1, keepdims=True), 1e-12)
+            normals[missing] = face_normals[unique[missing, 3]]
+
+        data = np.column_stack((texcoords, normals, positions[unique[:, 0]])).astype(np.float32)
+        indices = inverse.reshape(-1).astype(np.uint32)
+
+        batches = []
+        boundaries = np.flatnonzero(np.diff(materials)) + 1
+        for first, last in zip(np.concatenate(([0], boundaries)), np.concatenate((boundaries, [len(materials)]))):
+            if first == last:
+                continue
+            material = materials[first]
+            name = self.material_names[material] if material >= 0 else None
+            batches.append((name, int(first) * 3, int(last - first) * 3))
+        return data, indices, batches
+
+    def render(self, position=None, rotation=None):
         """
         Renders the object in the 3D space.
+
+        Parameters:
+        position (list): The position to render the object at. Defaults to None, in which case the object's own
+        position is used.
+        rotation (list): The rotation to render the object with. Defaults to None, in which case the object's own
+        rotation is used.
         """
 
+        position = self.position if position is None else position
+        rotation = self.rotation if rotation is None else rotation
         glPushMatrix()
-        glTranslatef(*self.position)
-        glRotatef(self.rotation[0], 1, 0, 0)
-        glRotatef(self.rotation[1], 0, 1, 0)
-        glRotatef(self.rotation[2], 0, 0, 1)
-        glCallList(self.gl_list)
+        glTranslatef(*position)
+        glRotatef(rotation[0], 1, 0, 0)
+        glRotatef(rotation[1], 0, 1, 0)
+        glRotatef(rotation[2], 0, 0, 1)
+        self.draw()
         glPopMatrix()
 
     def move(self, x, y, z):
@@ -249,24 +587,92 @@ class OBJ:
 
     def free(self):
         """
-        Deletes the object's OpenGL display list.
+        Deletes the object's OpenGL vertex and index buffers.
+        """
+
+        if self.vbo:
+            glDeleteBuffers(1, [self.vbo])
+            self.vbo = 0
+        if self.ibo:
+            glDeleteBuffers(1, [self.ibo])
+            self.ibo = 0
+
+    def compute_bounds(self):
+        """
+        Computes and caches the object's local-space center, bounding box and bounding sphere.
+
+        This walks every vertex once, so it is done when the object is loaded and scaled rather than every frame.
+        """
+
+        if len(self.vertices):
+            self.center = tuple(float(c) for c in self.vertices.mean(axis=0))
+            minimum = self.vertices.min(axis=0)
+            maximum = self.vertices.max(axis=0)
+        else:
+            self.center = (0.0, 0.0, 0.0)
+            minimum = maximum = np.zeros(3, dtype=np.float32)
+        self.bounding_box = (tuple(float(c) for c in minimum), tuple(float(c) for c in maximum))
+        self.bounding_radius = float(np.linalg.norm(maximum - minimum)) / 2
+
+    def transform_bounds(self, position, rotation, scaling=1):
+        """
+        Transforms the object's cached bounds into world space.
+
+        Only the eight corners of the cached bounding box are transformed, so the cost does not depend on the number
+        of vertices.
+
+        Parameters:
+        position (list): The x, y, and z coordinates of the object's position.
+        rotation (list): The object's rotation angles around the x, y and z axes, in degrees.
+        scaling (float): The object's uniform scale factor. Defaults to 1.
+
+        Returns:
+        tuple: A (box, sphere) tuple, where box holds the (min, max) corners of the world-space axis-aligned bounding
+        box, and sphere holds the (center, radius) of the world-space bounding sphere.
         """
 
-        glDeleteLists(self.gl_list, 1)
-        self.gl_list = 0
+        matrix = transform_matrix(position, rotation, scaling).T
+        minimum, maximum = self.bounding_box
+        corners = np.array([(x, y, z) for x in (minimum[0], maximum[0])
+                            for y in (minimum[1], maximum[1])
+                            for z in (minimum[2], maximum[2])])
+        corners = corners @ matrix[:3, :3].T + matrix[:3, 3]
+        box = (tuple(float(c) for c in corners.min(axis=0)), tuple(float(c) for c in corners.max(axis=0)))
+        middle = (np.array(minimum) + np.array(maximum)) / 2
+        center = tuple(float(c) for c in matrix[:3, :3] @ middle + matrix[:3, 3])
+        return box, (center, self.bounding_radius * abs(scaling))
 
     def calculate_center(self):
         """
-        Calculates the object's center point.
+        Gets the object's center point.
+
+        The center is cached when the object is loaded or scaled, so this is a constant time lookup.
 
         Returns:
         tuple: A tuple containing the x, y, and z coordinates of the center point.
         """
 
-        avg_x = sum(v[0] for v in self.vertices) / len(self.vertices)
-        avg_y = sum(v[1] for v in self.vertices) / len(self.vertices)
-        avg_z = sum(v[2] for v in self.vertices) / len(self.vertices)
-        return avg_x, avg_y, avg_z
+        return self.center
+
+    def get_bounding_box(self):
+        """
+        Gets the object's bounding box in world space.
+
+        Returns:
+        tuple: The (min, max) corners of the axis-aligned box enclosing the object at its position and rotation.
+        """
+
+        return self.transform_bounds(self.position, self.rotation)[0]
+
+    def get_bounding_sphere(self):
+        """
+        Gets the object's bounding sphere in world space.
+
+        Returns:
+        tuple: The (center, radius) of the sphere enclosing the object at its position and rotation.
+        """
+
+        return self.transform_bounds(self.position, self.rotation)[1]
 
     def get_position(self):
         """
@@ -290,8 +696,5 @@ class OBJ:
         scale (float): The scale factor.
         """
 
-        self.vertices = [list(vertex) for vertex in self.vertices]
-        for vertex in self.vertices:
-            vertex[0] *= scale
-            vertex[1] *= scale
-            vertex[2] *= scale
+        self.vertices = self.vertices * np.float32(scale)
+        self.compute_bounds()
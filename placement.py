@@ -0,0 +1,214 @@
+from math import ceil, cos, floor, pi, sin, sqrt
+
+# The area the trees are placed in, as (min_x, min_z, max_x, max_z)
+PLACEMENT_BOUNDS = (-100, -100, 200, 200)
+
+# The clearance kept between the trees and the track segments
+TRACK_CLEARANCE = 5
+
+# The width and depth of a cell of the exclusion grid. A point is excluded if its cell touches an excluded area, so
+# this is also the most extra clearance the rasterization adds.
+EXCLUSION_CELL_SIZE = 1
+
+# The shortest distance between two trees, which keeps their collision boxes apart
+TREE_SPACING = 6
+
+# The number of candidates tried around each placed point before it is retired, as in Bridson's algorithm
+SAMPLE_ATTEMPTS = 30
+
+# The number of random points tried when looking for a new starting point in a region not reached yet
+SEED_ATTEMPTS = 100
+
+
+class ExclusionGrid:
+    """
+    A class to represent the areas where nothing may be placed, rasterized into a uniform grid.
+
+    Rasterizing the areas once makes checking a point a single lookup, however many areas there are.
+
+    ...
+
+    Attributes
+    ----------
+    bounds : tuple
+        the (min_x, min_z, max_x, max_z) area covered by the grid
+    cell_size : float
+        the width and depth of a grid cell
+    columns : int
+        the number of cells along the x-axis
+    rows : int
+        the number of cells along the z-axis
+    cells : list
+        a bytearray for each row of cells, holding 1 for the excluded cells
+
+    Methods
+    -------
+    from_track(track_coordinates, clearance=TRACK_CLEARANCE, bounds=PLACEMENT_BOUNDS, cell_size=EXCLUSION_CELL_SIZE):
+        Builds the grid excluding the track segments and a clearance around them.
+    add_box(min_x, min_z, max_x, max_z):
+        Excludes every cell touching a box.
+    excluded(x, z):
+        Checks if a point is excluded.
+    """
+
+    def __init__(self, bounds=PLACEMENT_BOUNDS, cell_size=EXCLUSION_CELL_SIZE):
+        """
+        Constructs all the necessary attributes for the exclusion grid object.
+
+        Parameters:
+        bounds (tuple): The (min_x, min_z, max_x, max_z) area covered by the grid. Defaults to PLACEMENT_BOUNDS.
+        cell_size (float): The width and depth of a grid cell. Defaults to EXCLUSION_CELL_SIZE.
+        """
+
+        self.bounds = bounds
+        self.cell_size = cell_size
+        self.columns = max(1, ceil((bounds[2] - bounds[0]) / cell_size))
+        self.rows = max(1, ceil((bounds[3] - bounds[1]) / cell_size))
+        self.cells = [bytearray(self.columns) for _ in range(self.rows)]
+
+    @classmethod
+    def from_track(cls, track_coordinates, clearance=TRACK_CLEARANCE, bounds=PLACEMENT_BOUNDS,
+                   cell_size=EXCLUSION_CELL_SIZE):
+        """
+        Builds the grid excluding the track segments and a clearance around them.
+
+        Parameters:
+        track_coordinates (list): A list of (x, z, width, height) tuples, one for each track segment, as returned by
+        Racetrack.get_track_coordinates().
+        clearance (float): The distance kept around every segment. Defaults to TRACK_CLEARANCE.
+        bounds (tuple): The (min_x, min_z, max_x, max_z) area covered by the grid. Defaults to PLACEMENT_BOUNDS.
+        cell_size (float): The width and depth of a grid cell. Defaults to EXCLUSION_CELL_SIZE.
+
+        Returns:
+        ExclusionGrid: The grid excluding the track.
+        """
+
+        grid = cls(bounds, cell_size)
+        for x, z, w, h in track_coordinates:
+            grid.add_box(x - w / 2 - clearance, z - h / 2 - clearance, x + w / 2 + clearance, z + h / 2 + clearance)
+        return grid
+
+    def add_box(self, min_x, min_z, max_x, max_z):
+        """
+        Excludes every cell touching a box.
+
+        Parameters:
+        min_x (float): The smallest x-coordinate of the box.
+        min_z (float): The smallest z-coordinate of the box.
+        max_x (float): The largest x-coordinate of the box.
+        max_z (float): The largest z-coordinate of the box.
+        """
+
+        first_column = max(0, floor((min_x - self.bounds[0]) / self.cell_size))
+        last_column = min(self.columns - 1, floor((max_x - self.bounds[0]) / self.cell_size))
+        first_row = max(0, floor((min_z - self.bounds[1]) / self.cell_size))
+        last_row = min(self.rows - 1, floor((max_z - self.bounds[1]) / self.cell_size))
+        if first_column > last_column:
+            return
+        span = b'\x01' * (last_column - first_column + 1)
+        for row in range(first_row, last_row + 1):
+            self.cells[row][first_column:last_column + 1] = span
+
+    def excluded(self, x, z):
+        """
+        Checks if a point is excluded.
+
+        Parameters:
+        x (float): The x-coordinate of the point.
+        z (float): The z-coordinate of the point.
+
+        Returns:
+        bool: True if the point is in an excluded cell or outside the grid, False otherwise.
+        """
+
+        column = floor((x - self.bounds[0]) / self.cell_size)
+        row = floor((z - self.bounds[1]) / self.cell_size)
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            return True
+        return self.cells[row][column] == 1
+
+
+def poisson_disk(random, bounds=PLACEMENT_BOUNDS, spacing=TREE_SPACING, exclusion=None, limit=None,
+                 attempts=SAMPLE_ATTEMPTS):
+    """
+    Places points at least a given distance apart, with Poisson-disk sampling.
+
+    To fill the area, Bridson's algorithm is used: each placed point tries a fixed number of candidates in the ring
+    between one and two spacings around it, so the work is bounded by the number of points placed, whatever the
+    excluded areas look like. When no point can grow anymore, regions cut off by the excluded areas are reached by a
+    bounded number of random restarts. With a limit, points are instead thrown uniformly over the whole area, with at
+    most SEED_ATTEMPTS tries per point, so a few points spread over the area rather than growing around the first one.
+    Either way, the same random number generator state always gives the same points.
+
+    Parameters:
+    random (Random): The random number generator.
+    bounds (tuple): The (min_x, min_z, max_x, max_z) area to fill. Defaults to PLACEMENT_BOUNDS.
+    spacing (float): The shortest distance between two points. Defaults to TREE_SPACING.
+    exclusion (ExclusionGrid): The areas where no point may be placed. Defaults to None.
+    limit (int): The most points to place, thrown uniformly over the area. Defaults to None, in which case the area is
+    filled with Bridson's algorithm.
+    attempts (int): The number of candidates tried around each point. Defaults to SAMPLE_ATTEMPTS.
+
+    Returns:
+    list: A list of (x, z) tuples, in the order they were placed.
+    """
+
+    min_x, min_z, max_x, max_z = bounds
+    cell_size = spacing / sqrt(2)
+    columns = max(1, ceil((max_x - min_x) / cell_size))
+    rows = max(1, ceil((max_z - min_z) / cell_size))
+    # Each cell holds at most one point, as its diagonal is the spacing. The grid is padded by two cells on every side
+    # so the neighbors of any cell can be read without bounds checks, and the corners of the 5x5 neighborhood are
+    # skipped as they are always more than a spacing away.
+    stride = columns + 4
+    grid = [None] * (stride * (rows + 4))
+    neighbors = [row * stride + column for row in range(-2, 3) for column in range(-2, 3)
+                 if abs(row) != 2 or abs(column) != 2]
+    points = []
+    active = []
+    spacing_squared = spacing * spacing
+    uniform = random.uniform
+    unit = random.random
+
+    def accept(x, z):
+        if not (min_x <= x < max_x and min_z <= z < max_z):
+            return False
+        if exclusion is not None and exclusion.excluded(x, z):
+            return False
+        cell = (int((z - min_z) / cell_size) + 2) * stride + int((x - min_x) / cell_size) + 2
+        for offset in neighbors:
+            other = grid[cell + offset]
+            if other is not None and (other[0] - x) ** 2 + (other[1] - z) ** 2 < spacing_squared:
+                return False
+        grid[cell] = (x, z)
+        points.append((x, z))
+        active.append(len(points) - 1)
+        return True
+
+    if limit is not None:
+        for _ in range(limit * SEED_ATTEMPTS):
+            if len(points) >= limit:
+                break
+            accept(uniform(min_x, max_x), uniform(min_z, max_z))
+        return points
+
+    while True:
+        if not active:
+            for _ in range(SEED_ATTEMPTS):
+                if accept(uniform(min_x, max_x), uniform(min_z, max_z)):
+                    break
+            else:
+                break
+            continue
+        slot = int(unit() * len(active))
+        x, z = points[active[slot]]
+        for _ in range(attempts):
+            angle = 2 * pi * unit()
+            distance = spacing * (1 + unit())
+            if accept(x + distance * cos(angle), z + distance * sin(angle)):
+                break
+        else:
+            active[slot] = active[-1]
+            active.pop()
+
+    return points
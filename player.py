@@ -1,9 +1,82 @@
 from math import sin, cos, radians
 
-import pygame as pg
 import pygame.freetype
 
 from camera import Camera
+from controls import KeyboardControls
+
+# The rate the game simulation is stepped at, independently of the rendering frame rate
+TICK_RATE = 120
+
+# The frame rate the movement constants were tuned at. The constants are applied per frame at this rate and scaled for
+# other time steps.
+REFERENCE_RATE = 60
+
+# The most players a race can have
+MAX_PLAYERS = 4
+
+# The starting positions of the cars for each number of players, side by side behind the start line
+START_POSITIONS = {
+    1: [[0, 0, 0]],
+    2: [[-2, 0, 0], [2, 0, 0]],
+    3: [[-3, 0, 0], [0, 0, 0], [3, 0, 0]],
+    4: [[-3, 0, 0], [-1, 0, 0], [1, 0, 0], [3, 0, 0]]
+}
+
+# The ranks shown for each place in a race
+RANKS = ('1st', '2nd', '3rd', '4th')
+
+
+def rank_players(players):
+    """
+    Ranks any number of players by their lap count and timer.
+
+    This orders the players the same way Player.check_rank() orders two of them: more laps ranks first, and on equal
+    laps the later timer ranks first. Players with the same lap count and timer are all ranked 'Tie'.
+
+    Parameters:
+    players (list): The players in the race.
+    """
+
+    keys = [(player.lap_count, player.timer) for player in players]
+    order = sorted(range(len(players)), key=lambda i: keys[i], reverse=True)
+    for place, i in enumerate(order):
+        players[i].rank = 'Tie' if keys.count(keys[i]) > 1 else RANKS[place]
+
+
+class NullSound:
+    """
+    A class standing in for a sound effect when the game runs without audio.
+
+    ...
+
+    Methods
+    -------
+    play():
+        Does nothing.
+    stop():
+        Does nothing.
+    set_volume(volume):
+        Does nothing.
+    """
+
+    def play(self):
+        """
+        Does nothing.
+        """
+
+    def stop(self):
+        """
+        Does nothing.
+        """
+
+    def set_volume(self, volume):
+        """
+        Does nothing.
+
+        Parameters:
+        volume (float): The ignored volume.
+        """
 
 
 class Player:
@@ -16,20 +89,36 @@ class Player:
     ----------
     bindings : dict
         a dictionary containing the key bindings for the player's controls
+    controls : KeyboardControls
+        the source of the player's controls, such as the keyboard or a script
+    headless : bool
+        whether the player runs without a window, OpenGL context or audio
     state : dict
         a dictionary containing the player's current state
     car : OBJ
         the car object that the player is controlling
+    lods : LodSet
+        the levels of detail of the car's mesh, or None when the car is always drawn at full detail
     camera : Camera
         the camera object that follows the player's car
     lap_count : int
         the number of laps that the player has completed
     has_lap_counted : bool
         a flag indicating whether the lap count has been updated
+    next_gate : int
+        the index of the next checkpoint gate the car must cross, when laps are counted at a racetrack's gates
     timer : int
         a timer for tracking the time elapsed since the last lap
     rank : str
         the player's current rank in the race
+    previous_position : list
+        the car's position before the last movement step, used to interpolate the rendered car
+    previous_angle : float
+        the car's heading before the last movement step, used to interpolate the rendered car
+    render_position : list
+        the interpolated position the car is rendered at
+    render_rotation : list
+        the interpolated rotation the car is rendered with
     move_sound : Sound
         the sound effect for the car's movement
     idle_sound : Sound
@@ -41,17 +130,25 @@ class Player:
 
     Methods
     -------
-    update_lap_count(timer):
+    update_lap_count(timer, racetrack=None):
         Updates the player's lap count based on their position on the track.
-    check_collision(car_position, trees, move_x, move_z):
-        Checks if the player's car has collided with a tree.
-    movement(trees):
-        Updates the player's movement based on their current state and the key bindings.
+    check_collision(car_position, obstacles, move_x, move_z):
+        Checks if the player's car has collided with an obstacle.
+    movement(obstacles, dt=1 / REFERENCE_RATE):
+        Advances the player's movement by one time step based on their current state and the controls.
+    interpolate(alpha):
+        Places the rendered car and the camera between the last two movement steps.
+    update_camera(position, angle):
+        Places the camera behind the car.
+    render(frustum=None):
+        Renders the player's car at its interpolated pose.
+    get_bounding_sphere():
+        Gets the bounding sphere of the player's car at its interpolated pose.
     check_rank(player2):
         Checks and updates the player's rank based on their lap count and timer.
     """
 
-    def __init__(self, bindings, car, aspect_ratio=400 / 600):
+    def __init__(self, bindings, car, aspect_ratio=400 / 600, controls=None, headless=False):
         """
         Constructs all the necessary attributes for the player object.
 
@@ -59,40 +156,77 @@ class Player:
         bindings (dict): The key bindings for the player's controls.
         car (OBJ): The car object that the player is controlling.
         aspect_ratio (float): The aspect ratio of the player's screen. Defaults to 400 / 600.
+        controls (object): The source of the player's controls, with a read() method. Defaults to None, in which case
+        the keyboard is read using the bindings.
+        headless (bool): Whether to run without a window, OpenGL context or audio. A headless player neither sets up
+        its camera's projection nor loads its sound effects. Defaults to False.
         """
 
         self.bindings = bindings
+        self.controls = controls if controls is not None else KeyboardControls(bindings)
+        self.headless = headless
         self.state = {
             "move_speed": 0,
             "acceleration": 0.02,
             "deceleration": 0.008,
+            "max_speed": 0.5,
+            "max_reverse_speed": 0.3,
             "current_angle": 0,
-            "collision": [False, False]
+            "collision_radius": 0,
+            "collision": [False, False],
+            "contact_normal": None
         }
         self.car = car
+        assets = getattr(car, 'assets', None)
+        self.lods = assets.load_lods(car.mesh) if assets is not None and not headless else None
         self.camera = Camera()
-        self.camera.init(aspect_ratio)
+        if not headless:
+            self.camera.init(aspect_ratio)
         self.lap_count = 0
         self.has_lap_counted = True
+        self.next_gate = 1
         self.timer = 0
         self.rank = ''
-        self.move_sound = pygame.mixer.Sound('sound_effects/car_moving.wav')
-        self.move_sound.set_volume(0.2)
-        self.idle_sound = pygame.mixer.Sound('sound_effects/car_idle.wav')
-        self.idle_sound.set_volume(0.03)
-        self.start_sound = pygame.mixer.Sound('sound_effects/car_start.wav')
-        self.start_sound.set_volume(0.05)
-        self.collision_sound = pygame.mixer.Sound('sound_effects/collision.wav')
-        self.collision_sound.set_volume(0.2)
-
-    def update_lap_count(self, timer):
+        self.previous_position = list(car.get_position())
+        self.previous_angle = 0
+        self.render_position = list(car.get_position())
+        self.render_rotation = list(car.rotation)
+        if headless:
+            self.move_sound = self.idle_sound = self.start_sound = self.collision_sound = NullSound()
+        else:
+            self.move_sound = pygame.mixer.Sound('sound_effects/car_moving.wav')
+            self.move_sound.set_volume(0.2)
+            self.idle_sound = pygame.mixer.Sound('sound_effects/car_idle.wav')
+            self.idle_sound.set_volume(0.03)
+            self.start_sound = pygame.mixer.Sound('sound_effects/car_start.wav')
+            self.start_sound.set_volume(0.05)
+            self.collision_sound = pygame.mixer.Sound('sound_effects/collision.wav')
+            self.collision_sound.set_volume(0.2)
+
+    def update_lap_count(self, timer, racetrack=None):
         """
         Updates the player's lap count based on their position on the track.
 
+        With a racetrack, a lap is counted when the car crosses the start/finish line after crossing every checkpoint
+        gate of the track in order, so a lap cannot be cut short. The cars start behind the line, which is crossed
+        once before the first lap begins. Without one, a lap is counted in the box of the start line, as VehicleBatch
+        does.
+
         Parameters:
         timer (int): The current game timer.
+        racetrack (Racetrack): The racetrack whose gates are crossed. Defaults to None.
         """
 
+        if racetrack is not None:
+            gate = racetrack.crossed_gate(self.previous_position, self.car.get_position())
+            gate_count = len(racetrack.track.gates)
+            if gate is not None and gate == self.next_gate % gate_count:
+                if gate == 0:
+                    self.lap_count += 1
+                    self.timer = timer
+                self.next_gate = (gate + 1) % gate_count
+            return
+
         if timer - self.timer > 30000:
             self.timer = 0
             self.has_lap_counted = False
@@ -102,98 +236,84 @@ class Player:
             self.has_lap_counted = True
             self.timer = timer
 
-    def check_collision(self, car_position, trees, move_x, move_z):
+    def check_collision(self, car_position, obstacles, move_x, move_z):
         """
-        Checks if the player's car has collided with a tree.
+        Checks if the player's car collides with an obstacle along a movement.
+
+        The whole path of the movement is swept, so the car cannot skip over an obstacle at high speed.
 
         Parameters:
         car_position (tuple): The current position of the car.
-        trees (list): A list of tree objects.
+        obstacles (SpatialGrid): The grid indexing the obstacles, such as trees.
         move_x (float): The x-coordinate of the car's movement vector.
         move_z (float): The z-coordinate of the car's movement vector.
 
         Returns:
-        bool: True if the car has collided with a tree, False otherwise.
+        bool: True if the car collides with an obstacle, False otherwise.
         """
 
-        new_car_position = (car_position[0] + move_x, car_position[1], car_position[2] + move_z)
-        for tree in trees:
-            tp = tree.get_position()
-            min_x = tp[0] - 2
-            min_z = tp[2] - 2
-            max_x = tp[0] + 2
-            max_z = tp[2] + 2
-
-            if (min_x < new_car_position[0] < max_x and min_z < new_car_position[2] < max_z):
-                return True
-        return False
+        hit = obstacles.sweep(car_position[0], car_position[2], move_x, move_z, self.state["collision_radius"])
+        return hit is not None
 
-    def movement(self, trees):
+    def movement(self, obstacles, dt=1 / REFERENCE_RATE):
         """
-        Updates the player's movement based on their current state and the key bindings.
+        Advances the player's movement by one time step based on their current state and the controls.
+
+        The movement constants are tuned per frame at REFERENCE_RATE, and are scaled by the length of the time step,
+        so the car behaves the same whatever rate the simulation runs at.
 
         Parameters:
-        trees (list): A list of tree objects.
+        obstacles (SpatialGrid): The grid indexing the obstacles, such as trees.
+        dt (float): The length of the time step, in seconds. Defaults to one frame at REFERENCE_RATE.
         """
 
-        keys = pg.key.get_pressed()
+        frames = dt * REFERENCE_RATE
+        self.previous_position = list(self.car.get_position())
+        self.previous_angle = self.state["current_angle"]
+
+        keys = self.controls.read()
         rotate_angle = 0
-        if keys[self.bindings["forward"]]:
-            self.state["move_speed"] += self.state["acceleration"]
-        elif keys[self.bindings["backward"]]:
-            self.state["move_speed"] -= self.state["acceleration"]
+        if keys["forward"]:
+            self.state["move_speed"] += self.state["acceleration"] * frames
+        elif keys["backward"]:
+            self.state["move_speed"] -= self.state["acceleration"] * frames
         else:
             if self.state["move_speed"] > 0:
-                self.state["move_speed"] -= self.state["deceleration"]
+                self.state["move_speed"] -= self.state["deceleration"] * frames
             elif self.state["move_speed"] < 0:
-                self.state["move_speed"] += self.state["deceleration"]
+                self.state["move_speed"] += self.state["deceleration"] * frames
 
         if abs(self.state["move_speed"]) > 0.005:
-            if keys[self.bindings["left"]]:
-                rotate_angle = 2
-            elif keys[self.bindings["right"]]:
-                rotate_angle = -2
+            if keys["left"]:
+                rotate_angle = 2 * frames
+            elif keys["right"]:
+                rotate_angle = -2 * frames
 
-        self.state["move_speed"] = min(max(self.state["move_speed"], -0.3), 0.5)
+        self.state["move_speed"] = min(max(self.state["move_speed"], -self.state["max_reverse_speed"]),
+                                       self.state["max_speed"])
 
         if rotate_angle != 0:
             self.state["current_angle"] += rotate_angle
             self.state["current_angle"] %= 360
 
-        move_x = self.state["move_speed"] * sin(radians(self.state["current_angle"]))
-        move_z = self.state["move_speed"] * cos(radians(self.state["current_angle"]))
+        move_x = self.state["move_speed"] * frames * sin(radians(self.state["current_angle"]))
+        move_z = self.state["move_speed"] * frames * cos(radians(self.state["current_angle"]))
 
+        # Sweep the car along its movement, sliding along any obstacle it hits
         car_position = self.car.get_position()
-
-        if self.state["move_speed"] > 0:
-            if not self.state["collision"][1]:
-                self.state["collision"][0] = self.check_collision(car_position, trees, move_x, move_z)
-                if self.state["collision"][0]:
-                    move_x = move_z = 0
-                    self.state["current_angle"] -= rotate_angle
-                    rotate_angle = 0
-        elif self.state["move_speed"] < 0:
-            if not self.state["collision"][0]:
-                self.state["collision"][1] = self.check_collision(car_position, trees, move_x, move_z)
-                if self.state["collision"][1]:
-                    move_x = move_z = 0
-                    self.state["current_angle"] -= rotate_angle
-                    rotate_angle = 0
-
-        self.car.move(-move_x, 0, -move_z)
+        new_x, new_z, normal = obstacles.slide(car_position[0], car_position[2], -move_x, -move_z,
+                                               self.state["collision_radius"])
+        collided = normal is not None
+        self.state["collision"] = [collided and self.state["move_speed"] > 0,
+                                   collided and self.state["move_speed"] < 0]
+        self.state["contact_normal"] = normal
+
+        self.car.move(new_x - car_position[0], 0, new_z - car_position[2])
         if rotate_angle != 0:
             self.car.rotate(rotate_angle, 0, 0)
 
-        car_position = self.car.get_position()
-        car_center = self.car.calculate_center()
-        cam_distance = 10
-        cam_height = 5
-        cam_x = car_position[0] + cam_distance * sin(radians(self.state["current_angle"]))
-        cam_y = car_position[1] - cam_height
-        cam_z = car_position[2] + cam_distance * cos(radians(self.state["current_angle"]))
-        self.camera.set_position(-cam_x, cam_y, -cam_z)
-        self.camera.set_yaw(-self.state["current_angle"])
-        self.camera.look_at(car_center[0], cam_y, car_center[2])
+        if not self.headless:
+            self.interpolate(1)
         if 0.1 > self.state["move_speed"] and self.state["collision"] == [False, False]:
             self.move_sound.stop()
             self.idle_sound.play()
@@ -204,6 +324,68 @@ class Player:
             self.idle_sound.stop()
             self.move_sound.play()
 
+    def interpolate(self, alpha):
+        """
+        Places the rendered car and the camera between the last two movement steps.
+
+        Parameters:
+        alpha (float): How far between the previous and the current step to place the car, from 0 to 1.
+        """
+
+        position = [previous + (current - previous) * alpha
+                    for previous, current in zip(self.previous_position, self.car.get_position())]
+        turn = (self.state["current_angle"] - self.previous_angle + 180) % 360 - 180
+        angle = self.previous_angle + turn * alpha
+        rotation = list(self.car.rotation)
+        rotation[1] += angle - self.state["current_angle"]
+        self.render_position = position
+        self.render_rotation = rotation
+        self.update_camera(position, angle)
+
+    def update_camera(self, position, angle):
+        """
+        Places the camera behind the car.
+
+        Parameters:
+        position (list): The x, y, and z coordinates of the car's position.
+        angle (float): The car's heading, in degrees.
+        """
+
+        car_center = self.car.calculate_center()
+        cam_distance = 10
+        cam_height = 5
+        cam_x = position[0] + cam_distance * sin(radians(angle))
+        cam_y = position[1] - cam_height
+        cam_z = position[2] + cam_distance * cos(radians(angle))
+        self.camera.set_position(-cam_x, cam_y, -cam_z)
+        self.camera.set_yaw(-angle)
+        self.camera.look_at(car_center[0], cam_y, car_center[2])
+
+    def render(self, frustum=None):
+        """
+        Renders the player's car at its interpolated pose.
+
+        Parameters:
+        frustum (Frustum): The view frustum of the current viewport, used to pick the car's level of detail from its
+        size on screen. Defaults to None, in which case the car is drawn at full detail.
+        """
+
+        mesh = None
+        if self.lods is not None and frustum is not None:
+            center, radius = self.get_bounding_sphere()
+            mesh = self.lods.levels[self.lods.select([center], [radius], frustum)[0]]
+        self.car.render(self.render_position, self.render_rotation, mesh)
+
+    def get_bounding_sphere(self):
+        """
+        Gets the bounding sphere of the player's car at its interpolated pose.
+
+        Returns:
+        tuple: The (center, radius) of the sphere enclosing the rendered car.
+        """
+
+        return self.car.mesh.transform_bounds(self.render_position, self.render_rotation, self.car.scaling)[1]
+
     def check_rank(self, player2):
         """
         Checks and updates the player's rank based on their lap count and timer.
@@ -0,0 +1,270 @@
+from contextlib import contextmanager
+from time import perf_counter_ns
+
+import numpy as np
+from OpenGL.GL import *
+
+from hud import begin_overlay, end_overlay
+
+# The number of frames kept in the profiler's ring buffer
+PROFILE_FRAMES = 600
+
+# The percentiles of the frame and stage times reported by the profiler
+PROFILE_PERCENTILES = (50, 95, 99)
+
+# The file the profiler's statistics are written to on exit
+PROFILE_FILE = 'frame_profile.txt'
+
+# The height of one millisecond in the profiler graph, in pixels
+GRAPH_PIXELS_PER_MS = 6
+
+# The frame time marked by a line across the profiler graph, in milliseconds
+GRAPH_TARGET_MS = 1000 / 60
+
+# The colours the stages are drawn with in the profiler graph, in the order the stages are first timed
+GRAPH_COLORS = ((0.9, 0.3, 0.3), (0.3, 0.8, 0.3), (0.3, 0.5, 0.95), (0.95, 0.8, 0.2), (0.7, 0.4, 0.9),
+                (0.2, 0.85, 0.85), (0.95, 0.55, 0.2), (0.6, 0.6, 0.6))
+
+
+class FrameProfiler:
+    """
+    A class to time the stages of every frame, keeping the timings of the last frames in a ring buffer.
+
+    A frame is timed between begin_frame() and end_frame(), and each stage inside it with the stage() context manager.
+    A stage timed several times in one frame, such as the movement of every player at every simulation step, adds up.
+    Counts such as the frame's OpenGL calls can be recorded alongside the times with record_counts().
+
+    ...
+
+    Attributes
+    ----------
+    frames : int
+        the number of frames kept in the ring buffer
+    frame_times : ndarray
+        the ring buffer of the frame times, in nanoseconds
+    stage_times : dict
+        a dictionary mapping each stage's name to its ring buffer of times, in nanoseconds
+    current : dict
+        a dictionary mapping the stages timed in the current frame to their time so far, in nanoseconds
+    count_history : dict
+        a dictionary mapping each count's name to its ring buffer of values
+    current_counts : dict
+        a dictionary mapping the counts recorded in the current frame to their values
+    frame_start : int
+        the time the current frame began at, in nanoseconds
+    count : int
+        the number of frames recorded since the profiler was created
+
+    Methods
+    -------
+    begin_frame():
+        Starts timing a frame.
+    stage(name):
+        Times a stage of the current frame.
+    record_counts(counts):
+        Records counts of the current frame, such as its OpenGL calls.
+    end_frame():
+        Stops timing the current frame and records it in the ring buffer.
+    recent(name=None):
+        Gets the recorded times of the frames or of a stage, or the values of a count, oldest first.
+    percentiles(percentiles=PROFILE_PERCENTILES):
+        Computes percentiles of the recorded frame and stage times, and of the counts.
+    report(percentiles=PROFILE_PERCENTILES):
+        Formats the percentiles of the recorded frame and stage times, and of the counts.
+    dump(filename=PROFILE_FILE):
+        Writes the report to a file.
+    draw(hud, x, y):
+        Draws a graph of the recorded frames, one stacked bar of stage times for each frame.
+    """
+
+    def __init__(self, frames=PROFILE_FRAMES):
+        """
+        Constructs all the necessary attributes for the frame profiler object.
+
+        Parameters:
+        frames (int): The number of frames kept in the ring buffer. Defaults to PROFILE_FRAMES.
+        """
+
+        self.frames = frames
+        self.frame_times = np.zeros(frames, dtype=np.int64)
+        self.stage_times = {}
+        self.current = {}
+        self.count_history = {}
+        self.current_counts = {}
+        self.frame_start = 0
+        self.count = 0
+
+    def begin_frame(self):
+        """
+        Starts timing a frame.
+        """
+
+        self.current = {}
+        self.current_counts = {}
+        self.frame_start = perf_counter_ns()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times a stage of the current frame.
+
+        Parameters:
+        name (str): The name of the stage, such as 'render'.
+        """
+
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.current[name] = self.current.get(name, 0) + perf_counter_ns() - start
+
+    def record_counts(self, counts):
+        """
+        Records counts of the current frame, such as its OpenGL calls.
+
+        Parameters:
+        counts (dict): A dictionary mapping the names of the counts to their values in the current frame.
+        """
+
+        self.current_counts.update(counts)
+
+    def end_frame(self):
+        """
+        Stops timing the current frame and records it in the ring buffer.
+        """
+
+        index = self.count % self.frames
+        self.frame_times[index] = perf_counter_ns() - self.frame_start
+        for history, current in ((self.stage_times, self.current), (self.count_history, self.current_counts)):
+            for name in current:
+                if name not in history:
+                    history[name] = np.zeros(self.frames, dtype=np.int64)
+            for name, values in history.items():
+                values[index] = current.get(name, 0)
+        self.count += 1
+
+    def recent(self, name=None):
+        """
+        Gets the recorded times of the frames or of a stage, or the values of a count, oldest first.
+
+        Parameters:
+        name (str): The name of the stage or count. Defaults to None, in which case the frame times are returned.
+
+        Returns:
+        ndarray: The recorded times, in nanoseconds, or counts of at most the last frames frames.
+        """
+
+        if name is None:
+            times = self.frame_times
+        else:
+            times = self.stage_times[name] if name in self.stage_times else self.count_history[name]
+        if self.count <= self.frames:
+            return times[:self.count]
+        return np.roll(times, -(self.count % self.frames))
+
+    def percentiles(self, percentiles=PROFILE_PERCENTILES):
+        """
+        Computes percentiles of the recorded frame and stage times, and of the counts.
+
+        Parameters:
+        percentiles (tuple): The percentiles to compute. Defaults to PROFILE_PERCENTILES.
+
+        Returns:
+        dict: A dictionary mapping 'frame' and each stage's name to the list of its percentiles, in milliseconds, and
+        each count's name to the list of its percentiles.
+        """
+
+        if not self.count:
+            return {}
+        stats = {'frame': (np.percentile(self.recent(), percentiles) / 1e6).tolist()}
+        for name in self.stage_times:
+            stats[name] = (np.percentile(self.recent(name), percentiles) / 1e6).tolist()
+        for name in self.count_history:
+            stats[name] = np.percentile(self.recent(name), percentiles).tolist()
+        return stats
+
+    def report(self, percentiles=PROFILE_PERCENTILES):
+        """
+        Formats the percentiles of the recorded frame and stage times, and of the counts.
+
+        Parameters:
+        percentiles (tuple): The percentiles to compute. Defaults to PROFILE_PERCENTILES.
+
+        Returns:
+        str: A table with a line for the frames and for each stage, in milliseconds, followed by a table with a line
+        for each count.
+        """
+
+        recorded = min(self.count, self.frames)
+        header = ''.join(f"{f'p{percentile}':>10}" for percentile in percentiles)
+        lines = [f"{recorded} frames, times in ms", f"{'stage':<20}" + header]
+        stats = self.percentiles(percentiles)
+        for name, values in stats.items():
+            if name not in self.count_history:
+                lines.append(f"{name:<20}" + ''.join(f"{value:>10.3f}" for value in values))
+        if self.count_history:
+            lines.append(f"{'count':<20}" + header)
+            for name in self.count_history:
+                lines.append(f"{name:<20}" + ''.join(f"{value:>10.0f}" for value in stats[name]))
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, filename=PROFILE_FILE):
+        """
+        Writes the report to a file.
+
+        Parameters:
+        filename (str): The path to the file. Defaults to PROFILE_FILE.
+        """
+
+        with open(filename, 'w') as file:
+            file.write(self.report())
+
+    def draw(self, hud, x, y):
+        """
+        Draws a graph of the recorded frames, one stacked bar of stage times for each frame.
+
+        Each frame is a column one pixel wide, the newest on the right, with a line marking GRAPH_TARGET_MS. The
+        stages are stacked in the order of the legend queued on the HUD beside it, which lists their p95 times from the
+        bottom up, topped by the p95 frame time and the last frame's counts.
+
+        Parameters:
+        hud (HudRenderer): The HUD the graph is drawn over and the legend is queued on.
+        x (int): The x-coordinate of the graph's lower left corner, in pixels from the left of the window.
+        y (int): The y-coordinate of the graph's lower left corner, in pixels from the bottom of the window.
+        """
+
+        if not self.count:
+            return
+        names = list(self.stage_times)
+        stages = np.array([self.recent(name) for name in names], dtype=np.float64).reshape(len(names), -1)
+        stages *= GRAPH_PIXELS_PER_MS / 1e6
+        columns = stages.shape[1]
+        tops = np.cumsum(stages, axis=0)
+        bottoms = tops - stages
+        left = np.broadcast_to(x + self.frames - columns + np.arange(columns, dtype=np.float64), stages.shape)
+        colors = np.array([GRAPH_COLORS[i % len(GRAPH_COLORS)] for i in range(len(names))]).reshape(-1, 1, 3)
+        colors = np.broadcast_to(colors, stages.shape + (3,))
+
+        target = y + GRAPH_TARGET_MS * GRAPH_PIXELS_PER_MS
+        quads = np.zeros(stages.shape + (4, 6), dtype=np.float32)
+        quads[..., :3] = colors[..., None, :]
+        quads[..., 0, 3:5] = np.stack((left, y + bottoms), axis=-1)
+        quads[..., 1, 3:5] = np.stack((left + 1, y + bottoms), axis=-1)
+        quads[..., 2, 3:5] = np.stack((left + 1, y + tops), axis=-1)
+        quads[..., 3, 3:5] = np.stack((left, y + tops), axis=-1)
+        line = np.array([[1, 1, 1, x, target, 0], [1, 1, 1, x + self.frames, target, 0],
+                         [1, 1, 1, x + self.frames, target + 1, 0], [1, 1, 1, x, target + 1, 0]], dtype=np.float32)
+        vertices = np.ascontiguousarray(np.concatenate((quads.reshape(-1, 6), line)))
+
+        begin_overlay(hud.width, hud.height)
+        glInterleavedArrays(GL_C3F_V3F, 0, vertices)
+        glDrawArrays(GL_QUADS, 0, len(vertices))
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        end_overlay()
+
+        stats = self.percentiles((95,))
+        legend = [f"{name} {stats[name][0]:.2f}" for name in names] + [f"frame {stats['frame'][0]:.2f}"]
+        legend += [f"{name} {self.recent(name)[-1]}" for name in self.count_history]
+        for i, text in enumerate(legend):
+            hud.draw_text(x + self.frames + 10, y + i * hud.atlas.line_height, text)
@@ -0,0 +1,175 @@
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from random import Random
+
+from controls import ACTIONS, ScriptedControls
+from headless import HeadlessRace
+
+
+def random_script(seed, runs=200, max_ticks=120):
+    """
+    Generates a random script of controls.
+
+    Forward is pressed more often than the other actions, so the cars get around the track instead of idling.
+
+    Parameters:
+    seed (int): The seed of the script, so that the same seed always gives the same script.
+    runs (int): The number of (ticks, actions) runs in the script. Defaults to 200.
+    max_ticks (int): The maximum number of steps a run lasts. Defaults to 120.
+
+    Returns:
+    list: A list of (ticks, actions) runs, as played by ScriptedControls.
+    """
+
+    rng = Random(seed)
+    script = []
+    for _ in range(runs):
+        actions = {action for action in ACTIONS[1:] if rng.random() < 0.3}
+        if rng.random() < 0.8:
+            actions.add('forward')
+        script.append((rng.randint(1, max_ticks), actions))
+    return script
+
+
+def run_race(race):
+    """
+    Runs one headless race to the end.
+
+    This is the function run by the worker processes, so it only takes and returns plain picklable data.
+
+    Parameters:
+    race (dict): The race to run, holding an 'id', the 'scripts' of the players, the 'seed' of the tree placement and
+    the number of 'ticks' to run, which can be None to run until every script is over.
+
+    Returns:
+    dict: The race's id, seed and wall-clock duration in seconds, with the standings returned by
+    HeadlessRace.results().
+    """
+
+    start = time.perf_counter()
+    headless_race = HeadlessRace([ScriptedControls(script) for script in race['scripts']], seed=race.get('seed'))
+    results = headless_race.run(race.get('ticks'))
+    headless_race.free()
+    results.update(id=race.get('id'), seed=race.get('seed'), duration=time.perf_counter() - start)
+    return results
+
+
+class RaceFarm:
+    """
+    A class to run many independent headless races in parallel across worker processes.
+
+    ...
+
+    Attributes
+    ----------
+    workers : int
+        the number of worker processes, or None to use one per CPU core
+    results : list
+        the results of the races completed so far, in the order they completed
+
+    Methods
+    -------
+    run(races):
+        Runs races in parallel, yielding the results of each race as soon as it completes.
+    aggregate():
+        Summarizes the results of the races completed so far.
+    """
+
+    def __init__(self, workers=None):
+        """
+        Constructs all the necessary attributes for the race farm object.
+
+        Parameters:
+        workers (int): The number of worker processes. Defaults to None, in which case one is used per CPU core.
+        """
+
+        self.workers = workers
+        self.results = []
+
+    def run(self, races):
+        """
+        Runs races in parallel, yielding the results of each race as soon as it completes.
+
+        Parameters:
+        races (list): A list of races, as taken by run_race().
+
+        Returns:
+        generator: The results of each race, as returned by run_race(), in the order the races complete.
+        """
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(run_race, race) for race in races]
+            for future in as_completed(futures):
+                result = future.result()
+                self.results.append(result)
+                yield result
+
+    def aggregate(self):
+        """
+        Summarizes the results of the races completed so far.
+
+        Returns:
+        dict: A dictionary holding the number of races and simulated steps, the best and mean lap times in
+        milliseconds, the mean number of collisions per player, and how often each player finished at each rank.
+        """
+
+        lap_times = [lap_time for result in self.results for player in result['players']
+                     for lap_time in player['lap_times']]
+        collisions = [player['collisions'] for result in self.results for player in result['players']]
+        ranks = {}
+        for result in self.results:
+            for i, player in enumerate(result['players']):
+                player_ranks = ranks.setdefault(i, {})
+                player_ranks[player['rank']] = player_ranks.get(player['rank'], 0) + 1
+        return {
+            'races': len(self.results),
+            'ticks': sum(result['ticks'] for result in self.results),
+            'laps': len(lap_times),
+            'best_lap': min(lap_times) if lap_times else None,
+            'mean_lap': sum(lap_times) / len(lap_times) if lap_times else None,
+            'mean_collisions': sum(collisions) / len(collisions) if collisions else 0,
+            'ranks': ranks,
+        }
+
+
+def main():
+    """
+    Runs a farm of random two-player races and prints each result as it arrives, then the summary.
+
+    The number of races and of worker processes can be given as the first and second command line arguments.
+
+    Returns:
+    int: 0 once every race has completed.
+    """
+
+    race_count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    races = [{
+        'id': i,
+        'scripts': [random_script(2 * i), random_script(2 * i + 1)],
+        'seed': i,
+        'ticks': None,
+    } for i in range(race_count)]
+
+    farm = RaceFarm(workers)
+    start = time.perf_counter()
+    for result in farm.run(races):
+        players = ", ".join(f"{player['rank'] or '-'} {player['lap_count']} laps {player['collisions']} collisions"
+                            for player in result['players'])
+        print(f"race {result['id']}: {result['ticks']} ticks in {result['duration']:.2f}s: {players}")
+    elapsed = time.perf_counter() - start
+
+    summary = farm.aggregate()
+    print(f"{summary['races']} races, {summary['ticks']} ticks in {elapsed:.2f}s "
+          f"({summary['ticks'] / elapsed:.0f} ticks per second)")
+    if summary['laps']:
+        print(f"{summary['laps']} laps, best {summary['best_lap']} ms, mean {summary['mean_lap']:.0f} ms")
+    print(f"mean collisions per player: {summary['mean_collisions']:.2f}")
+    for i, player_ranks in summary['ranks'].items():
+        print(f"player {i + 1} ranks: {player_ranks}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import struct
+import sys
+import time
+import zlib
+
+from controls import RecordingControls, ReplayControls
+from headless import HeadlessRace
+from player import TICK_RATE
+
+# The header of an input log: magic, format version, player count, tick rate, tree placement seed and step count
+LOG_HEADER = struct.Struct('<8sHHIQI')
+LOG_MAGIC = b'RACEINPT'
+LOG_VERSION = 5
+
+
+class InputLog:
+    """
+    A class to represent the recorded inputs of a race, which is enough to replay it exactly.
+
+    The simulation only depends on the players' inputs at each step and on the seed of the tree placement, so a race
+    is stored as that seed and one input bitmask per player per step. On disk, the bitmasks are interleaved step by
+    step after a fixed header and compressed, which shrinks the long runs of held keys to almost nothing.
+
+    ...
+
+    Attributes
+    ----------
+    seed : int
+        the seed of the environment's tree placement
+    tick_rate : int
+        the number of simulation steps per second of race time
+    inputs : list
+        the recorded input bitmasks of each player, as one bytearray per player with one byte per step
+
+    Methods
+    -------
+    recorder(player, controls):
+        Wraps a player's controls to record them into the log.
+    controls():
+        Creates the controls replaying each player's recorded inputs.
+    tick_count():
+        Gets the number of steps recorded.
+    save(filename):
+        Writes the log to a file.
+    load(filename):
+        Reads a log from a file.
+    """
+
+    def __init__(self, seed, player_count, tick_rate=TICK_RATE):
+        """
+        Constructs all the necessary attributes for the input log object.
+
+        Parameters:
+        seed (int): The seed of the environment's tree placement.
+        player_count (int): The number of players in the race.
+        tick_rate (int): The number of simulation steps per second of race time. Defaults to TICK_RATE.
+        """
+
+        self.seed = seed
+        self.tick_rate = tick_rate
+        self.inputs = [bytearray() for _ in range(player_count)]
+
+    def recorder(self, player, controls):
+        """
+        Wraps a player's controls to record them into the log.
+
+        Parameters:
+        player (int): The index of the player.
+        controls (object): The source of the player's controls, such as a KeyboardControls object.
+
+        Returns:
+        RecordingControls: The controls to give to the player.
+        """
+
+        return RecordingControls(controls, self.inputs[player])
+
+    def controls(self):
+        """
+        Creates the controls replaying each player's recorded inputs.
+
+        Returns:
+        list: A list of ReplayControls objects, one for each player.
+        """
+
+        return [ReplayControls(inputs) for inputs in self.inputs]
+
+    def tick_count(self):
+        """
+        Gets the number of steps recorded.
+
+        Returns:
+        int: The number of steps recorded for every player.
+        """
+
+        return min((len(inputs) for inputs in self.inputs), default=0)
+
+    def save(self, filename):
+        """
+        Writes the log to a file.
+
+        Parameters:
+        filename (str): The path of the file to write.
+        """
+
+        ticks = self.tick_count()
+        interleaved = bytearray(ticks * len(self.inputs))
+        for player, inputs in enumerate(self.inputs):
+            interleaved[player::len(self.inputs)] = inputs[:ticks]
+        with open(filename, 'wb') as file:
+            file.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, len(self.inputs), self.tick_rate, self.seed, ticks))
+            file.write(zlib.compress(bytes(interleaved), 9))
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Reads a log from a file.
+
+        Parameters:
+        filename (str): The path of the file to read.
+
+        Returns:
+        InputLog: The log read from the file.
+
+        Raises:
+        ValueError: If the file is not an input log, or was written by another version of the format.
+        """
+
+        with open(filename, 'rb') as file:
+            data = file.read()
+        if len(data) < LOG_HEADER.size:
+            raise ValueError(f"{filename} is not an input log")
+        magic, version, player_count, tick_rate, seed, ticks = LOG_HEADER.unpack_from(data)
+        if magic != LOG_MAGIC:
+            raise ValueError(f"{filename} is not an input log")
+        if version != LOG_VERSION:
+            raise ValueError(f"{filename} has input log version {version}, expected {LOG_VERSION}")
+        interleaved = zlib.decompress(data[LOG_HEADER.size:])
+        if len(interleaved) != ticks * player_count:
+            raise ValueError(f"{filename} is truncated")
+
+        log = cls(seed, player_count, tick_rate)
+        for player in range(player_count):
+            log.inputs[player] = bytearray(interleaved[player::player_count])
+        return log
+
+
+def replay(filename):
+    """
+    Replays a recorded race in headless mode, as fast as the CPU allows.
+
+    Parameters:
+    filename (str): The path of the input log.
+
+    Returns:
+    dict: The standings at the end of the race, as returned by HeadlessRace.results().
+    """
+
+    log = InputLog.load(filename)
+    race = HeadlessRace(log.controls(), tick_rate=log.tick_rate, seed=log.seed, streamed=True)
+    results = race.run(log.tick_count())
+    race.free()
+    return results
+
+
+def main():
+    """
+    Replays the input log given as the first command line argument and prints the standings.
+
+    Returns:
+    int: 0 once the race has been replayed.
+    """
+
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'last_race.rpl'
+    start = time.perf_counter()
+    results = replay(filename)
+    elapsed = time.perf_counter() - start
+    print(f"replayed {results['ticks']} ticks ({results['timer'] / 1000:.1f}s of race time) in {elapsed:.2f}s")
+    for i, player in enumerate(results['players']):
+        print(f"player {i + 1}: {player['lap_count']} laps, rank {player['rank'] or '-'}, "
+              f"lap times {player['lap_times']}, {player['collisions']} collisions, position {player['position']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+from math import floor
+
+# The distance kept between an object and the face of an obstacle it stopped against
+CONTACT_SKIN = 1e-4
+
+
+def sweep_box(x, z, move_x, move_z, box, radius=0):
+    """
+    Sweeps a square along a movement vector against an axis-aligned box on the x/z plane.
+
+    The square, centered on the moving point with a half-width of radius, is tested as a point against the box grown
+    by radius on every side. A point already inside the box is not reported, so an object stuck in an obstacle can
+    always move out of it, but a point on a face of the box moving into it is a contact at the very start.
+
+    Parameters:
+    x (float): The x-coordinate of the start of the movement.
+    z (float): The z-coordinate of the start of the movement.
+    move_x (float): The x-coordinate of the movement vector.
+    move_z (float): The z-coordinate of the movement vector.
+    box (tuple): The (min_x, min_z, max_x, max_z) box of the obstacle.
+    radius (float): The half-width of the moving square. Defaults to 0.
+
+    Returns:
+    tuple: A (t, normal) tuple, where t is the fraction of the movement done before the contact and normal is the
+    (x, z) normal of the face that was hit, or None if the movement does not enter the box.
+    """
+
+    min_x, min_z, max_x, max_z = box[0] - radius, box[1] - radius, box[2] + radius, box[3] + radius
+    if min_x < x < max_x and min_z < z < max_z:
+        return None
+
+    t_enter = float('-inf')
+    t_exit = 1.0
+    normal = None
+    for start, move, low, high, axis in ((x, move_x, min_x, max_x, (1, 0)), (z, move_z, min_z, max_z, (0, 1))):
+        if move == 0:
+            if start <= low or start >= high:
+                return None
+            continue
+        t_low = (low - start) / move
+        t_high = (high - start) / move
+        if move > 0:
+            t_near, t_far, face_normal = t_low, t_high, (-axis[0], -axis[1])
+        else:
+            t_near, t_far, face_normal = t_high, t_low, axis
+        if t_near > t_enter:
+            t_enter = t_near
+            normal = face_normal
+        t_exit = min(t_exit, t_far)
+        if max(0.0, t_enter) >= t_exit:
+            return None
+    if normal is None:
+        return None
+    return max(0.0, t_enter), normal
+
+
+class SpatialGrid:
+    """
+    A class to represent a static uniform grid indexing obstacles on the ground plane.
+
+    Every obstacle is stored as an axis-aligned box on the x/z plane, in each grid cell the box overlaps. A query only
+    visits the cells around the queried point or segment, so its cost does not depend on the total number of
+    obstacles.
+
+    ...
+
+    Attributes
+    ----------
+    cell_size : float
+        the width and depth of a grid cell
+    boxes : list
+        a list of (min_x, min_z, max_x, max_z) tuples, one for each obstacle
+    objects : list
+        a list of the indexed objects, in the same order as the boxes
+    cells : dict
+        a dictionary mapping (column, row) grid cells to the indices of the obstacles overlapping them
+
+    Methods
+    -------
+    from_objects(objects, half_size=2, cell_size=8):
+        Builds a grid from objects, using a square box around each object's position.
+    cell(x, z):
+        Gets the grid cell containing a point.
+    insert(box, obj=None):
+        Adds an obstacle to the grid.
+    query_box(min_x, min_z, max_x, max_z):
+        Gets the obstacles whose boxes may overlap an area.
+    query_point(x, z, radius=0):
+        Gets the obstacles near a point.
+    query_segment(start_x, start_z, end_x, end_z, radius=0):
+        Gets the obstacles near a segment.
+    sweep(x, z, move_x, move_z, radius=0):
+        Finds the first obstacle hit along a movement.
+    slide(x, z, move_x, move_z, radius=0, iterations=3):
+        Moves along a movement vector, sliding along the obstacles that are hit.
+    """
+
+    def __init__(self, cell_size=8):
+        """
+        Constructs all the necessary attributes for the spatial grid object.
+
+        Parameters:
+        cell_size (float): The width and depth of a grid cell. Defaults to 8.
+        """
+
+        self.cell_size = cell_size
+        self.boxes = []
+        self.objects = []
+        self.cells = {}
+
+    @classmethod
+    def from_objects(cls, objects, half_size=2, cell_size=8):
+        """
+        Builds a grid from objects, using a square box around each object's position.
+
+        Parameters:
+        objects (list): A list of objects with a get_position() method, such as trees.
+        half_size (float): Half the width of the box around each object. Defaults to 2.
+        cell_size (float): The width and depth of a grid cell. Defaults to 8.
+
+        Returns:
+        SpatialGrid: The grid indexing the objects.
+        """
+
+        grid = cls(cell_size)
+        for obj in objects:
+            position = obj.get_position()
+            grid.insert((position[0] - half_size, position[2] - half_size,
+                         position[0] + half_size, position[2] + half_size), obj)
+        return grid
+
+    def cell(self, x, z):
+        """
+        Gets the grid cell containing a point.
+
+        Parameters:
+        x (float): The x-coordinate of the point.
+        z (float): The z-coordinate of the point.
+
+        Returns:
+        tuple: The (column, row) of the cell.
+        """
+
+        return floor(x / self.cell_size), floor(z / self.cell_size)
+
+    def insert(self, box, obj=None):
+        """
+        Adds an obstacle to the grid.
+
+        Parameters:
+        box (tuple): The (min_x, min_z, max_x, max_z) box of the obstacle.
+        obj (object): The object the obstacle belongs to. Defaults to None.
+        """
+
+        index = len(self.boxes)
+        self.boxes.append(tuple(box))
+        self.objects.append(obj)
+        min_column, min_row = self.cell(box[0], box[1])
+        max_column, max_row = self.cell(box[2], box[3])
+        for column in range(min_column, max_column + 1):
+            for row in range(min_row, max_row + 1):
+                self.cells.setdefault((column, row), []).append(index)
+
+    def query_box(self, min_x, min_z, max_x, max_z):
+        """
+        Gets the obstacles whose boxes may overlap an area.
+
+        Only the grid cells are tested, so the result can contain obstacles that are close to the area without
+        overlapping it. Each obstacle is returned once.
+
+        Parameters:
+        min_x (float): The minimum x-coordinate of the area.
+        min_z (float): The minimum z-coordinate of the area.
+        max_x (float): The maximum x-coordinate of the area.
+        max_z (float): The maximum z-coordinate of the area.
+
+        Returns:
+        list: The indices of the obstacles, which can be looked up in boxes and objects.
+        """
+
+        min_column, min_row = self.cell(min_x, min_z)
+        max_column, max_row = self.cell(max_x, max_z)
+        found = []
+        seen = set()
+        for column in range(min_column, max_column + 1):
+            for row in range(min_row, max_row + 1):
+                for index in self.cells.get((column, row), ()):
+                    if index not in seen:
+                        seen.add(index)
+                        found.append(index)
+        return found
+
+    def query_point(self, x, z, radius=0):
+        """
+        Gets the obstacles near a point.
+
+        Parameters:
+        x (float): The x-coordinate of the point.
+        z (float): The z-coordinate of the point.
+        radius (float): The distance around the point to search. Defaults to 0.
+
+        Returns:
+        list: The indices of the obstacles in the cells around the point.
+        """
+
+        return self.query_box(x - radius, z - radius, x + radius, z + radius)
+
+    def query_segment(self, start_x, start_z, end_x, end_z, radius=0):
+        """
+        Gets the obstacles near a segment.
+
+        Parameters:
+        start_x (float): The x-coordinate of the start of the segment.
+        start_z (float): The z-coordinate of the start of the segment.
+        end_x (float): The x-coordinate of the end of the segment.
+        end_z (float): The z-coordinate of the end of the segment.
+        radius (float): The distance around the segment to search. Defaults to 0.
+
+        Returns:
+        list: The indices of the obstacles in the cells around the segment.
+        """
+
+        return self.query_box(min(start_x, end_x) - radius, min(start_z, end_z) - radius,
+                              max(start_x, end_x) + radius, max(start_z, end_z) + radius)
+
+    def sweep(self, x, z, move_x, move_z, radius=0):
+        """
+        Finds the first obstacle hit along a movement.
+
+        The whole path of the movement is tested, so a fast moving object cannot skip over an obstacle between two
+        updates.
+
+        Parameters:
+        x (float): The x-coordinate of the start of the movement.
+        z (float): The z-coordinate of the start of the movement.
+        move_x (float): The x-coordinate of the movement vector.
+        move_z (float): The z-coordinate of the movement vector.
+        radius (float): The half-width of the moving object. Defaults to 0.
+
+        Returns:
+        tuple: A (t, normal, index) tuple, where t is the fraction of the movement done before the contact, normal is
+        the (x, z) contact normal and index is the index of the obstacle, or None if nothing is hit.
+        """
+
+        first = None
+        for index in self.query_segment(x, z, x + move_x, z + move_z, radius):
+            hit = sweep_box(x, z, move_x, move_z, self.boxes[index], radius)
+            if hit is not None and (first is None or hit[0] < first[0]):
+                first = (hit[0], hit[1], index)
+        return first
+
+    def slide(self, x, z, move_x, move_z, radius=0, iterations=3):
+        """
+        Moves along a movement vector, sliding along the obstacles that are hit.
+
+        On each contact the object stops at the obstacle, and the rest of the movement loses its component along the
+        contact normal, so the object slides along the obstacle's face instead of stopping dead.
+
+        Parameters:
+        x (float): The x-coordinate of the start of the movement.
+        z (float): The z-coordinate of the start of the movement.
+        move_x (float): The x-coordinate of the movement vector.
+        move_z (float): The z-coordinate of the movement vector.
+        radius (float): The half-width of the moving object. Defaults to 0.
+        iterations (int): The maximum number of contacts resolved. Defaults to 3.
+
+        Returns:
+        tuple: An (x, z, normal) tuple, where x and z are the coordinates reached and normal is the (x, z) normal of
+        the last contact, or None if nothing was hit.
+        """
+
+        normal = None
+        for _ in range(iterations):
+            hit = self.sweep(x, z, move_x, move_z, radius)
+            if hit is None:
+                return x + move_x, z + move_z, normal
+            t, normal, _ = hit
+            # Stop just outside the face that was hit
+            x += move_x * t + normal[0] * CONTACT_SKIN
+            z += move_z * t + normal[1] * CONTACT_SKIN
+            move_x *= 1 - t
+            move_z *= 1 - t
+            along_normal = move_x * normal[0] + move_z * normal[1]
+            move_x -= along_normal * normal[0]
+            move_z -= along_normal * normal[1]
+        return x, z, normal
@@ -0,0 +1,369 @@
+import hashlib
+import json
+import os
+import sys
+import zipfile
+from math import ceil, cos, radians, sin
+
+import numpy as np
+
+from objLoader import CACHE_DIR
+
+# The track file loaded by default
+TRACK_FILE = 'tracks/default.json'
+
+# The version of the compiled track format, bumped whenever the compiler or the arrays stored in the cache change
+TRACK_VERSION = 1
+
+# The default width of the track, used by segments that do not set their own
+TRACK_WIDTH = 10
+
+# The longest piece a segment is tessellated into along its centerline, which is also the length of a kerb stripe
+SAMPLE_LENGTH = 2.5
+
+# The width of the kerbs laid along both edges of the track
+KERB_WIDTH = 0.5
+
+# The size of a square of the start/finish line's checkered pattern, across and along the track
+LINE_SQUARE = (1, 0.5)
+
+# The heights of the track's surfaces, just above the floor and stacked so they never fight for the same pixels
+ROAD_HEIGHT = -0.007
+LINE_HEIGHT = -0.005
+KERB_HEIGHT = -0.004
+
+# The colours of the track's surfaces
+ROAD_COLOR = (0.5, 0.5, 0.5)
+KERB_COLORS = ((1, 0, 0), (1, 1, 1))
+LINE_COLORS = ((1, 1, 1), (0, 0, 0))
+
+
+def direction(heading):
+    """
+    Gets the unit vector a heading points along, and the one pointing to its right.
+
+    A heading of 0 points along the positive z-axis and 90 along the positive x-axis.
+
+    Parameters:
+    heading (float): The heading, in degrees.
+
+    Returns:
+    tuple: The (x, z) forward vector and the (x, z) vector to the right of it.
+    """
+
+    angle = radians(heading)
+    return (sin(angle), cos(angle)), (-cos(angle), sin(angle))
+
+
+class CompiledTrack:
+    """
+    A class to represent a track compiled from a track file into arrays ready for rendering, collisions and lap timing.
+
+    A track file is a JSON description of the track as a chain of segments, each a straight or an arc, laid from a
+    start position and heading:
+
+        {"width": 10, "kerbs": true, "start": [x, z, heading],
+         "segments": [{"type": "straight", "length": 25},
+                      {"type": "arc", "radius": 15, "angle": 90, "checkpoint": true}, ...]}
+
+    An arc's radius is measured to the centerline, and a positive angle turns right. Every segment can set its own
+    width and kerbs, and a segment marked as a checkpoint puts a gate across the track where it starts. The start
+    position always holds the start/finish line, which is the first gate.
+
+    The compiler walks the segments once, emitting the render mesh, the edges of the track, the boxes around its pieces
+    and the gates together, so they can never disagree. The arrays are cached in a binary file keyed by a hash of the
+    track file, so loading an unchanged track is a single read of the cache.
+
+    ...
+
+    Attributes
+    ----------
+    vertices : ndarray
+        an (N, 6) float32 array of the r, g, b, x, y, z vertices of the track's triangles
+    left : ndarray
+        an (M, 2) array of the x, z points of the track's left edge, in driving order
+    right : ndarray
+        an (M, 2) array of the x, z points of the track's right edge, in driving order
+    boxes : ndarray
+        a (K, 4) array of the (min_x, min_z, max_x, max_z) box around each piece of the track, kerbs included
+    gates : ndarray
+        a (G, 2, 2) array of the left and right x, z ends of each gate, the start/finish line first
+    gate_normals : ndarray
+        a (G, 2) array of the x, z direction each gate is crossed along
+    start : ndarray
+        the x, z and heading of the start/finish line
+
+    Methods
+    -------
+    compile(description):
+        Compiles a track description into its arrays.
+    cachePath(filename):
+        Gets the path of the binary cache file of a track file.
+    cacheKey(contents):
+        Builds the key identifying the contents of a track file.
+    loadCached(filename):
+        Loads the arrays of a track file, from its binary cache when it is up to date.
+    track_coordinates():
+        Gets the boxes around the pieces of the track as centers and sizes.
+    crossed_gate(start, end):
+        Finds the gate crossed by a movement.
+    """
+
+    @classmethod
+    def compile(cls, description):
+        """
+        Compiles a track description into its arrays.
+
+        Parameters:
+        description (dict): The track description, as read from a track file.
+
+        Returns:
+        dict: A dictionary holding the vertices, left, right, boxes, gates, gate_normals and start arrays.
+        """
+
+        vertices = []
+        left_edge = []
+        right_edge = []
+        boxes = []
+        gates = []
+        gate_normals = []
+
+        def quad(a, b, c, d, height, color):
+            for x, z in (a, b, c, a, c, d):
+                vertices.append((*color, x, height, z))
+
+        def edges(x, z, heading, width):
+            _, (right_x, right_z) = direction(heading)
+            left = (x - right_x * width / 2, z - right_z * width / 2)
+            right = (x + right_x * width / 2, z + right_z * width / 2)
+            return left, right, (right_x, right_z)
+
+        def gate(x, z, heading, width):
+            left, right, _ = edges(x, z, heading, width)
+            gates.append((left, right))
+            gate_normals.append(direction(heading)[0])
+
+        x, z, heading = (float(value) for value in description['start'])
+        width = description.get('width', TRACK_WIDTH)
+        gate(x, z, heading, width)
+        (forward_x, forward_z), (right_x, right_z) = direction(heading)
+        columns = ceil(width / LINE_SQUARE[0])
+        for row in range(2):
+            for column in range(columns):
+                across = -width / 2 + column * LINE_SQUARE[0]
+                across_end = min(across + LINE_SQUARE[0], width / 2)
+                along = (row - 1) * LINE_SQUARE[1]
+                corners = [(x + right_x * a + forward_x * b, z + right_z * a + forward_z * b)
+                           for a, b in ((across, along), (across_end, along), (across_end, along + LINE_SQUARE[1]),
+                                        (across, along + LINE_SQUARE[1]))]
+                quad(*corners, LINE_HEIGHT, LINE_COLORS[(row + column) % 2])
+
+        stripe = 0
+        for segment in description['segments']:
+            kind = segment.get('type')
+            width = segment.get('width', description.get('width', TRACK_WIDTH))
+            kerbs = segment.get('kerbs', description.get('kerbs', True))
+            if segment.get('checkpoint'):
+                gate(x, z, heading, width)
+            if kind == 'straight':
+                length = segment['length']
+                turn = 0
+            elif kind == 'arc':
+                turn = segment['angle']
+                length = segment['radius'] * radians(abs(turn))
+                side = 1 if turn > 0 else -1
+                right_x, right_z = direction(heading)[1]
+                center_x = x + side * right_x * segment['radius']
+                center_z = z + side * right_z * segment['radius']
+            else:
+                raise ValueError(f"unknown track segment type {kind!r}")
+
+            steps = max(1, ceil(length / SAMPLE_LENGTH))
+            left, right, _ = edges(x, z, heading, width)
+            if not left_edge:
+                left_edge.append(left)
+                right_edge.append(right)
+            for _ in range(steps):
+                if turn:
+                    heading -= turn / steps
+                    right_x, right_z = direction(heading)[1]
+                    x = center_x - side * right_x * segment['radius']
+                    z = center_z - side * right_z * segment['radius']
+                else:
+                    forward_x, forward_z = direction(heading)[0]
+                    x += forward_x * length / steps
+                    z += forward_z * length / steps
+                next_left, next_right, (right_x, right_z) = edges(x, z, heading, width)
+                quad(left, right, next_right, next_left, ROAD_HEIGHT, ROAD_COLOR)
+                pieces = [left, right, next_right, next_left]
+                if kerbs:
+                    previous_right_x = (right[0] - left[0]) / width
+                    previous_right_z = (right[1] - left[1]) / width
+                    outer = [(left[0] - previous_right_x * KERB_WIDTH, left[1] - previous_right_z * KERB_WIDTH),
+                             (next_left[0] - right_x * KERB_WIDTH, next_left[1] - right_z * KERB_WIDTH),
+                             (right[0] + previous_right_x * KERB_WIDTH, right[1] + previous_right_z * KERB_WIDTH),
+                             (next_right[0] + right_x * KERB_WIDTH, next_right[1] + right_z * KERB_WIDTH)]
+                    color = KERB_COLORS[stripe % 2]
+                    quad(outer[0], left, next_left, outer[1], KERB_HEIGHT, color)
+                    quad(right, outer[2], outer[3], next_right, KERB_HEIGHT, color)
+                    pieces += outer
+                stripe += 1
+                boxes.append((min(point[0] for point in pieces), min(point[1] for point in pieces),
+                              max(point[0] for point in pieces), max(point[1] for point in pieces)))
+                left_edge.append(next_left)
+                right_edge.append(next_right)
+                left, right = next_left, next_right
+            heading %= 360
+
+        return {
+            'vertices': np.array(vertices, dtype=np.float32).reshape(-1, 6),
+            'left': np.array(left_edge, dtype=np.float64).reshape(-1, 2),
+            'right': np.array(right_edge, dtype=np.float64).reshape(-1, 2),
+            'boxes': np.array(boxes, dtype=np.float64).reshape(-1, 4),
+            'gates': np.array(gates, dtype=np.float64).reshape(-1, 2, 2),
+            'gate_normals': np.array(gate_normals, dtype=np.float64).reshape(-1, 2),
+            'start': np.array(description['start'], dtype=np.float64),
+        }
+
+    @classmethod
+    def cachePath(cls, filename):
+        """
+        Gets the path of the binary cache file of a track file.
+
+        Parameters:
+        filename (str): The path to the track file.
+
+        Returns:
+        str: The path to the cache file.
+        """
+
+        dirname, basename = os.path.split(filename)
+        return os.path.join(dirname, CACHE_DIR, basename + '.track.npz')
+
+    @classmethod
+    def cacheKey(cls, contents):
+        """
+        Builds the key identifying the contents of a track file.
+
+        Parameters:
+        contents (bytes): The contents of the track file.
+
+        Returns:
+        ndarray: A uint8 array holding the compiled track format version and the SHA-256 hash of the contents.
+        """
+
+        digest = hashlib.sha256(contents).digest()
+        return np.frombuffer(TRACK_VERSION.to_bytes(4, 'little') + digest, dtype=np.uint8)
+
+    @classmethod
+    def loadCached(cls, filename):
+        """
+        Loads the arrays of a track file, from its binary cache when it is up to date.
+
+        When the cache is missing or stale, the track is compiled and the cache is rewritten. Failing to write the cache
+        is not an error, the track is then simply compiled again on the next load.
+
+        Parameters:
+        filename (str): The path to the track file.
+
+        Returns:
+        dict: A dictionary holding the arrays returned by compile().
+        """
+
+        with open(filename, 'rb') as file:
+            contents = file.read()
+        cache = cls.cachePath(filename)
+        key = cls.cacheKey(contents)
+        try:
+            with np.load(cache) as cached:
+                if np.array_equal(cached['key'], key):
+                    return {name: cached[name] for name in cached.files if name != 'key'}
+        except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile):
+            pass
+
+        data = cls.compile(json.loads(contents))
+        try:
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+            with open(cache + '.tmp', 'wb') as file:
+                np.savez(file, key=key, **data)
+            os.replace(cache + '.tmp', cache)
+        except OSError:
+            pass
+        return data
+
+    def __init__(self, filename=TRACK_FILE):
+        """
+        Initializes the track by loading a track file, compiled or from its cache.
+
+        Parameters:
+        filename (str): The path to the track file. Defaults to TRACK_FILE.
+        """
+
+        data = self.loadCached(filename)
+        self.vertices = data['vertices']
+        self.left = data['left']
+        self.right = data['right']
+        self.boxes = data['boxes']
+        self.gates = data['gates']
+        self.gate_normals = data['gate_normals']
+        self.start = data['start']
+
+    def track_coordinates(self):
+        """
+        Gets the boxes around the pieces of the track as centers and sizes.
+
+        Returns:
+        list: A list of (x, z, width, height) tuples, one for each piece of the track, where x and z are the center of
+        its box.
+        """
+
+        return [((min_x + max_x) / 2, (min_z + max_z) / 2, max_x - min_x, max_z - min_z)
+                for min_x, min_z, max_x, max_z in self.boxes.tolist()]
+
+    def crossed_gate(self, start, end):
+        """
+        Finds the gate crossed by a movement.
+
+        Only crossing a gate forwards counts, so backing over the start/finish line is not taken for a lap.
+
+        Parameters:
+        start (tuple): The x, y and z coordinates of the start of the movement.
+        end (tuple): The x, y and z coordinates of the end of the movement.
+
+        Returns:
+        int: The index of the first gate crossed forwards, or None if no gate was crossed.
+        """
+
+        for index, ((left_x, left_z), (right_x, right_z)) in enumerate(self.gates.tolist()):
+            normal_x, normal_z = self.gate_normals[index]
+            before = (start[0] - left_x) * normal_x + (start[2] - left_z) * normal_z
+            after = (end[0] - left_x) * normal_x + (end[2] - left_z) * normal_z
+            if not before < 0 <= after:
+                continue
+            fraction = before / (before - after)
+            x = start[0] + (end[0] - start[0]) * fraction
+            z = start[2] + (end[2] - start[2]) * fraction
+            across_x, across_z = right_x - left_x, right_z - left_z
+            along = ((x - left_x) * across_x + (z - left_z) * across_z) / (across_x ** 2 + across_z ** 2)
+            if 0 <= along <= 1:
+                return index
+        return None
+
+
+def main():
+    """
+    Compiles the track files given on the command line, or the default one, and prints their sizes.
+
+    Returns:
+    int: 0 once every file has been compiled.
+    """
+
+    for filename in sys.argv[1:] or [TRACK_FILE]:
+        track = CompiledTrack(filename)
+        print(f"{filename}: {len(track.vertices)} vertices, {len(track.boxes)} pieces, {len(track.gates)} gates, "
+              f"cached in {CompiledTrack.cachePath(filename)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from math import floor
+from random import Random
+
+import numpy as np
+
+from assets import MeshInstance
+from instancing import pack_transforms
+from lod import LodRenderer
+from mesh import Mesh
+from placement import TRACK_CLEARANCE, ExclusionGrid, poisson_disk
+from spatial import SpatialGrid
+
+# The width and depth of a world chunk
+WORLD_CHUNK_SIZE = 50
+
+# The distance around each car within which the chunks are loaded, nearest first
+LOAD_RADIUS = 120
+
+# The distance around each car within which the chunks must be loaded before the simulation steps again, as their
+# trees can be hit. It covers the longest move of a frame, so a chunk still building is waited for only if a car
+# outruns the background thread.
+COLLISION_MARGIN = 15
+
+# The most chunks kept loaded, the least recently needed being evicted first. The chunks around the cars are always
+# kept, even if there are more of them.
+MAX_CHUNKS = 96
+
+# The shortest distance between two trees scattered over the world
+SCENERY_SPACING = 15
+
+# The model of the trees scattered over the world
+TREE_MODEL = 'objects/tree.obj'
+
+# The range of the random scale of the trees
+TREE_SCALES = (0.1, 1)
+
+# The half-width of the collision box around each tree
+TREE_HALF_SIZE = 2
+
+# The colour and height of the floor tiles
+FLOOR_COLOR = (0, 0.5, 0)
+FLOOR_HEIGHT = -0.009
+
+
+def chunk_key(x, z, size=WORLD_CHUNK_SIZE):
+    """
+    Gets the chunk containing a point.
+
+    Parameters:
+    x (float): The x-coordinate of the point.
+    z (float): The z-coordinate of the point.
+    size (float): The width and depth of a chunk. Defaults to WORLD_CHUNK_SIZE.
+
+    Returns:
+    tuple: The (column, row) of the chunk.
+    """
+
+    return floor(x / size), floor(z / size)
+
+
+def chunks_around(x, z, radius, size=WORLD_CHUNK_SIZE):
+    """
+    Gets the chunks within a distance of a point, nearest first.
+
+    Parameters:
+    x (float): The x-coordinate of the point.
+    z (float): The z-coordinate of the point.
+    radius (float): The distance from the point to the nearest edge of a chunk.
+    size (float): The width and depth of a chunk. Defaults to WORLD_CHUNK_SIZE.
+
+    Returns:
+    list: The (column, row) of each chunk, sorted by its distance from the point.
+    """
+
+    first_column, first_row = chunk_key(x - radius, z - radius, size)
+    last_column, last_row = chunk_key(x + radius, z + radius, size)
+    found = []
+    for column in range(first_column, last_column + 1):
+        for row in range(first_row, last_row + 1):
+            dx = max(column * size - x, 0, x - (column + 1) * size)
+            dz = max(row * size - z, 0, z - (row + 1) * size)
+            distance = dx * dx + dz * dz
+            if distance <= radius * radius:
+                found.append((distance, (column, row)))
+    return [key for _, key in sorted(found)]
+
+
+class WorldChunk:
+    """
+    A class to represent a square of the world: its floor tile, the track triangles over it and its scenery.
+
+    A chunk is built on the CPU without any OpenGL call, so it can be built on a background thread. Its vertex buffer is
+    uploaded on its first draw, on the thread owning the OpenGL context.
+
+    ...
+
+    Attributes
+    ----------
+    key : tuple
+        the (column, row) of the chunk
+    bounds : tuple
+        the (min_x, min_z, max_x, max_z) area covered by the chunk
+    mesh : Mesh
+        the floor tile and track triangles of the chunk, or None in a headless world
+    center : ndarray
+        the center of the bounding sphere of the chunk's floor and track triangles
+    radius : float
+        the radius of the bounding sphere of the chunk's floor and track triangles
+    transforms : ndarray
+        an (N, 4, 4) array of the model matrix of each tree in the chunk
+    tree_centers : ndarray
+        an (N, 3) array of the center of each tree's bounding sphere
+    tree_radii : ndarray
+        the radius of each tree's bounding sphere
+    boxes : list
+        the (min_x, min_z, max_x, max_z) collision box of each tree
+
+    Methods
+    -------
+    free():
+        Deletes the chunk's OpenGL vertex buffer.
+    """
+
+    def __init__(self, key, bounds, mesh, transforms, tree_centers, tree_radii, boxes):
+        """
+        Constructs all the necessary attributes for the world chunk object.
+
+        Parameters:
+        key (tuple): The (column, row) of the chunk.
+        bounds (tuple): The (min_x, min_z, max_x, max_z) area covered by the chunk.
+        mesh (Mesh): The floor tile and track triangles of the chunk, or None in a headless world.
+        transforms (ndarray): An (N, 4, 4) array of the model matrix of each tree in the chunk.
+        tree_centers (ndarray): An (N, 3) array of the center of each tree's bounding sphere.
+        tree_radii (ndarray): The radius of each tree's bounding sphere.
+        boxes (list): The (min_x, min_z, max_x, max_z) collision box of each tree.
+        """
+
+        self.key = key
+        self.bounds = bounds
+        self.mesh = mesh
+        # The track triangles belong to the chunk holding their centroid, so they can reach past its bounds
+        if mesh is not None and mesh.data:
+            points = np.array(mesh.data, dtype=np.float64).reshape(-1, 6)[:, 3:]
+        else:
+            points = np.array([(bounds[0], 0, bounds[1]), (bounds[2], 0, bounds[3])], dtype=np.float64)
+        self.center = (points.min(axis=0) + points.max(axis=0)) / 2
+        self.radius = np.linalg.norm(points - self.center, axis=1).max()
+        self.transforms = transforms
+        self.tree_centers = tree_centers
+        self.tree_radii = tree_radii
+        self.boxes = boxes
+
+    def free(self):
+        """
+        Deletes the chunk's OpenGL vertex buffer.
+        """
+
+        if self.mesh is not None:
+            self.mesh.free()
+
+
+class World:
+    """
+    A class to represent a world streamed in chunks around the cars, however large its map.
+
+    The world is cut into square chunks, each holding a floor tile, the track triangles whose centroid lies over it and
+    trees scattered by Poisson-disk sampling. The chunks within LOAD_RADIUS of a car are built on a background thread,
+    nearest first, and the least recently needed ones are evicted once more than MAX_CHUNKS are loaded, so the memory
+    and vertex buffers used are bounded by the area around the cars rather than by the map.
+
+    The trees of a chunk only depend on the world's seed and the chunk's position, never on the order the chunks are
+    loaded in, and the chunks within COLLISION_MARGIN of a car are always loaded before it moves, so races are the
+    same whether the chunks are streamed in a game or built on demand in a headless race.
+
+    ...
+
+    Attributes
+    ----------
+    assets : AssetManager
+        the asset manager the tree model is loaded through
+    seed : str
+        the seed every chunk's random number generator is derived from
+    size : float
+        the width and depth of a chunk
+    load_radius : float
+        the distance around each car within which the chunks are loaded
+    max_chunks : int
+        the most chunks kept loaded, besides those around the cars
+    track : dict
+        a dictionary mapping each chunk to the float32 vertex data of the track triangles over it
+    track_coordinates : list
+        the (x, z, width, height) of each track segment, kept clear of trees
+    tree : MeshInstance
+        the tree model instance keeping the shared tree mesh loaded
+    chunks : OrderedDict
+        the loaded chunks by key, the least recently needed first
+    pending : dict
+        a dictionary mapping the chunks being built to their futures
+    executor : ThreadPoolExecutor
+        the background thread building the chunks, or None in a headless world
+    obstacles : SpatialGrid
+        the grid indexing the trees of the loaded chunks for collision queries
+    tree_batch : LodRenderer
+        the renderer drawing the trees of the loaded chunks, or None in a headless world
+
+    Methods
+    -------
+    build_chunk(key):
+        Builds a chunk on the CPU, without any OpenGL call.
+    update(positions):
+        Loads the chunks around the cars and evicts the chunks no longer needed.
+    draw(frustum=None, counter=None):
+        Draws the loaded chunks inside a view frustum, and their trees.
+    free():
+        Deletes the OpenGL resources of the world and stops its background thread.
+    """
+
+    def __init__(self, assets, racetrack, seed=None, size=WORLD_CHUNK_SIZE, load_radius=LOAD_RADIUS,
+                 max_chunks=MAX_CHUNKS):
+        """
+        Constructs all the necessary attributes for the world object.
+
+        The track is tessellated once and its triangles are sorted into the chunks, as compact vertex arrays.
+
+        Parameters:
+        assets (AssetManager): The asset manager to load the tree model through. Headless asset managers give a world
+        that builds its chunks on demand, without floor or track meshes.
+        racetrack (Racetrack): The racetrack laid over the world.
+        seed (int): The seed of the scenery. Defaults to None, in which case the scenery differs every time.
+        size (float): The width and depth of a chunk. Defaults to WORLD_CHUNK_SIZE.
+        load_radius (float): The distance around each car within which the chunks are loaded. Defaults to
+        LOAD_RADIUS.
+        max_chunks (int): The most chunks kept loaded, besides those around the cars. Defaults to MAX_CHUNKS.
+        """
+
+        self.assets = assets
+        self.seed = str(seed if seed is not None else Random().getrandbits(32))
+        self.size = size
+        self.load_radius = load_radius
+        self.max_chunks = max_chunks
+        self.track_coordinates = racetrack.get_track_coordinates()
+        self.track = {}
+        if not assets.headless:
+            triangles = np.array(racetrack.build().data, dtype=np.float32).reshape(-1, 3, 6)
+            centroids = triangles[:, :, 3:].mean(axis=1)
+            keys = np.floor(centroids[:, [0, 2]] / size).astype(np.int64)
+            for key in {tuple(key) for key in keys.tolist()}:
+                self.track[key] = triangles[(keys == key).all(axis=1)].reshape(-1)
+        self.tree = assets.load(TREE_MODEL)
+        self.chunks = OrderedDict()
+        self.pending = {}
+        self.executor = None if assets.headless else ThreadPoolExecutor(max_workers=1)
+        self.obstacles = SpatialGrid()
+        self.tree_batch = None
+        if not assets.headless:
+            lods = assets.load_lods(self.tree.mesh)
+            self.tree_batch = LodRenderer(lods, np.zeros((0, 4, 4)), np.zeros((0, 3)), np.zeros(0))
+
+    def build_chunk(self, key):
+        """
+        Builds a chunk on the CPU, without any OpenGL call.
+
+        The trees are kept half the spacing away from the chunk's edges, so trees of neighbouring chunks are never
+        closer than SCENERY_SPACING either.
+
+        Parameters:
+        key (tuple): The (column, row) of the chunk.
+
+        Returns:
+        WorldChunk: The built chunk.
+        """
+
+        column, row = key
+        bounds = (column * self.size, row * self.size, (column + 1) * self.size, (row + 1) * self.size)
+        random = Random(f"{self.seed}:{column}:{row}")
+        inner = (bounds[0] + SCENERY_SPACING / 2, bounds[1] + SCENERY_SPACING / 2,
+                 bounds[2] - SCENERY_SPACING / 2, bounds[3] - SCENERY_SPACING / 2)
+        reach = TRACK_CLEARANCE + SCENERY_SPACING
+        segments = [(x, z, w, h) for x, z, w, h in self.track_coordinates
+                    if x - w / 2 - reach < bounds[2] and x + w / 2 + reach > bounds[0]
+                    and z - h / 2 - reach < bounds[3] and z + h / 2 + reach > bounds[1]]
+        exclusion = ExclusionGrid.from_track(segments, bounds=bounds)
+
+        trees = []
+        for x, z in poisson_disk(random, inner, SCENERY_SPACING, exclusion):
+            tree = MeshInstance(self.tree.mesh)
+            tree.move(x, 0, z)
+            tree.scale(random.uniform(*TREE_SCALES))
+            trees.append(tree)
+        spheres = [tree.get_bounding_sphere() for tree in trees]
+        boxes = [(x - TREE_HALF_SIZE, z - TREE_HALF_SIZE, x + TREE_HALF_SIZE, z + TREE_HALF_SIZE)
+                 for x, _, z in (tree.get_position() for tree in trees)]
+
+        mesh = None
+        if not self.assets.headless:
+            mesh = Mesh()
+            mesh.add_quad((bounds[0], FLOOR_HEIGHT, bounds[1]), (bounds[2], FLOOR_HEIGHT, bounds[1]),
+                          (bounds[2], FLOOR_HEIGHT, bounds[3]), (bounds[0], FLOOR_HEIGHT, bounds[3]), FLOOR_COLOR)
+            if key in self.track:
+                mesh.data.extend(self.track[key].tolist())
+        return WorldChunk(key, bounds, mesh, pack_transforms(trees),
+                          np.array([center for center, _ in spheres], dtype=np.float64).reshape(-1, 3),
+                          np.array([radius for _, radius in spheres], dtype=np.float64), boxes)
+
+    def update(self, positions):
+        """
+        Loads the chunks around the cars and evicts the chunks no longer needed.
+
+        The chunks within COLLISION_MARGIN of a car are waited for, or built right away in a headless world. The others
+        within the load radius are queued on the background thread, and added once built. When the loaded chunks
+        change, the obstacle grid and the tree batch are rebuilt from them.
+
+        Parameters:
+        positions (list): The x, y and z coordinates of each car.
+        """
+
+        required = []
+        wanted = []
+        for x, _, z in positions:
+            required += chunks_around(x, z, COLLISION_MARGIN, self.size)
+            if self.executor is not None:
+                wanted += chunks_around(x, z, self.load_radius, self.size)
+        required = list(dict.fromkeys(required))
+        wanted = list(dict.fromkeys(wanted)) or required
+
+        changed = False
+        for key in required:
+            if key not in self.chunks:
+                future = self.pending.pop(key, None)
+                self.chunks[key] = future.result() if future is not None else self.build_chunk(key)
+                changed = True
+        if self.executor is not None:
+            for key in wanted:
+                if key not in self.chunks and key not in self.pending:
+                    self.pending[key] = self.executor.submit(self.build_chunk, key)
+            for key, future in list(self.pending.items()):
+                if future.done():
+                    del self.pending[key]
+                    self.chunks[key] = future.result()
+                    changed = True
+
+        for key in reversed(wanted):
+            if key in self.chunks:
+                self.chunks.move_to_end(key)
+        keep = set(required)
+        while len(self.chunks) > max(self.max_chunks, len(keep)):
+            key = next(iter(self.chunks))
+            if key in keep:
+                break
+            self.chunks.pop(key).free()
+            changed = True
+        wanted = set(wanted)
+        for key in [key for key in self.pending if key not in wanted]:
+            if self.pending[key].cancel():
+                del self.pending[key]
+
+        if changed:
+            self.obstacles = SpatialGrid()
+            for key in sorted(self.chunks):
+                for box in self.chunks[key].boxes:
+                    self.obstacles.insert(box)
+            if self.tree_batch is not None:
+                chunks = list(self.chunks.values())
+                self.tree_batch.update(np.concatenate([chunk.transforms for chunk in chunks]),
+                                       np.concatenate([chunk.tree_centers for chunk in chunks]),
+                                       np.concatenate([chunk.tree_radii for chunk in chunks]))
+
+    def draw(self, frustum=None, counter=None):
+        """
+        Draws the loaded chunks inside a view frustum, and their trees.
+
+        Each chunk's floor tile and track triangles are drawn with one draw call, and the trees of every loaded chunk
+        in one batch per level of detail.
+
+        Parameters:
+        frustum (Frustum): The view frustum of the current viewport. Defaults to None, in which case every loaded chunk
+        is drawn.
+        counter (CullCounter): The counter the drawn and culled chunks and trees are added to. Defaults to None.
+        """
+
+        if self.tree_batch is not None:
+            self.tree_batch.draw(frustum, counter)
+        chunks = [chunk for chunk in self.chunks.values() if chunk.mesh is not None]
+        if frustum is not None and chunks:
+            visible = frustum.spheres_visible(np.array([chunk.center for chunk in chunks]),
+                                              np.array([chunk.radius for chunk in chunks]))
+            if counter is not None:
+                counter.count('chunks', visible)
+            chunks = [chunk for chunk, shown in zip(chunks, visible) if shown]
+        for chunk in chunks:
+            chunk.mesh.draw()
+
+    def free(self):
+        """
+        Deletes the OpenGL resources of the world and stops its background thread.
+        """
+
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+        for future in self.pending.values():
+            future.cancel()
+        self.pending = {}
+        for chunk in self.chunks.values():
+            chunk.free()
+        self.chunks = OrderedDict()
+        if self.tree_batch is not None:
+            self.tree_batch.free()
+        self.tree.free()